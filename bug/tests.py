@@ -1,8 +1,14 @@
+import csv
+import zipfile
+from io import BytesIO, StringIO
+
 from django.contrib.auth.models import Permission
 from django.core.exceptions import ValidationError
 from django.db.models import RestrictedError
 from django.db.utils import IntegrityError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
@@ -410,3 +416,38 @@ class BugViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         content_type = response.headers["Content-Type"]
         self.assertEqual(content_type, "application/x-zip-compressed")
+
+    def test_export_bugs_reads_bugs_and_observations_in_a_single_query(self):
+        self.client.login(username=self.username, password=self.password)
+        bug_1 = Bug.objects.create(
+            title="Bug 1",
+            description="Bug description 1",
+            bug_type=Bug.BugType.ERROR,
+            status=Bug.Status.TODO,
+            reporter=self.user_profile,
+        )
+        bug_2 = Bug.objects.create(
+            title="Bug 2",
+            description="Bug description 2",
+            bug_type=Bug.BugType.CLARIFICATION,
+            status=Bug.Status.PROG,
+            reporter=self.user_profile,
+        )
+        Observation.objects.create(bug_report=bug_1, observation="Fixed")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("bug:export_bugs"))
+            content = b"".join(response.streaming_content)
+
+        bug_queries = [query for query in queries if '"bug_' in query["sql"]]
+        self.assertEqual(len(bug_queries), 1)
+        with zipfile.ZipFile(BytesIO(content)) as zip_file:
+            names = zip_file.namelist()
+            self.assertEqual(len(names), 2)
+            csv_name = next(name for name in names if name.endswith(".csv"))
+            rows = list(csv.reader(StringIO(zip_file.read(csv_name).decode("utf-8"))))
+        rows_by_id = {row[0]: row for row in rows[1:]}
+        self.assertEqual(rows_by_id[str(bug_1.pk)][3:5], ["1", "0"])
+        self.assertEqual(rows_by_id[str(bug_1.pk)][8], "Fixed")
+        self.assertEqual(rows_by_id[str(bug_2.pk)][3:5], ["4", "2"])
+        self.assertEqual(rows_by_id[str(bug_2.pk)][8:], ["", ""])
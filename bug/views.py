@@ -1,13 +1,18 @@
 import datetime
-import zipfile
-from io import BytesIO
 
-import pandas as pd
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
-from django.shortcuts import HttpResponse, get_object_or_404, redirect, render, reverse
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.utils.translation import gettext as _
 
+from utils.streaming import (
+    XlsxStreamWriter,
+    get_spooled_file,
+    stream_zip,
+    write_csv_rows,
+)
+
 from .forms import BugForm, BugUpdateForm, ObservationForm
 from .models import Bug, Observation
 
@@ -62,12 +67,9 @@ def export_bugs(request):
 
     Both files include bug metadata and related observation data when available.
     """
-    buffer = BytesIO()
-    zip_file = zipfile.ZipFile(buffer, mode="w")
     pos_fix = " - {}".format(datetime.datetime.today().strftime("%Y-%m-%d %H-%M-%S"))
     zip_name = _("SARA - Bugs")
 
-    bugs = Bug.objects.all()
     header = [
         _("ID"),
         _("Title"),
@@ -80,63 +82,37 @@ def export_bugs(request):
         _("Observation"),
         _("Answer date"),
     ]
-    rows = []
-
-    for bug in bugs:
-        try:
-            bug_observation = bug.observation
-        except Observation.DoesNotExist:
-            bug_observation = None
-
-        observation = bug_observation.observation if bug_observation else ""
-        answer_date = bug_observation.answer_date if bug_observation else ""
-
-        rows.append(
-            [
-                bug.pk,
-                bug.title,
-                bug.description,
-                bug.bug_type,
-                bug.status,
-                bug.report_date,
-                bug.reporter_id,
-                bug.update_date,
-                observation,
-                answer_date,
-            ]
-        )
-
-    df = pd.DataFrame(rows, columns=header).drop_duplicates()
-    df = df.astype(
-        dtype={
-            _("ID"): int,
-            _("Title"): str,
-            _("Description"): str,
-            _("Type"): int,
-            _("Status"): int,
-            _("Date of report"): "datetime64[ns]",
-            _("Reporter"): int,
-            _("Update date"): "datetime64[ns]",
-            _("Observation"): str,
-            _("Answer date"): "datetime64[ns]",
-        }
+    # The observations are left joined, so the bugs are read in a single query
+    bugs = Bug.objects.values_list(
+        "pk",
+        "title",
+        "description",
+        "bug_type",
+        "status",
+        "report_date",
+        "reporter_id",
+        "update_date",
+        "observation__observation",
+        "observation__answer_date",
+    )
+    # The type and the status are exported as numbers, as their choices are
+    rows = (
+        [row[0], row[1], row[2], int(row[3]), int(row[4]), *row[5:]]
+        for row in bugs.iterator()
     )
-    df[_("Date of report")] = df[_("Date of report")].dt.tz_localize(None)
-    df[_("Update date")] = df[_("Update date")].dt.tz_localize(None)
-    df[_("Answer date")] = df[_("Answer date")].dt.tz_localize(None)
-
-    csv_file = BytesIO()
-    df.to_csv(path_or_buf=csv_file, index=False)
-    zip_file.writestr("{}.csv".format("Bug report" + pos_fix), csv_file.getvalue())
 
-    excel_file = BytesIO()
-    writer = pd.ExcelWriter(excel_file, engine="xlsxwriter")
-    df.to_excel(writer, sheet_name="Report", index=False)
+    # The CSV file is written while the rows are written to the sheet
+    csv_file = get_spooled_file()
+    excel_file = get_spooled_file()
+    writer = XlsxStreamWriter(excel_file)
+    writer.write_sheet("Report", header, write_csv_rows(csv_file, header, rows))
     writer.close()
-    zip_file.writestr("{}.xlsx".format("Bug report" + pos_fix), excel_file.getvalue())
 
-    zip_file.close()
-    response = HttpResponse(buffer.getvalue())
+    entries = [
+        ("Bug report" + pos_fix + ".csv", lambda: csv_file),
+        ("Bug report" + pos_fix + ".xlsx", lambda: excel_file),
+    ]
+    response = StreamingHttpResponse(stream_zip(entries))
     response["Content-Type"] = "application/x-zip-compressed"
     response["Content-Disposition"] = (
         "attachment; filename=" + zip_name + pos_fix + ".zip"
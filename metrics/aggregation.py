@@ -0,0 +1,401 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from metrics.dimensions import (
+    DIMENSIONS,
+    DISTINCT_COUNT,
+    OPERATION_SUM,
+    REPORT_SUM,
+    get_dimensions,
+)
+from metrics.models import Metric
+from report.models import Editor, OperationReport, Organizer, Partner, Report
+
+# Report columns the contributions are computed from
+CONTRIBUTION_FIELDS = {
+    dimension.column for dimension in DIMENSIONS if dimension.kind == REPORT_SUM
+} | {"initial_date", "partial_report"}
+
+# Models related to reports the contributions are computed from, with their relation
+RELATED_FIELDS = {
+    Metric: "metrics_related",
+    Editor: "editors",
+    Organizer: "organizers",
+    Partner: "partners_activated",
+}
+
+_deferred = threading.local()
+
+
+def get_reports_for_funding(supplementary_query=Q(), is_main_funding=False):
+    """
+    Returns the reports matching the supplementary query. For the main funding project,
+    reports from activities or fundings that do not count towards it are left out.
+    """
+    reports = Report.objects.filter(supplementary_query)
+    if is_main_funding:
+        reports = reports.exclude(
+            (
+                Q(activity_associated__area__project__counts_for_main_funding=False)
+                | Q(funding_associated__project__counts_for_main_funding=False)
+            )
+            & ~(
+                Q(activity_associated__id=1)
+                & Q(funding_associated__project__counts_for_main_funding=True)
+            )
+            & ~(Q(activity_associated__id=1) & Q(funding_associated__isnull=True))
+        )
+    return reports
+
+
+def get_done_for_metrics(metric_ids, reports, dimensions=None):
+    """
+    Batched version of get_done_for_report. Computes the done values of every metric in
+    metric_ids over the reports associated to it (through metrics_related) and contained in
+    `reports`, with one grouped query per kind of aggregation instead of one round per metric.
+    Only the dimensions named in `dimensions` are computed, if given.
+
+    Returns a tuple (done, final) of dictionaries keyed by metric id, where done has the same
+    keys as get_done_for_report and final tells if there is a final report for the metric.
+    """
+    metric_ids = list(metric_ids)
+    done, final = _aggregate(
+        metric_ids,
+        reports,
+        ("metric_id",),
+        keys=[(pk,) for pk in metric_ids],
+        dimensions=get_dimensions(dimensions),
+    )
+    return (
+        {metric_id: done[(metric_id,)][0] for metric_id in metric_ids},
+        {metric_id: final[(metric_id,)][0] for metric_id in metric_ids},
+    )
+
+
+def get_done_per_report(metric_ids, reports, dimensions=None):
+    """
+    Same as get_done_for_metrics, but grouped by report as well, i.e. the contribution of each
+    report of `reports` to each metric of metric_ids it is associated to.
+
+    Returns a tuple (done, final) of dictionaries keyed by (report id, metric id).
+    """
+    done, final = _aggregate(
+        list(metric_ids),
+        reports,
+        ("report_id", "metric_id"),
+        dimensions=get_dimensions(dimensions),
+    )
+    return (
+        {key: values[0] for key, values in done.items()},
+        {key: values[0] for key, values in final.items()},
+    )
+
+
+def get_done_for_timespans(
+    metric_ids, reports, timespan_array, area_ids=None, dimensions=None
+):
+    """
+    Timespan version of get_done_for_metrics. A report counts towards every period of
+    timespan_array whose bounds contain its end date, and all the periods are computed in the
+    same grouped queries through conditional aggregates instead of one pass per period.
+
+    Returns a tuple (done, final) of dictionaries keyed by metric id, or by (area id, metric id)
+    if area_ids is given, each holding one value per period of timespan_array.
+    """
+    metric_ids = list(metric_ids)
+    dimensions = get_dimensions(dimensions)
+    periods = [
+        Q(report__end_date__gte=time_ini, report__end_date__lte=time_end)
+        for time_ini, time_end in timespan_array
+    ]
+    if area_ids is None:
+        done, final = _aggregate(
+            metric_ids,
+            reports,
+            ("metric_id",),
+            periods,
+            keys=[(pk,) for pk in metric_ids],
+            dimensions=dimensions,
+        )
+        return (
+            {metric_id: done[(metric_id,)] for metric_id in metric_ids},
+            {metric_id: final[(metric_id,)] for metric_id in metric_ids},
+        )
+    return _aggregate(
+        metric_ids,
+        reports,
+        ("report__area_responsible", "metric_id"),
+        periods,
+        keys=[(area_id, pk) for area_id in area_ids for pk in metric_ids],
+        dimensions=dimensions,
+    )
+
+
+def refresh_metric_contributions(reports):
+    """
+    Recomputes the MetricContribution rows of the given reports from their current data.
+    The models are taken from the queryset, so that migrations can pass historical ones.
+    """
+    model = reports.model
+    MetricContribution = model.metric_contributions.field.model
+    report_ids = list(reports.values_list("pk", flat=True))
+    if not report_ids:
+        return
+    metric_ids = set(
+        model.metrics_related.through.objects.filter(
+            report_id__in=report_ids
+        ).values_list("metric_id", flat=True)
+    )
+    done, final = get_done_per_report(metric_ids, model.objects.filter(pk__in=report_ids))
+
+    contributions = [
+        MetricContribution(
+            report_id=report_id,
+            metric_id=metric_id,
+            dimension=dimension,
+            value=int(value),
+        )
+        for (report_id, metric_id), values in done.items()
+        for dimension, value in values.items()
+        if value
+    ]
+    with transaction.atomic():
+        MetricContribution.objects.filter(report_id__in=report_ids).delete()
+        MetricContribution.objects.bulk_create(contributions)
+
+
+@contextmanager
+def deferred_contribution_refresh():
+    """
+    Collects the reports whose contributions change inside the block and refreshes them
+    once at its end, instead of once per signal.
+    """
+    if getattr(_deferred, "report_ids", None) is not None:
+        yield
+        return
+    _deferred.report_ids = set()
+    try:
+        yield
+        report_ids = _deferred.report_ids
+    finally:
+        _deferred.report_ids = None
+    refresh_contributions_of(report_ids)
+
+
+def refresh_contributions_of(report_ids):
+    report_ids = set(report_ids)
+    if not report_ids:
+        return
+    pending = getattr(_deferred, "report_ids", None)
+    if pending is not None:
+        pending.update(report_ids)
+    else:
+        refresh_metric_contributions(Report.objects.filter(pk__in=report_ids))
+
+
+def is_deleting_reports(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model is Report
+    return isinstance(origin, Report)
+
+
+def get_related_report_ids(instance):
+    """
+    Reports related to an editor, organizer, partner or metric.
+    """
+    field = Report._meta.get_field(RELATED_FIELDS[type(instance)])
+    return set(
+        field.remote_field.through.objects.filter(
+            **{field.m2m_reverse_field_name(): instance.pk}
+        ).values_list("report_id", flat=True)
+    )
+
+
+def report_saved(sender, instance, created, update_fields=None, **kwargs):
+    # A new report has no metric yet, they are added afterwards
+    if created:
+        return
+    if update_fields is None or CONTRIBUTION_FIELDS & set(update_fields):
+        refresh_contributions_of([instance.pk])
+
+
+def operation_report_changed(sender, instance, origin=None, **kwargs):
+    # The contributions of a report being deleted go with it
+    if is_deleting_reports(origin):
+        return
+    refresh_contributions_of([instance.report_id])
+
+
+def related_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    refresh_contributions_of(get_related_report_ids(instance))
+
+
+def related_deleting(sender, instance, **kwargs):
+    # The memberships are gone by the time post_delete is sent
+    instance._contribution_report_ids = get_related_report_ids(instance)
+
+
+def related_deleted(sender, instance, **kwargs):
+    refresh_contributions_of(getattr(instance, "_contribution_report_ids", ()))
+
+
+def report_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._contribution_report_ids = get_related_report_ids(instance)
+    elif action == "post_clear" and reverse:
+        refresh_contributions_of(getattr(instance, "_contribution_report_ids", ()))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        refresh_contributions_of((pk_set or ()) if reverse else [instance.pk])
+
+
+def connect_signals():
+    post_save.connect(report_saved, sender=Report)
+    post_save.connect(operation_report_changed, sender=OperationReport)
+    post_delete.connect(operation_report_changed, sender=OperationReport)
+    for model in RELATED_FIELDS:
+        post_save.connect(related_saved, sender=model)
+        pre_delete.connect(related_deleting, sender=model)
+        post_delete.connect(related_deleted, sender=model)
+    for field in RELATED_FIELDS.values():
+        m2m_changed.connect(
+            report_relation_changed, sender=getattr(Report, field).through
+        )
+
+
+def _aggregate(
+    metric_ids, reports, group_by, periods=(Q(),), keys=None, dimensions=get_dimensions()
+):
+    """
+    Runs the grouped queries behind the done values of the given dimensions, generated from
+    the dimension registry: one for the report sums, two for the operation sums, one per
+    counted relation and one for the occurrence. Every aggregate is computed once per period
+    (a condition over the report) so that all the periods come out of the same query.
+    The keys given are always present in the result, with empty values if nothing matched.
+    """
+    associations = reports.model.metrics_related.through.objects.filter(
+        metric_id__in=metric_ids, report__in=reports
+    )
+
+    def grouped(queryset, aggregates):
+        # aggregates maps an alias to (aggregate class, expression, distinct, condition)
+        rows = queryset.values(*group_by).annotate(
+            **{
+                f"{alias}_{index}": aggregate(
+                    expression, distinct=distinct, filter=(period & condition) or None
+                )
+                for index, period in enumerate(periods)
+                for alias, (aggregate, expression, distinct, condition) in aggregates.items()
+            }
+        )
+        return {tuple(row[field] for field in group_by): row for row in rows}
+
+    report_sums = grouped(
+        associations,
+        {
+            dimension.goal_field: (Sum, f"report__{dimension.column}", False, Q())
+            for dimension in dimensions
+            if dimension.kind == REPORT_SUM
+        },
+    )
+
+    operation_dimensions = [
+        dimension for dimension in dimensions if dimension.kind == OPERATION_SUM
+    ]
+    operation_sums = {}
+    alternative_operation_sums = {}
+    if operation_dimensions:
+        operation_sums = grouped(
+            reports.model.operation_report.field.model.objects.filter(
+                metric_id__in=metric_ids,
+                report__in=reports,
+                report__metrics_related=F("metric"),
+            ),
+            {
+                dimension.goal_field: (Sum, dimension.column, False, Q())
+                for dimension in operation_dimensions
+            },
+        )
+        alternative_operation_sums = grouped(
+            associations,
+            {
+                dimension.goal_field: (
+                    Sum,
+                    f"report__operation_report__{dimension.column}",
+                    False,
+                    Q(),
+                )
+                for dimension in operation_dimensions
+            },
+        )
+
+    # One query per relation, so that the joins of a relation do not multiply the others
+    relations = {}
+    for dimension in dimensions:
+        if dimension.kind == DISTINCT_COUNT:
+            relations.setdefault(dimension.column, []).append(dimension)
+    counts = {
+        relation: grouped(
+            associations,
+            {
+                dimension.goal_field: (
+                    Count,
+                    f"report__{relation}",
+                    True,
+                    dimension.condition("report__") if dimension.condition else Q(),
+                )
+                for dimension in relation_dimensions
+            },
+        )
+        for relation, relation_dimensions in relations.items()
+    }
+
+    # Reports associated to a boolean metric tell both the occurrence and the finality
+    occurrences = grouped(
+        associations.filter(report__metrics_related__boolean_type=True),
+        {
+            "occurrence": (Count, "report", True, Q()),
+            "final": (Count, "report", True, Q(report__partial_report=False)),
+        },
+    )
+
+    if keys is None:
+        keys = list(report_sums)
+
+    done = {}
+    final = {}
+    for key in keys:
+        sums = report_sums.get(key, {})
+        own = operation_sums.get(key, {})
+        alternative = alternative_operation_sums.get(key, {})
+        occurrence = occurrences.get(key, {})
+
+        done[key] = []
+        final[key] = []
+        for index in range(len(periods)):
+
+            def get(row, alias, index=index):
+                return row.get(f"{alias}_{index}") or 0
+
+            values = {}
+            for dimension in dimensions:
+                if dimension.kind == REPORT_SUM:
+                    value = get(sums, dimension.goal_field)
+                elif dimension.kind == OPERATION_SUM:
+                    value = get(own, dimension.goal_field) or get(
+                        alternative, dimension.goal_field
+                    )
+                elif dimension.kind == DISTINCT_COUNT:
+                    value = get(counts[dimension.column].get(key, {}), dimension.goal_field)
+                else:
+                    value = bool(get(occurrence, "occurrence"))
+                values[dimension.name] = value
+            done[key].append(values)
+            final[key].append(bool(get(occurrence, "final")))
+
+    return done, final
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MetricsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "metrics"
+
+    def ready(self):
+        from metrics import aggregation, cache
+
+        aggregation.connect_signals()
+        cache.connect_signals()
@@ -0,0 +1,93 @@
+import hashlib
+import uuid
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from metrics.models import Activity, Area, Metric, Project
+from report.models import Editor, Funding, OperationReport, Organizer, Partner, Report
+from users.models import TeamArea
+
+# Cached datasets are dropped whenever the version changes, so they can live long
+DATASET_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = "metrics_per_project_version"
+HITS_KEY = "metrics_per_project_hits"
+MISSES_KEY = "metrics_per_project_misses"
+
+# Models whose data is used to build the metrics per project datasets
+WATCHED_MODELS = (
+    Report,
+    OperationReport,
+    Metric,
+    Project,
+    Activity,
+    Area,
+    Editor,
+    Organizer,
+    Partner,
+    Funding,
+    TeamArea,
+)
+
+
+def get_or_build_dataset(build, project_ids, metric_query, supplementary_query, field, lang):
+    """
+    Returns the cached dataset for the given arguments, calling build() to compute and cache
+    it if there is none for the current version of the data. Nothing is cached with a
+    per-process cache, whose invalidation would not reach the other processes.
+    """
+    if not is_cache_shared():
+        return build()
+
+    key = get_dataset_key(project_ids, metric_query, supplementary_query, field, lang)
+    dataset = cache.get(key)
+    if dataset is None:
+        increment_counter(MISSES_KEY)
+        dataset = build()
+        cache.set(key, dataset, DATASET_TIMEOUT)
+    else:
+        increment_counter(HITS_KEY)
+    return dataset
+
+
+def is_cache_shared():
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def get_dataset_key(project_ids, metric_query, supplementary_query, field, lang):
+    arguments = repr(
+        (sorted(project_ids), str(metric_query), str(supplementary_query), field, lang)
+    )
+    digest = hashlib.md5(arguments.encode("utf-8")).hexdigest()
+    return f"metrics_per_project_{get_data_version()}_{digest}"
+
+
+def get_data_version():
+    return cache.get_or_set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_datasets(**kwargs):
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def increment_counter(key):
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {"hits": hits, "misses": misses, "requests": hits + misses}
+
+
+def connect_signals():
+    for model in WATCHED_MODELS:
+        post_save.connect(invalidate_datasets, sender=model)
+        post_delete.connect(invalidate_datasets, sender=model)
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(invalidate_datasets, sender=field.remote_field.through)
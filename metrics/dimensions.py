@@ -0,0 +1,127 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils.translation import gettext_noop
+
+# How the done value of a dimension is computed from the reports
+REPORT_SUM = "report_sum"  # Sum of a Report column
+OPERATION_SUM = "operation_sum"  # Sum of an OperationReport column (see aggregation)
+DISTINCT_COUNT = "distinct_count"  # Number of distinct objects of a Report relation
+EXISTS = "exists"  # Whether a report is associated to a boolean metric
+
+# Groups of dimensions
+CONTENT = "content"
+COMMUNITY = "community"
+FINANCIAL = "financial"
+COMMUNICATION = "communication"
+OTHER = "other"
+
+# name: key of the goal and done dictionaries
+# goal_field: Metric field holding the goal
+# kind: how the done value is computed
+# column: Report or OperationReport column summed, or Report relation counted
+# group: group of the dimension
+# label: header of the dimension in the exports
+# condition: for counts, function of the path to the report giving the objects to count
+Dimension = namedtuple(
+    "Dimension",
+    ["name", "goal_field", "kind", "column", "group", "label", "condition"],
+    defaults=[None],
+)
+
+
+def retained(relation):
+    def condition(path):
+        return Q(**{f"{path}{relation}__retained": True})
+
+    return condition
+
+
+def new_editor(path):
+    return Q(
+        **{
+            f"{path}editors__account_creation_date__gte": F(f"{path}initial_date")
+            - timedelta(days=30)
+        }
+    )
+
+
+def new_organizer(path):
+    return Q(**{f"{path}organizers__first_seen_at__gte": F(f"{path}initial_date")})
+
+
+# Every dimension a metric is measured in, in the order they are displayed
+DIMENSIONS = (
+    # Content metrics
+    Dimension("Wikipedia (created)", "wikipedia_created", REPORT_SUM, "wikipedia_created", CONTENT, gettext_noop("# Wikipedia created")),
+    Dimension("Wikipedia (edited)", "wikipedia_edited", REPORT_SUM, "wikipedia_edited", CONTENT, gettext_noop("# Wikipedia edited")),
+    Dimension("Wikimedia Commons (created)", "commons_created", REPORT_SUM, "commons_created", CONTENT, gettext_noop("# Commons created")),
+    Dimension("Wikimedia Commons (edited)", "commons_edited", REPORT_SUM, "commons_edited", CONTENT, gettext_noop("# Commons edited")),
+    Dimension("Wikidata (created)", "wikidata_created", REPORT_SUM, "wikidata_created", CONTENT, gettext_noop("# Wikidata created")),
+    Dimension("Wikidata (edited)", "wikidata_edited", REPORT_SUM, "wikidata_edited", CONTENT, gettext_noop("# Wikidata edited")),
+    Dimension("Wikiversity (created)", "wikiversity_created", REPORT_SUM, "wikiversity_created", CONTENT, gettext_noop("# Wikiversity created")),
+    Dimension("Wikiversity (edited)", "wikiversity_edited", REPORT_SUM, "wikiversity_edited", CONTENT, gettext_noop("# Wikiversity edited")),
+    Dimension("Wikibooks (created)", "wikibooks_created", REPORT_SUM, "wikibooks_created", CONTENT, gettext_noop("# Wikibooks created")),
+    Dimension("Wikibooks (edited)", "wikibooks_edited", REPORT_SUM, "wikibooks_edited", CONTENT, gettext_noop("# Wikibooks edited")),
+    Dimension("Wikisource (created)", "wikisource_created", REPORT_SUM, "wikisource_created", CONTENT, gettext_noop("# Wikisource created")),
+    Dimension("Wikisource (edited)", "wikisource_edited", REPORT_SUM, "wikisource_edited", CONTENT, gettext_noop("# Wikisource edited")),
+    Dimension("Wikinews (created)", "wikinews_created", REPORT_SUM, "wikinews_created", CONTENT, gettext_noop("# Wikinews created")),
+    Dimension("Wikinews (edited)", "wikinews_edited", REPORT_SUM, "wikinews_edited", CONTENT, gettext_noop("# Wikinews edited")),
+    Dimension("Wikiquote (created)", "wikiquote_created", REPORT_SUM, "wikiquote_created", CONTENT, gettext_noop("# Wikiquote created")),
+    Dimension("Wikiquote (edited)", "wikiquote_edited", REPORT_SUM, "wikiquote_edited", CONTENT, gettext_noop("# Wikiquote edited")),
+    Dimension("Wiktionary (created)", "wiktionary_created", REPORT_SUM, "wiktionary_created", CONTENT, gettext_noop("# Wiktionary created")),
+    Dimension("Wiktionary (edited)", "wiktionary_edited", REPORT_SUM, "wiktionary_edited", CONTENT, gettext_noop("# Wiktionary edited")),
+    Dimension("Wikivoyage (created)", "wikivoyage_created", REPORT_SUM, "wikivoyage_created", CONTENT, gettext_noop("# Wikivoyage created")),
+    Dimension("Wikivoyage (edited)", "wikivoyage_edited", REPORT_SUM, "wikivoyage_edited", CONTENT, gettext_noop("# Wikivoyage edited")),
+    Dimension("Wikispecies (created)", "wikispecies_created", REPORT_SUM, "wikispecies_created", CONTENT, gettext_noop("# Wikispecies created")),
+    Dimension("Wikispecies (edited)", "wikispecies_edited", REPORT_SUM, "wikispecies_edited", CONTENT, gettext_noop("# Wikispecies edited")),
+    Dimension("MetaWiki (created)", "metawiki_created", REPORT_SUM, "metawiki_created", CONTENT, gettext_noop("# Metawiki created")),
+    Dimension("MetaWiki (edited)", "metawiki_edited", REPORT_SUM, "metawiki_edited", CONTENT, gettext_noop("# Metawiki edited")),
+    Dimension("MediaWiki (created)", "mediawiki_created", REPORT_SUM, "mediawiki_created", CONTENT, gettext_noop("# MediaWiki created")),
+    Dimension("MediaWiki (edited)", "mediawiki_edited", REPORT_SUM, "mediawiki_edited", CONTENT, gettext_noop("# MediaWiki edited")),
+    Dimension("Wikifunctions (created)", "wikifunctions_created", REPORT_SUM, "wikifunctions_created", CONTENT, gettext_noop("# Wikifunctions created")),
+    Dimension("Wikifunctions (edited)", "wikifunctions_edited", REPORT_SUM, "wikifunctions_edited", CONTENT, gettext_noop("# Wikifunctions edited")),
+    Dimension("Incubator (created)", "incubator_created", REPORT_SUM, "incubator_created", CONTENT, gettext_noop("# Incubator created")),
+    Dimension("Incubator (edited)", "incubator_edited", REPORT_SUM, "incubator_edited", CONTENT, gettext_noop("# Incubator edited")),
+    # Community metrics
+    Dimension("Number of participants", "number_of_participants", REPORT_SUM, "participants", COMMUNITY, gettext_noop("Number of participants")),
+    Dimension("Number of feedbacks", "number_of_feedbacks", REPORT_SUM, "feedbacks", COMMUNITY, gettext_noop("Number of feedbacks")),
+    Dimension("Number of editors", "number_of_editors", DISTINCT_COUNT, "editors", COMMUNITY, gettext_noop("Number of editors")),
+    Dimension("Number of editors retained", "number_of_editors_retained", DISTINCT_COUNT, "editors", COMMUNITY, gettext_noop("Number of editors retained"), retained("editors")),
+    Dimension("Number of new editors", "number_of_new_editors", DISTINCT_COUNT, "editors", COMMUNITY, gettext_noop("Number of new editors"), new_editor),
+    Dimension("Number of organizers", "number_of_organizers", DISTINCT_COUNT, "organizers", COMMUNITY, gettext_noop("Number of organizers")),
+    Dimension("Number of organizers retained", "number_of_organizers_retained", DISTINCT_COUNT, "organizers", COMMUNITY, gettext_noop("Number of organizers retained"), retained("organizers")),
+    Dimension("Number of new organizers", "number_of_new_organizers", DISTINCT_COUNT, "organizers", COMMUNITY, gettext_noop("Number of new organizers"), new_organizer),
+    Dimension("Number of partnerships activated", "number_of_partnerships_activated", DISTINCT_COUNT, "partners_activated", COMMUNITY, gettext_noop("Number of partnerships activated")),
+    Dimension("Number of new partnerships", "number_of_new_partnerships", OPERATION_SUM, "number_of_new_partnerships", COMMUNITY, gettext_noop("Number of new partnerships")),
+    Dimension("Number of resources", "number_of_resources", OPERATION_SUM, "number_of_resources", OTHER, gettext_noop("Number of resources")),
+    Dimension("Number of events", "number_of_events", OPERATION_SUM, "number_of_events", OTHER, gettext_noop("Number of events")),
+    # Financial metrics
+    Dimension("Number of donors", "number_of_donors", REPORT_SUM, "donors", FINANCIAL, gettext_noop("Number of donors")),
+    Dimension("Number of submissions", "number_of_submissions", REPORT_SUM, "submissions", FINANCIAL, gettext_noop("Number of submissions")),
+    # Communication metrics
+    Dimension("Number of new followers", "number_of_new_followers", OPERATION_SUM, "number_of_new_followers", COMMUNICATION, gettext_noop("Number of new followers")),
+    Dimension("Number of mentions", "number_of_mentions", OPERATION_SUM, "number_of_mentions", COMMUNICATION, gettext_noop("Number of mentions")),
+    Dimension("Number of community communications", "number_of_community_communications", OPERATION_SUM, "number_of_community_communications", COMMUNICATION, gettext_noop("Number of community communications")),
+    Dimension("Number of people reached through social media", "number_of_people_reached_through_social_media", OPERATION_SUM, "number_of_people_reached_through_social_media", COMMUNICATION, gettext_noop("Number of people reached through social media")),
+    # Other metrics
+    Dimension("Occurrence", "boolean_type", EXISTS, "metrics_related", OTHER, gettext_noop("Occurrence")),
+)
+
+DIMENSIONS_BY_NAME = {dimension.name: dimension for dimension in DIMENSIONS}
+DIMENSION_NAMES = tuple(DIMENSIONS_BY_NAME)
+CONTENT_DIMENSIONS = tuple(
+    dimension for dimension in DIMENSIONS if dimension.group == CONTENT
+)
+
+
+def get_dimensions(names=None):
+    """
+    Returns the dimensions with the given names, in the order of the registry, or all of
+    them if no names are given.
+    """
+    if names is None:
+        return DIMENSIONS
+    names = set(names)
+    return tuple(dimension for dimension in DIMENSIONS if dimension.name in names)
@@ -1,5 +1,17 @@
 import re
 import urllib.parse as ur
+from functools import lru_cache
+
+from django.conf import settings
+
+# Number of results of wikify_link, dewikify_url and render_reference kept in memory by
+# each of them. The caches are sized when the module is imported, so changing the setting
+# afterwards (e.g. with override_settings) has no effect.
+LINK_CACHE_SIZE = settings.LINK_CACHE_SIZE
+
+REFERENCE_PATTERN = re.compile(r'<ref name="sara-(\d+)">(.*?)</ref>')
+LINK_PATTERN = re.compile(r"(\[\[.*?\]\]|\[.*?\])")
+BULLETED_LIST_PATTERN = re.compile(r"(.*)\{\{bulleted list\|(.*)\}\}(.*)")
 
 AFFILIATES = {
     r"https://am.wikimedia.org/wiki/(.*)": "wmam",
@@ -287,18 +299,118 @@ INVERTED_PATTERNS = (
 )
 
 
+def index_url_patterns(patterns):
+    """
+    Compiles the URL patterns and indexes them by the host they match. Patterns whose host
+    has a group, like https://(.*).wikipedia.org/, are indexed apart by the host suffix
+    following the group. Each rule keeps its position in patterns, which decides between
+    the rules matching the same link.
+    """
+    hosts = {}
+    wildcard_hosts = {}
+    for position, (pattern, prefix) in enumerate(patterns.items()):
+        rule = (position, re.compile(pattern), prefix)
+        host = pattern.removeprefix("https://").split("/", 1)[0]
+        if "(" in host:
+            suffix = host.removeprefix("(.*).").replace("(", "").replace(")", "")
+            wildcard_hosts.setdefault(suffix, []).append(rule)
+        else:
+            hosts.setdefault(host, []).append(rule)
+    return hosts, wildcard_hosts
+
+
+def index_inverted_patterns(patterns):
+    """
+    Compiles the inverted patterns and indexes them by the interwiki prefix they match,
+    i.e. the text before the first colon.
+    """
+    prefixes = {}
+    for pattern, url in patterns.items():
+        prefix = pattern.removeprefix("^").split(":", 1)[0]
+        prefixes.setdefault(prefix, []).append((re.compile(pattern), url))
+    return prefixes
+
+
+URL_HOSTS, URL_WILDCARD_HOSTS = index_url_patterns(PATTERNS)
+INVERTED_PREFIXES = index_inverted_patterns(INVERTED_PATTERNS)
+
+
+def refresh_link_rules():
+    """
+    Rebuilds the indexes of the rules from PATTERNS and INVERTED_PATTERNS and empties the
+    caches of the links and the references. Must be called whenever the tables change.
+    """
+    global URL_HOSTS, URL_WILDCARD_HOSTS, INVERTED_PREFIXES
+    URL_HOSTS, URL_WILDCARD_HOSTS = index_url_patterns(PATTERNS)
+    INVERTED_PREFIXES = index_inverted_patterns(INVERTED_PATTERNS)
+    wikify_link.cache_clear()
+    dewikify_url.cache_clear()
+    render_reference.cache_clear()
+
+
+def get_link_cache_stats():
+    """
+    Returns the hits, misses, hit rate and size of the caches of wikify_link, dewikify_url
+    and render_reference since the process started or the rules were refreshed.
+    """
+    rows = []
+    for function in (wikify_link, dewikify_url, render_reference):
+        info = function.cache_info()
+        requests = info.hits + info.misses
+        rows.append(
+            {
+                "name": function.__name__,
+                "hits": info.hits,
+                "misses": info.misses,
+                "requests": requests,
+                "hit_rate": info.hits / requests if requests else 0,
+                "size": info.currsize,
+                "max_size": info.maxsize,
+            }
+        )
+    return rows
+
+
+def get_url_rules(link):
+    """
+    Returns the rules of PATTERNS that can match the link, in their order in PATTERNS: the
+    ones of its host and the ones of the wildcard hosts it is a subdomain of.
+    """
+    if not link.startswith("https://"):
+        return []
+
+    host = link.removeprefix("https://").split("/", 1)[0]
+    rules = list(URL_HOSTS.get(host, []))
+    labels = host.split(".")
+    for index in range(1, len(labels)):
+        rules += URL_WILDCARD_HOSTS.get(".".join(labels[index:]), [])
+    return sorted(rules, key=lambda rule: rule[0])
+
+
 def process_all_references(input_string):
     """
     Gets the input_string of the done activities of a metric and dewikify all the references listed.
     All the references are in the format <ref name="sara-123">XYZ</ref>.
+    Each reference is returned once, even if the report is referenced more than once.
+    """
+    return list(collect_references(input_string, {}).values())
+
+
+def collect_references(wikitext, references, rendered=None):
     """
-    updated_references = []
-    re.sub(
-        r'<ref name="sara-\d+">.*?</ref>',
-        lambda match: unwikify_link(match, updated_references),
-        input_string,
-    )
-    return updated_references
+    Walks the wikitext once and adds to references, a dict keyed by the report ID, the
+    html element of each reference not in it yet. Sharing the dict between calls renders
+    every report once however many metrics reference it. The elements found in rendered,
+    a dict keyed by the report ID as well, are used instead of rendering them.
+    """
+    rendered = rendered or {}
+    for match in REFERENCE_PATTERN.finditer(wikitext):
+        ref_id, ref_content = match.groups()
+        if ref_id not in references:
+            references[ref_id] = rendered.get(ref_id) or render_reference(
+                ref_id, ref_content
+            )
+    return references
 
 
 def unwikify_link(match, updated_references):
@@ -312,30 +424,34 @@ def unwikify_link(match, updated_references):
     match_ref = re.search(r'<ref name="sara-(\d+)">(.*)</ref>', link)
 
     if match_ref:
-        ref_id = match_ref.group(1)
-        ref_content = match_ref.group(2)
-        updated_content = replace_with_links(
-            ref_content
-        )  # Process the ref tag inner part
-        if "bulleted list" in updated_content:
-            bl_match = re.match(r"(.*)\{\{bulleted list\|(.*)\}\}(.*)", updated_content)
-            if bl_match:
-                bullet_items = bl_match.group(2).split("|")
-                # Make the concatenation of the bulleted list as an HTML element
-                updated_content = (
-                    bl_match.group(1)
-                    + "<ul>\n"
-                    + "\n".join(f"<li>{item}</li>" for item in bullet_items)
-                    + "\n</ul>"
-                    + bl_match.group(3)
-                )
-        updated_link = f'<li id="sara-{ref_id}">{ref_id}. {updated_content}</li>'
-
+        updated_link = render_reference(match_ref.group(1), match_ref.group(2))
         updated_references.append(updated_link)
         return updated_link
     return link
 
 
+@lru_cache(maxsize=LINK_CACHE_SIZE)
+def render_reference(ref_id, ref_content):
+    """
+    Makes the content of the reference of a report into a html element. The results are
+    cached by report ID and content, so a report edited since is rendered again.
+    """
+    updated_content = replace_with_links(ref_content)  # Process the ref tag inner part
+    if "bulleted list" in updated_content:
+        bl_match = BULLETED_LIST_PATTERN.match(updated_content)
+        if bl_match:
+            bullet_items = bl_match.group(2).split("|")
+            # Make the concatenation of the bulleted list as an HTML element
+            updated_content = (
+                bl_match.group(1)
+                + "<ul>\n"
+                + "\n".join(f"<li>{item}</li>" for item in bullet_items)
+                + "\n</ul>"
+                + bl_match.group(3)
+            )
+    return f'<li id="sara-{ref_id}">{ref_id}. {updated_content}</li>'
+
+
 def replace_with_links(input_string):
     def replace(match):
         substring = match.group(0)
@@ -376,13 +492,14 @@ def replace_with_links(input_string):
                 link = friendly = content
             return f'<a target="_blank" href="{link}">{friendly}</a>'
 
-    result = re.sub(r"(\[\[.*?\]\]|\[.*?\])", replace, input_string)
+    result = LINK_PATTERN.sub(replace, input_string)
     return result
 
 
+@lru_cache(maxsize=LINK_CACHE_SIZE)
 def dewikify_url(link, meta=False):
-    for pattern, prefix in INVERTED_PATTERNS.items():
-        match = re.match(pattern, link)
+    for pattern, prefix in INVERTED_PREFIXES.get(link.split(":", 1)[0], []):
+        match = pattern.match(link)
         if match:
             number_of_groups = len(match.groups())
             lang = ""
@@ -411,6 +528,7 @@ def dewikify_url(link, meta=False):
 # 1. receive and wikify the links field (deal with external and internal links, including from mapped projects)
 # 2. create the reference text
 # ======================================================================================================================
+@lru_cache(maxsize=LINK_CACHE_SIZE)
 def wikify_link(link, friendly_name=None):
     """
     Receives a URL link and tries to wikify it, based on the patterns and correspondences.
@@ -419,9 +537,10 @@ def wikify_link(link, friendly_name=None):
     2. The link is a mapped URL and from a non-language based Wikimedia project, in which case, it returns the link as an internal wikitext link, i.e. [[project:page|page]]
     3. The link is a mapped URL and from a language based Wikimedia project, in which case, it returns the link as an internal wikitext link, i.e. [[project:language:page|page]]
     4. The link is a mapped URL and from toolforge, in which case, it returns the link as an internal wikitext link, i.e. [[toolforge:project:page|page]]
+    The results are cached, up to LINK_CACHE_SIZE links.
     """
-    for pattern, prefix in PATTERNS.items():
-        match = re.match(pattern, link)
+    for _position, pattern, prefix in get_url_rules(link):
+        match = pattern.match(link)
         if match:
             number_of_groups = len(match.groups())
             project = ""
@@ -0,0 +1,335 @@
+import datetime
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from metrics.aggregation import refresh_metric_contributions
+from metrics.dimensions import DIMENSIONS, EXISTS
+from metrics.link_utils import (
+    build_wiki_ref,
+    dewikify_url,
+    render_reference,
+    replace_with_links,
+    wikify_link,
+)
+from metrics.models import Activity, Area, Metric, Project
+from metrics.views import (
+    find_empty_metric_associations,
+    get_metrics_and_aggregate_per_project,
+    get_results_for_timespan,
+    get_timespan_array,
+    metrics_reports,
+)
+from report.models import Editor, OperationReport, Organizer, Partner, Report
+from report.views import export_report
+from users.models import TeamArea
+
+BATCH_SIZE = 1000
+
+# Links of the reports, a mix of the kinds of URLs wikify_link rewrites and plain ones
+BENCH_LINKS = [
+    "https://pt.wikipedia.org/wiki/Bench_article_{}",
+    "https://commons.wikimedia.org/wiki/File:Bench_{}.jpg",
+    "https://www.wikidata.org/wiki/Q{}",
+    "https://meta.wikimedia.org/wiki/Bench/{}",
+    "https://br.wikimedia.org/wiki/Bench_{}",
+    "https://bench-tool.toolforge.org/{}",
+    "https://doi.org/10.1000/{}",
+    "https://example.org/bench/{}",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic dataset and time the heaviest metrics and export "
+        "code paths on it. The dataset is rolled back at the end, so the database is left "
+        "untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Random seed of the dataset")
+        parser.add_argument("--projects", type=int, default=5, help="Number of projects")
+        parser.add_argument("--metrics", type=int, default=300, help="Number of metrics")
+        parser.add_argument("--reports", type=int, default=20000, help="Number of reports")
+        parser.add_argument("--editors", type=int, default=3000, help="Number of editors")
+        parser.add_argument("--organizers", type=int, default=300, help="Number of organizers")
+        parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each benchmark")
+        parser.add_argument("--output", help="File the JSON results are written to instead of stdout")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("sara_bench must be run against a SQLite database")
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            dataset = generate_dataset(random.Random(options["seed"]), options)
+            generation_time = time.perf_counter() - start
+
+            results = {
+                "seed": options["seed"],
+                "dataset": {
+                    "seconds": round(generation_time, 3),
+                    "projects": Project.objects.count(),
+                    "metrics": Metric.objects.count(),
+                    "reports": Report.objects.count(),
+                    "operation_reports": OperationReport.objects.count(),
+                    "editors": Editor.objects.count(),
+                    "organizers": Organizer.objects.count(),
+                },
+                "benchmarks": run_benchmarks(dataset, options["repeat"]),
+            }
+            transaction.set_rollback(True)
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+
+def generate_dataset(rng, options):
+    year = datetime.date.today().year
+    user = User.objects.create_superuser(username="sara_bench", password="sara_bench")
+    profile = user.profile
+
+    team_areas = TeamArea.objects.bulk_create(
+        [TeamArea(text=f"Bench team area {i}", code=f"bench_{i}") for i in range(5)]
+    )
+    projects = Project.objects.bulk_create(
+        [
+            Project(
+                text=f"Bench project {i}",
+                current_poa=i == 0,
+                main_funding=i == 1,
+                counts_for_main_funding=i > 1 and rng.random() < 0.5,
+            )
+            for i in range(options["projects"])
+        ]
+    )
+    areas = Area.objects.bulk_create(
+        [Area(text=f"Bench area {i}") for i in range(4 * len(projects))]
+    )
+    project_of_area = {area.pk: projects[i % len(projects)] for i, area in enumerate(areas)}
+    Area.project.through.objects.bulk_create(
+        [
+            Area.project.through(area_id=area_id, project_id=project.pk)
+            for area_id, project in project_of_area.items()
+        ]
+    )
+    activities = Activity.objects.bulk_create(
+        [
+            Activity(
+                text=f"Bench activity {i}",
+                code=f"B{i}",
+                area=areas[i % len(areas)],
+                area_responsible=rng.choice(team_areas),
+            )
+            for i in range(5 * len(areas))
+        ]
+    )
+
+    metrics = []
+    for i in range(options["metrics"]):
+        metric = Metric(text=f"Bench metric {i}", activity=rng.choice(activities))
+        for dimension in rng.sample(DIMENSIONS, rng.randint(1, 3)):
+            if dimension.kind == EXISTS:
+                setattr(metric, dimension.goal_field, True)
+            else:
+                setattr(metric, dimension.goal_field, rng.randint(1, 100))
+        metric.is_operation = rng.random() < 0.2
+        metrics.append(metric)
+    metrics = Metric.objects.bulk_create(metrics)
+    Metric.project.through.objects.bulk_create(
+        [
+            Metric.project.through(
+                metric_id=metric.pk,
+                project_id=project_of_area[metric.activity.area_id].pk,
+            )
+            for metric in metrics
+        ]
+    )
+
+    editors = Editor.objects.bulk_create(
+        [
+            Editor(
+                username=f"Bench editor {i}",
+                account_creation_date=datetime.datetime(
+                    year - rng.randint(0, 5), rng.randint(1, 12), rng.randint(1, 28)
+                ),
+                retained=rng.random() < 0.3,
+            )
+            for i in range(options["editors"])
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    organizers = Organizer.objects.bulk_create(
+        [
+            Organizer(name=f"Bench organizer {i}", retained=rng.random() < 0.3)
+            for i in range(options["organizers"])
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    partners = Partner.objects.bulk_create(
+        [Partner(name=f"Bench partner {i}") for i in range(50)]
+    )
+
+    reports = []
+    for i in range(options["reports"]):
+        initial_date = datetime.date(year, 1, 1) + datetime.timedelta(days=rng.randint(0, 360))
+        report = Report(
+            created_by=profile,
+            modified_by=profile,
+            activity_associated=rng.choice(activities),
+            area_responsible=rng.choice(team_areas),
+            initial_date=initial_date,
+            end_date=initial_date + datetime.timedelta(days=rng.randint(0, 4)),
+            description=f"Bench report {i}",
+            links="\r\n".join(
+                link.format(i) for link in rng.sample(BENCH_LINKS, rng.randint(1, 3))
+            ),
+            partial_report=rng.random() < 0.1,
+            participants=rng.randint(0, 50),
+            feedbacks=rng.randint(0, 10),
+            donors=rng.randint(0, 5),
+            submissions=rng.randint(0, 5),
+        )
+        for dimension in rng.sample(DIMENSIONS[:30], 3):
+            setattr(report, dimension.column, rng.randint(0, 100))
+        reports.append(report)
+    reports = Report.objects.bulk_create(reports, batch_size=BATCH_SIZE)
+
+    metrics_related = []
+    report_editors = []
+    report_organizers = []
+    report_partners = []
+    operation_reports = []
+    for report in reports:
+        related = rng.sample(metrics, rng.randint(1, 3))
+        for metric in related:
+            metrics_related.append(Report.metrics_related.through(report_id=report.pk, metric_id=metric.pk))
+        for editor in rng.sample(editors, min(len(editors), rng.randint(0, 8))):
+            report_editors.append(Report.editors.through(report_id=report.pk, editor_id=editor.pk))
+        for organizer in rng.sample(organizers, min(len(organizers), rng.randint(0, 2))):
+            report_organizers.append(Report.organizers.through(report_id=report.pk, organizer_id=organizer.pk))
+        if rng.random() < 0.1:
+            report_partners.append(Report.partners_activated.through(report_id=report.pk, partner_id=rng.choice(partners).pk))
+        if rng.random() < 0.2:
+            operation_reports.append(
+                OperationReport(
+                    report=report,
+                    metric=related[0],
+                    number_of_events=rng.randint(0, 5),
+                    number_of_resources=rng.randint(0, 5),
+                    number_of_new_partnerships=rng.randint(0, 2),
+                    number_of_people_reached_through_social_media=rng.randint(0, 1000),
+                    number_of_new_followers=rng.randint(0, 100),
+                    number_of_mentions=rng.randint(0, 20),
+                    number_of_community_communications=rng.randint(0, 10),
+                )
+            )
+    Report.metrics_related.through.objects.bulk_create(metrics_related, batch_size=BATCH_SIZE)
+    Report.editors.through.objects.bulk_create(report_editors, batch_size=BATCH_SIZE)
+    Report.organizers.through.objects.bulk_create(report_organizers, batch_size=BATCH_SIZE)
+    Report.partners_activated.through.objects.bulk_create(report_partners, batch_size=BATCH_SIZE)
+    OperationReport.objects.bulk_create(operation_reports, batch_size=BATCH_SIZE)
+
+    report_ids = [report.pk for report in reports]
+    for index in range(0, len(report_ids), BATCH_SIZE):
+        refresh_metric_contributions(
+            Report.objects.filter(pk__in=report_ids[index : index + BATCH_SIZE])
+        )
+
+    return {
+        "user": user,
+        "metric": metrics[0],
+        "year": year,
+        "links": [(report.pk, report.links) for report in reports],
+    }
+
+
+def run_benchmarks(dataset, repeat):
+    factory = RequestFactory()
+
+    def request(path):
+        request = factory.get(path)
+        request.user = dataset["user"]
+        return request
+
+    metric = dataset["metric"]
+    year = dataset["year"]
+    links = dataset["links"]
+    references = [build_wiki_ref(report_links, pk) for pk, report_links in links]
+    benchmarks = {
+        "get_metrics_and_aggregate_per_project": lambda: get_metrics_and_aggregate_per_project(
+            project_query=Q(active_status=True)
+        ),
+        "get_results_for_timespan": lambda: get_results_for_timespan(
+            get_timespan_array("trimester"),
+            metric_query=Q(project__current_poa=True),
+            report_query=Q(),
+            with_goal=True,
+        ),
+        "metrics_reports": lambda: metrics_reports(
+            request(f"/metrics/{metric.pk}/reports"), metric.pk
+        ),
+        "export_report": lambda: export_uncached(request(f"/report/export/{year}"), year),
+        "find_empty_metric_associations": lambda: list(
+            find_empty_metric_associations(partial=True)
+        ),
+        "build_wiki_ref": lambda: [
+            build_wiki_ref(report_links, pk) for pk, report_links in links
+        ],
+        "replace_with_links": lambda: [
+            replace_with_links(reference) for reference in references
+        ],
+    }
+    # The links are cached, so every run of the link benchmarks starts from empty caches
+    setups = {
+        "build_wiki_ref": clear_link_caches,
+        "replace_with_links": clear_link_caches,
+    }
+    return {
+        name: measure(function, repeat, setups.get(name))
+        for name, function in benchmarks.items()
+    }
+
+
+def clear_link_caches():
+    wikify_link.cache_clear()
+    dewikify_url.cache_clear()
+    render_reference.cache_clear()
+
+
+def export_uncached(request, year):
+    # The yearly exports are cached on disk, so each run builds them in a new directory,
+    # and in the request itself rather than in an export job
+    with tempfile.TemporaryDirectory() as directory:
+        with override_settings(ENABLE_EXPORT_JOBS=False, EXPORT_ARTIFACTS_ROOT=directory):
+            return b"".join(export_report(request, year=year).streaming_content)
+
+
+def measure(function, repeat, setup=None):
+    timings = []
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return {
+        "seconds_median": round(statistics.median(timings), 4),
+        "seconds_min": round(min(timings), 4),
+        "queries": len(queries.captured_queries),
+    }
@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+_lock = threading.Lock()
+_samples = defaultdict(
+    lambda: deque(maxlen=settings.PERFORMANCE_WINDOW_SIZE)
+)
+_requests = Counter()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting the queries run and the time spent on them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+class PerformanceMiddleware:
+    """
+    Records, per URL name, the latency, the number of SQL queries and the SQL time of the
+    requests, keeping the last PERFORMANCE_WINDOW_SIZE requests of each URL in memory.
+    Enabled by ENABLE_PERFORMANCE_MONITORING; the results are shown at /_perf.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+
+        def record():
+            if request.resolver_match:
+                record_request(
+                    request.resolver_match.view_name,
+                    time.perf_counter() - start,
+                    recorder.count,
+                    recorder.time,
+                )
+
+        if response.streaming and not response.is_async:
+            # The queries of a streaming response run while its content is consumed
+            response.streaming_content = RecordedStream(
+                response.streaming_content, recorder, record
+            )
+        else:
+            record()
+        return response
+
+
+class RecordedStream:
+    """
+    Content of a streaming response, produced with the recorder active. The request is
+    recorded when the response is closed, after its content has been sent.
+    """
+
+    def __init__(self, content, recorder, record):
+        self.content = iter(content)
+        self.recorder = recorder
+        self.record = record
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with recording(self.recorder):
+            return next(self.content)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.record()
+
+
+@contextmanager
+def recording(recorder):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+def record_request(view_name, latency, query_count, query_time):
+    with _lock:
+        _samples[view_name].append((latency, query_count, query_time))
+        _requests[view_name] += 1
+
+
+def clear_requests():
+    with _lock:
+        _samples.clear()
+        _requests.clear()
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile of the sorted values.
+    """
+    if not values:
+        return 0
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def get_performance_summary():
+    """
+    Returns one row per URL name with its request count and, over the rolling window, the
+    p50/p95 latency and SQL time in milliseconds and the p50/p95/max number of queries.
+    Views whose queries exceeded PERFORMANCE_QUERY_BUDGET are flagged as over budget.
+    """
+    budget = settings.PERFORMANCE_QUERY_BUDGET
+    with _lock:
+        samples = {view_name: list(window) for view_name, window in _samples.items()}
+        requests = dict(_requests)
+
+    rows = []
+    for view_name in sorted(samples):
+        latencies = sorted(sample[0] * 1000 for sample in samples[view_name])
+        query_counts = sorted(sample[1] for sample in samples[view_name])
+        query_times = sorted(sample[2] * 1000 for sample in samples[view_name])
+        rows.append(
+            {
+                "view_name": view_name,
+                "requests": requests[view_name],
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "queries_p50": percentile(query_counts, 50),
+                "queries_p95": percentile(query_counts, 95),
+                "queries_max": query_counts[-1],
+                "sql_time_p50": percentile(query_times, 50),
+                "sql_time_p95": percentile(query_times, 95),
+                "over_budget": query_counts[-1] > budget,
+            }
+        )
+    return rows
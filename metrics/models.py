@@ -1,7 +1,9 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
+from metrics.dimensions import DIMENSIONS
 from users.models import TeamArea
 
 
@@ -186,6 +188,8 @@ class Metric(models.Model):
     Methods:
         __str__(): Returns the metric title.
         clean(): Validates that `text` is not empty.
+        goal_vector: Goals of the metric, aligned to DIMENSIONS.
+        nonzero_goals: (dimension, goal) pairs of the dimensions with a goal.
     """
 
     # ==================================================================================================================
@@ -526,3 +530,27 @@ class Metric(models.Model):
     def clean(self):
         if not self.text:
             raise ValidationError(_("You need to fill the text field"))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.clear_goal_cache()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.clear_goal_cache()
+
+    @cached_property
+    def goal_vector(self):
+        return tuple(getattr(self, dimension.goal_field) for dimension in DIMENSIONS)
+
+    @cached_property
+    def nonzero_goals(self):
+        return tuple(
+            (dimension.name, goal)
+            for dimension, goal in zip(DIMENSIONS, self.goal_vector)
+            if goal
+        )
+
+    def clear_goal_cache(self):
+        self.__dict__.pop("goal_vector", None)
+        self.__dict__.pop("nonzero_goals", None)
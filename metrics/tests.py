@@ -1,10 +1,15 @@
+import json
 import re
+import tempfile
 from datetime import date, datetime, timedelta
+from io import StringIO
 from unittest.mock import MagicMock, patch
 
 from django.conf import settings
 from django.contrib.auth.models import Permission
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.db.models import Q
 from django.db.utils import IntegrityError
 from django.test import RequestFactory, TestCase, override_settings
@@ -12,13 +17,28 @@ from django.urls import reverse
 from django.utils.translation import activate
 from django.utils.translation import gettext_lazy as _
 
+from metrics.aggregation import (
+    get_done_for_metrics,
+    get_done_for_timespans,
+    get_reports_for_funding,
+    refresh_metric_contributions,
+)
+from metrics.cache import get_cache_stats
+from metrics.dimensions import DIMENSION_NAMES
 from metrics.link_utils import (
+    PATTERNS,
     build_wiki_ref,
+    collect_references,
     dewikify_url,
+    get_link_cache_stats,
+    get_url_rules,
     process_all_references,
+    refresh_link_rules,
     replace_with_links,
     unwikify_link,
+    wikify_link,
 )
+from metrics.middleware import clear_requests, get_performance_summary, percentile
 from metrics.models import Activity, Area, Metric, Project
 from metrics.templatetags.metricstags import (
     bool_yesno,
@@ -29,16 +49,32 @@ from metrics.templatetags.metricstags import (
 )
 from metrics.utils import render_to_pdf
 from metrics.views import (
+    build_list_values,
     build_wiki_ref_for_reports,
+    build_wiki_refs_for_metrics,
+    describe_empty_metric_associations,
+    find_empty_metric_associations,
+    get_done_for_report,
+    get_empty_metric_associations,
+    get_goal_and_done_for_metric,
+    get_goal_for_metric,
+    get_cached_metrics_and_aggregate_per_project,
     get_metrics_and_aggregate_per_project,
+    get_metrics_with_relevant_dimensions,
     get_results_for_timespan,
+    get_results_for_timespan_by_area,
     get_timespan_array,
+    is_there_a_final_report,
     show_metrics_for_specific_project,
 )
 from report.models import (
     Direction,
     Editor,
+    Funding,
+    MetricContribution,
     OperationReport,
+    Organizer,
+    Partner,
     Report,
     StrategicLearningQuestion,
 )
@@ -121,6 +157,45 @@ class MetricModelTests(TestCase):
         metric = Metric.objects.create(text="Metric3", activity=self.activity)
         metric.full_clean()
 
+    def test_metric_goal_vector_is_aligned_to_the_goal_dimensions(self):
+        self.metric.wikifunctions_created = 4
+        self.metric.save()
+
+        self.assertEqual(len(self.metric.goal_vector), len(DIMENSION_NAMES))
+        self.assertEqual(
+            self.metric.goal_vector[DIMENSION_NAMES.index("Wikifunctions (created)")], 4
+        )
+        self.assertEqual(
+            self.metric.nonzero_goals, (("Wikifunctions (created)", 4),)
+        )
+
+    def test_metric_goals_are_recomputed_after_saving(self):
+        self.assertEqual(self.metric.nonzero_goals, ())
+
+        self.metric.number_of_events = 2
+        self.metric.boolean_type = True
+        self.metric.save()
+
+        self.assertEqual(
+            self.metric.nonzero_goals, (("Number of events", 2), ("Occurrence", True))
+        )
+
+    def test_metric_goals_are_recomputed_after_refreshing(self):
+        self.assertEqual(self.metric.nonzero_goals, ())
+
+        Metric.objects.filter(pk=self.metric.pk).update(number_of_donors=3)
+        self.metric.refresh_from_db()
+
+        self.assertEqual(self.metric.nonzero_goals, (("Number of donors", 3),))
+
+    def test_goal_and_done_dimensions_have_the_same_names(self):
+        reports = Report.objects.none()
+
+        self.assertEqual(
+            set(get_goal_for_metric(self.metric)),
+            set(get_done_for_report(reports, self.metric)),
+        )
+
 
 class MetricViewsTests(TestCase):
     def setUp(self):
@@ -443,12 +518,11 @@ class PreparePDFViewTests(TestCase):
         self.project = Project.objects.create(text="Main Project", main_funding=True)
 
     @patch("metrics.views.get_results_for_timespan")
-    @patch("metrics.views.process_all_references")
-    def test_prepare_pdf_view_success(self, mock_process_refs, mock_get_results):
+    @patch("metrics.views.collect_references")
+    def test_prepare_pdf_view_success(self, mock_collect_refs, mock_get_results):
         mock_get_results.return_value = [
             {"metric": "Test Metric", "done": [1, 2, 3, 4, 10, "sara-123 sara-456", 20]}
         ]
-        mock_process_refs.return_value = ["Reference 1", "Reference 2"]
         response = self.client.get(reverse("metrics:wmf_report"))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "metrics/wmf_report.html")
@@ -841,6 +915,21 @@ class MetricFunctionsTests(TestCase):
         response = build_wiki_ref_for_reports(self.metric_1)
         self.assertEqual(response, reference_text)
 
+    def test_build_wiki_refs_for_metrics_reads_every_metric_in_one_query(self):
+        self.report_1.metrics_related.add(self.metric_1, self.metric_2)
+        self.report_1.reference_text = "Formatted reference"
+        self.report_1.save()
+
+        with self.assertNumQueries(1):
+            refs = build_wiki_refs_for_metrics([self.metric_1.id, self.metric_2.id])
+        self.assertEqual(
+            refs,
+            {
+                self.metric_1.id: "Formatted reference",
+                self.metric_2.id: "Formatted reference",
+            },
+        )
+
     def test_get_results_for_timespan_with_metrics_goals(self):
         self.report_1.metrics_related.add(self.metric_1)
         self.report_1.save()
@@ -993,6 +1082,50 @@ class ReferencesFunctionsTests(TestCase):
         self.assertIn("<li>item1</li>", result[0])
         self.assertIn("<li>item2</li>", result[0])
 
+    def test_repeated_references_are_rendered_once(self):
+        refresh_link_rules()
+        input_string = (
+            '<ref name="sara-1">[[Link A]]</ref>'
+            '<ref name="sara-2">[https://example.org Example]</ref>'
+            '<ref name="sara-1">[[Link A]]</ref>'
+        )
+
+        result = process_all_references(input_string)
+
+        self.assertEqual(len(result), 2)
+        self.assertIn('id="sara-1"', result[0])
+        self.assertIn('id="sara-2"', result[1])
+        stats = {row["name"]: row for row in get_link_cache_stats()}
+        self.assertEqual(stats["render_reference"]["misses"], 2)
+
+    def test_collect_references_shares_the_references_between_wikitexts(self):
+        refresh_link_rules()
+        references = {}
+
+        collect_references('<ref name="sara-1">[[Link A]]</ref>', references)
+        collect_references(
+            '<ref name="sara-1">[[Link A]]</ref><ref name="sara-3">Text</ref>', references
+        )
+
+        self.assertEqual(list(references), ["1", "3"])
+        self.assertEqual(references["3"], '<li id="sara-3">3. Text</li>')
+        stats = {row["name"]: row for row in get_link_cache_stats()}
+        self.assertEqual(stats["render_reference"]["misses"], 2)
+        self.assertEqual(stats["render_reference"]["hits"], 0)
+
+    def test_collect_references_uses_the_rendered_references(self):
+        refresh_link_rules()
+        references = collect_references(
+            '<ref name="sara-1">[[Link A]]</ref><ref name="sara-2">Text</ref>',
+            {},
+            {"1": '<li id="sara-1">Stored</li>'},
+        )
+
+        self.assertEqual(references["1"], '<li id="sara-1">Stored</li>')
+        self.assertEqual(references["2"], '<li id="sara-2">2. Text</li>')
+        stats = {row["name"]: row for row in get_link_cache_stats()}
+        self.assertEqual(stats["render_reference"]["misses"], 1)
+
     def test_invalid_reference_format(self):
         input_string = "No ref tags here"
         result = process_all_references(input_string)
@@ -1180,6 +1313,60 @@ class ReferencesFunctionsTests(TestCase):
         )
 
 
+    def test_get_url_rules_returns_only_the_rules_of_the_host(self):
+        rules = get_url_rules("https://www.wikidata.org/wiki/Q42")
+
+        self.assertEqual([prefix for _position, _pattern, prefix in rules], ["d"])
+
+    def test_get_url_rules_includes_the_wildcard_hosts_in_the_order_of_the_patterns(self):
+        rules = get_url_rules("https://mix-n-match.toolforge.org/#/catalog/1")
+        positions = [position for position, _pattern, _prefix in rules]
+
+        self.assertEqual(
+            [prefix for _position, _pattern, prefix in rules], ["toolforge:", "mixnmatch"]
+        )
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(len(get_url_rules("https://example.com/wiki/X")), 0)
+
+    def test_wikify_link_dispatches_on_the_host_of_the_link(self):
+        self.assertEqual(
+            wikify_link("https://www.wikidata.org/wiki/Q42.wikipedia.org/wiki/X"),
+            "[[d:Q42.wikipedia.org/wiki/X|Q42.wikipedia.org/wiki/X]]",
+        )
+        self.assertEqual(
+            wikify_link("https://web.archive.org/web/1/https://en.wikipedia.org/wiki/X"),
+            "[https://web.archive.org/web/1/https://en.wikipedia.org/wiki/X]",
+        )
+        self.assertEqual(
+            wikify_link("https://en.m.wikipedia.org/wiki/X"), "[[w:en.m:X|X]]"
+        )
+
+    def test_wikify_link_results_are_cached(self):
+        refresh_link_rules()
+        link = "https://commons.wikimedia.org/wiki/Category:Birds"
+
+        first = wikify_link(link)
+        second = wikify_link(link)
+
+        stats = {row["name"]: row for row in get_link_cache_stats()}
+        self.assertEqual(first, second)
+        self.assertEqual(stats["wikify_link"]["misses"], 1)
+        self.assertEqual(stats["wikify_link"]["hits"], 1)
+        self.assertEqual(stats["wikify_link"]["hit_rate"], 0.5)
+        self.assertEqual(stats["wikify_link"]["size"], 1)
+
+    def test_refresh_link_rules_applies_the_changes_of_the_patterns(self):
+        link = "https://wiki.example.org/wiki/Page"
+        self.assertEqual(wikify_link(link), f"[{link}]")
+
+        PATTERNS[r"https://wiki.example.org/wiki/(.*)"] = "example"
+        self.addCleanup(refresh_link_rules)
+        self.addCleanup(PATTERNS.pop, r"https://wiki.example.org/wiki/(.*)")
+        refresh_link_rules()
+
+        self.assertEqual(wikify_link(link), "[[example:Page|Page]]")
+        self.assertEqual(get_link_cache_stats()[0]["misses"], 1)
+
 class TagsTests(TestCase):
     def test_categorize_for_0(self):
         result = categorize(0, 100)
@@ -2012,3 +2199,750 @@ class MetricsExportTests(TestCase):
             self.assertEqual(
                 response.content.decode("utf-8"), expected_content.decode("utf-8")
             )
+
+
+class AggregationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.user_profile = UserProfile.objects.get(user=self.user)
+        self.team_area = TeamArea.objects.create(text="Area", code="area")
+        self.main_project = Project.objects.create(text="Main", main_funding=True)
+        self.other_project = Project.objects.create(text="Other")
+        self.area = Area.objects.create(text="Area")
+        self.area.project.add(self.other_project)
+        self.other_activity = Activity.objects.create(text="Other activity")
+        self.activity = Activity.objects.create(text="Activity", area=self.area)
+
+        self.metric_content = Metric.objects.create(
+            text="Content", activity=self.activity, wikipedia_created=10
+        )
+        self.metric_community = Metric.objects.create(
+            text="Community",
+            activity=self.activity,
+            number_of_editors=5,
+            number_of_organizers=2,
+        )
+        self.metric_operation = Metric.objects.create(
+            text="Operation", activity=self.activity, number_of_events=3
+        )
+        self.metric_boolean = Metric.objects.create(
+            text="Boolean", activity=self.activity, boolean_type=True
+        )
+        self.metrics = [
+            self.metric_content,
+            self.metric_community,
+            self.metric_operation,
+            self.metric_boolean,
+        ]
+
+        editor_1 = Editor.objects.create(
+            username="Editor 1", account_creation_date=datetime(2024, 1, 1)
+        )
+        editor_2 = Editor.objects.create(username="Editor 2", retained=True)
+        organizer = Organizer.objects.create(name="Organizer", retained=True)
+        partner = Partner.objects.create(name="Partner")
+
+        self.reports = []
+        for index in range(3):
+            report = Report.objects.create(
+                created_by=self.user_profile,
+                modified_by=self.user_profile,
+                activity_associated=self.activity,
+                area_responsible=self.team_area,
+                initial_date=date(2024, 1, 10 + index),
+                description=f"Report {index}",
+                links="https://testlink.com",
+                wikipedia_created=index + 1,
+                participants=10 * index,
+                partial_report=index == 0,
+            )
+            self.reports.append(report)
+
+        self.reports[0].metrics_related.add(
+            self.metric_content, self.metric_community, self.metric_boolean
+        )
+        self.reports[1].metrics_related.add(
+            self.metric_content, self.metric_operation
+        )
+        self.reports[2].metrics_related.add(
+            self.metric_community, self.metric_operation, self.metric_boolean
+        )
+        self.reports[0].editors.add(editor_1, editor_2)
+        self.reports[2].editors.add(editor_2)
+        self.reports[2].organizers.add(organizer)
+        self.reports[0].partners_activated.add(partner)
+        OperationReport.objects.create(
+            metric=self.metric_operation, report=self.reports[1], number_of_events=4
+        )
+        OperationReport.objects.create(
+            metric=self.metric_content, report=self.reports[2], number_of_resources=7
+        )
+
+    def test_get_done_for_metrics_matches_get_done_for_report(self):
+        done, final = get_done_for_metrics(
+            [metric.id for metric in self.metrics], Report.objects.all()
+        )
+        for metric in self.metrics:
+            reports = Report.objects.filter(metrics_related=metric)
+            self.assertEqual(done[metric.id], get_done_for_report(reports, metric))
+            self.assertEqual(final[metric.id], is_there_a_final_report(reports))
+
+    def test_get_done_for_metrics_computes_only_the_dimensions_asked(self):
+        with self.assertNumQueries(2):
+            done, final = get_done_for_metrics(
+                [self.metric_content.id],
+                Report.objects.all(),
+                dimensions=["Wikipedia (created)"],
+            )
+
+        self.assertEqual(done[self.metric_content.id], {"Wikipedia (created)": 3})
+
+        with self.assertNumQueries(3):
+            done, final = get_done_for_metrics(
+                [self.metric_community.id],
+                Report.objects.all(),
+                dimensions=["Number of editors", "Number of new editors"],
+            )
+
+        self.assertEqual(
+            done[self.metric_community.id],
+            {"Number of editors": 2, "Number of new editors": 1},
+        )
+
+    def test_every_dimension_of_the_registry_is_computed(self):
+        done, final = get_done_for_metrics(
+            [self.metric_content.id], Report.objects.all()
+        )
+
+        self.assertEqual(tuple(done[self.metric_content.id]), DIMENSION_NAMES)
+
+    def test_get_done_for_metrics_uses_a_fixed_number_of_queries(self):
+        with self.assertNumQueries(7):
+            get_done_for_metrics([self.metric_content.id], Report.objects.all())
+        with self.assertNumQueries(7):
+            get_done_for_metrics(
+                [metric.id for metric in self.metrics], Report.objects.all()
+            )
+
+    def test_get_done_for_metrics_respects_the_reports_given(self):
+        done, final = get_done_for_metrics(
+            [self.metric_content.id],
+            Report.objects.filter(pk=self.reports[1].pk),
+        )
+        self.assertEqual(done[self.metric_content.id]["Wikipedia (created)"], 2)
+        self.assertFalse(final[self.metric_content.id])
+
+    def test_get_reports_for_funding_excludes_reports_not_counting_for_main_funding(
+        self,
+    ):
+        self.assertEqual(get_reports_for_funding(Q(), False).count(), 3)
+        self.assertEqual(get_reports_for_funding(Q(), True).count(), 0)
+
+    def test_get_metrics_and_aggregate_per_project_matches_per_metric_results(self):
+        for metric in self.metrics:
+            metric.project.add(self.other_project)
+
+        aggregated_metrics = get_metrics_and_aggregate_per_project()
+
+        activity_metrics = aggregated_metrics[self.other_project.id][
+            "project_metrics"
+        ][0]["activity_metrics"]
+        for metric in self.metrics:
+            goal, done, final = get_goal_and_done_for_metric(metric)
+            for key, value in activity_metrics[metric.id]["metrics"].items():
+                self.assertEqual(value["goal"], goal[key])
+                self.assertEqual(value["done"], done[key])
+                self.assertEqual(value["final"], final)
+
+    def test_refresh_metric_contributions_stores_nonzero_contributions_per_report(
+        self,
+    ):
+        refresh_metric_contributions(Report.objects.all())
+
+        for report in self.reports:
+            for metric in report.metrics_related.all():
+                done = get_done_for_report(Report.objects.filter(pk=report.pk), metric)
+                self.assertEqual(
+                    dict(
+                        MetricContribution.objects.filter(
+                            report=report, metric=metric
+                        ).values_list("dimension", "value")
+                    ),
+                    {key: int(value) for key, value in done.items() if value},
+                )
+
+    def test_refresh_metric_contributions_replaces_outdated_rows(self):
+        refresh_metric_contributions(Report.objects.all())
+        self.reports[1].metrics_related.remove(self.metric_content)
+
+        refresh_metric_contributions(Report.objects.filter(pk=self.reports[1].pk))
+
+        self.assertFalse(
+            MetricContribution.objects.filter(
+                report=self.reports[1], metric=self.metric_content
+            ).exists()
+        )
+        self.assertTrue(
+            MetricContribution.objects.filter(
+                report=self.reports[0], metric=self.metric_content
+            ).exists()
+        )
+
+    def test_rebuild_metric_contributions_command(self):
+        out = StringIO()
+        call_command("rebuild_metric_contributions", "--chunk-size", "2", stdout=out)
+
+        self.assertIn("Metric contributions of 3 reports rebuilt", out.getvalue())
+        self.assertEqual(
+            MetricContribution.objects.get(
+                report=self.reports[1],
+                metric=self.metric_content,
+                dimension="Wikipedia (created)",
+            ).value,
+            2,
+        )
+
+    def get_contributions(self, report, metric):
+        contributions = dict(
+            MetricContribution.objects.filter(report=report, metric=metric).values_list(
+                "dimension", "value"
+            )
+        )
+        done = get_done_for_report(Report.objects.filter(pk=report.pk), metric)
+        if report.metrics_related.filter(pk=metric.pk).exists():
+            self.assertEqual(
+                contributions, {key: int(value) for key, value in done.items() if value}
+            )
+        return contributions
+
+    def test_metric_contributions_follow_report_saves(self):
+        self.reports[1].wikipedia_created = 7
+        self.reports[1].save()
+
+        contributions = self.get_contributions(self.reports[1], self.metric_content)
+        self.assertEqual(contributions["Wikipedia (created)"], 7)
+
+    def test_metric_contributions_follow_metric_relations(self):
+        self.reports[1].metrics_related.remove(self.metric_content)
+        self.metric_content.metrics_related.add(self.reports[2])
+
+        self.assertEqual(self.get_contributions(self.reports[1], self.metric_content), {})
+        contributions = self.get_contributions(self.reports[2], self.metric_content)
+        self.assertEqual(contributions["Number of resources"], 7)
+
+        self.metric_content.metrics_related.clear()
+
+        self.assertFalse(
+            MetricContribution.objects.filter(metric=self.metric_content).exists()
+        )
+
+    def test_metric_contributions_follow_editor_changes(self):
+        editor = Editor.objects.get(username="Editor 1")
+        editor.retained = True
+        editor.save()
+
+        contributions = self.get_contributions(self.reports[0], self.metric_community)
+        self.assertEqual(contributions["Number of editors retained"], 2)
+
+        editor.delete()
+
+        contributions = self.get_contributions(self.reports[0], self.metric_community)
+        self.assertEqual(contributions["Number of editors"], 1)
+
+    def test_metric_contributions_follow_operation_reports(self):
+        operation = OperationReport.objects.get(report=self.reports[1])
+        operation.number_of_events = 9
+        operation.save()
+
+        contributions = self.get_contributions(self.reports[1], self.metric_operation)
+        self.assertEqual(contributions["Number of events"], 9)
+
+        operation.delete()
+
+        contributions = self.get_contributions(self.reports[1], self.metric_operation)
+        self.assertNotIn("Number of events", contributions)
+
+    def test_deleting_a_report_deletes_its_metric_contributions(self):
+        report_id = self.reports[2].pk
+        self.reports[2].delete()
+
+        self.assertFalse(MetricContribution.objects.filter(report_id=report_id).exists())
+        self.assertTrue(MetricContribution.objects.filter(report=self.reports[1]).exists())
+
+    def test_find_empty_metric_associations_reads_metric_contributions(self):
+        refresh_metric_contributions(Report.objects.all())
+
+        rows = find_empty_metric_associations(
+            Q(pk=self.metric_community.pk), partial=True
+        )
+
+        self.assertEqual([row["report_id"] for row in rows], [self.reports[0].pk])
+        self.assertEqual(
+            [dim["dimension"] for dim in rows[0]["zero_dimensions"]],
+            ["Number of organizers"],
+        )
+
+    def test_get_done_for_timespans_matches_each_period(self):
+        other_area = TeamArea.objects.create(text="Other area", code="other")
+        self.reports[2].area_responsible = other_area
+        self.reports[2].save()
+        timespan_array = [
+            (date(2024, 1, 1), date(2024, 1, 10)),
+            (date(2024, 1, 11), date(2024, 1, 31)),
+            (date(2024, 1, 1), date(2024, 12, 31)),
+        ]
+        metric_ids = [metric.id for metric in self.metrics]
+
+        done, final = get_done_for_timespans(
+            metric_ids, Report.objects.all(), timespan_array
+        )
+        by_area, final_by_area = get_done_for_timespans(
+            metric_ids,
+            Report.objects.all(),
+            timespan_array,
+            area_ids=[self.team_area.id, other_area.id],
+        )
+
+        for metric in self.metrics:
+            for index, (time_ini, time_end) in enumerate(timespan_array):
+                reports = Report.objects.filter(
+                    metrics_related=metric,
+                    end_date__gte=time_ini,
+                    end_date__lte=time_end,
+                )
+                self.assertEqual(
+                    done[metric.id][index], get_done_for_report(reports, metric)
+                )
+                self.assertEqual(
+                    final[metric.id][index], is_there_a_final_report(reports)
+                )
+                for area in [self.team_area, other_area]:
+                    area_reports = reports.filter(area_responsible=area)
+                    self.assertEqual(
+                        by_area[(area.id, metric.id)][index],
+                        get_done_for_report(area_reports, metric),
+                    )
+                    self.assertEqual(
+                        final_by_area[(area.id, metric.id)][index],
+                        is_there_a_final_report(area_reports),
+                    )
+
+    def test_get_results_for_timespan_by_area_matches_per_area_results(self):
+        other_area = TeamArea.objects.create(text="Other area", code="other")
+        self.reports[1].area_responsible = other_area
+        self.reports[1].save()
+        timespan_array = [
+            (date(2024, 1, 1), date(2024, 1, 10)),
+            (date(2024, 1, 11), date(2024, 1, 31)),
+            (date(2024, 1, 1), date(2024, 12, 31)),
+        ]
+        areas = [self.team_area, other_area]
+
+        results = get_results_for_timespan_by_area(
+            timespan_array, areas, Q(activity=self.activity), True, "en", True
+        )
+
+        for area in areas:
+            self.assertEqual(
+                results[area.id],
+                get_results_for_timespan(
+                    timespan_array,
+                    Q(activity=self.activity),
+                    Q(area_responsible=area),
+                    True,
+                    "en",
+                    True,
+                ),
+            )
+
+    def test_metrics_reports_shows_the_contribution_of_each_report(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="view_metric"))
+        self.client.login(username="testuser", password="testpass")
+
+        response = self.client.get(
+            reverse("metrics:metrics_reports", args=[self.metric_community.id])
+        )
+
+        values = {value["text"]: value for value in response.context["values"]}
+        self.assertEqual(set(values), {"Number of editors", "Number of organizers"})
+        for key, value in values.items():
+            for report_value in value["reports"]:
+                self.assertEqual(
+                    report_value["done"],
+                    get_done_for_report(
+                        Report.objects.filter(pk=report_value["id"]),
+                        self.metric_community,
+                    )[key],
+                )
+        self.assertEqual(values["Number of editors"]["done"], 3)
+        self.assertEqual(
+            values["Number of editors"]["list_values"],
+            [
+                {
+                    "name": "Editor 1",
+                    "reports": [{"id": self.reports[0].id, "description": "Report 0"}],
+                },
+                {
+                    "name": "Editor 2",
+                    "reports": [
+                        {"id": self.reports[0].id, "description": "Report 0"},
+                        {"id": self.reports[2].id, "description": "Report 2"},
+                    ],
+                },
+            ],
+        )
+
+    def test_build_list_values_uses_prefetched_memberships(self):
+        reports = Report.objects.filter(metrics_related=self.metric_community).order_by(
+            "pk"
+        )
+        editors = list(Editor.objects.filter(editors__in=reports).distinct())
+
+        with self.assertNumQueries(2):
+            result = build_list_values(editors, "username", reports, "editors")
+
+        self.assertEqual(
+            [len(item["reports"]) for item in result],
+            [len(editor.editors.all()) for editor in editors],
+        )
+    def test_find_empty_metric_associations_uses_a_fixed_number_of_queries(self):
+        refresh_metric_contributions(Report.objects.all())
+
+        with self.assertNumQueries(3):
+            rows = find_empty_metric_associations(partial=True)
+
+        self.assertEqual(
+            [(row["metric_id"], row["report_id"]) for row in rows],
+            [
+                (self.metric_community.id, self.reports[0].id),
+                (self.metric_operation.id, self.reports[2].id),
+            ],
+        )
+
+    def test_find_empty_metric_associations_follows_report_changes(self):
+        self.reports[1].wikipedia_created = 0
+        self.reports[1].save()
+
+        rows = find_empty_metric_associations(Q(pk=self.metric_content.pk))
+
+        self.assertEqual([row["report_id"] for row in rows], [self.reports[1].id])
+
+    def test_get_empty_metric_associations_is_paginated_in_the_database(self):
+        metrics = get_metrics_with_relevant_dimensions()
+        associations = get_empty_metric_associations(metrics, partial=True)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(associations.count(), 2)
+            self.assertEqual(
+                [row["report_id"] for row in associations[1:2]], [self.reports[2].id]
+            )
+
+    def test_describe_empty_metric_associations_handles_many_associations(self):
+        refresh_metric_contributions(Report.objects.all())
+        metrics = get_metrics_with_relevant_dimensions()
+        associations = list(get_empty_metric_associations(metrics, partial=True))
+        expected = describe_empty_metric_associations(associations, metrics)
+        missing_report_id = Report.objects.order_by("-pk").first().pk + 1
+        unknown = [
+            {**associations[0], "report_id": missing_report_id + index}
+            for index in range(1000)
+        ]
+
+        rows = describe_empty_metric_associations(associations + unknown, metrics)
+
+        self.assertEqual(len(rows), 1002)
+        self.assertEqual(rows[:2], expected)
+        self.assertEqual(
+            {len(row["zero_dimensions"]) for row in rows[2:]},
+            {len(metrics[associations[0]["metric_id"]].relevant)},
+        )
+
+    def test_find_empty_metric_associations_since_filters_older_reports(self):
+        Report.objects.filter(pk=self.reports[0].pk).update(
+            created_at=datetime(2020, 1, 1)
+        )
+        refresh_metric_contributions(Report.objects.all())
+
+        rows = find_empty_metric_associations(partial=True, since=date(2021, 1, 1))
+
+        self.assertEqual([row["report_id"] for row in rows], [self.reports[2].id])
+
+    @patch("metrics.views.EMPTY_ASSOCIATIONS_PER_PAGE", 1)
+    def test_show_empty_metric_associations_is_paginated(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="view_metric"))
+        self.client.login(username="testuser", password="testpass")
+        refresh_metric_contributions(Report.objects.all())
+        url = reverse("metrics:empty_associations")
+
+        response = self.client.get(url, {"partial": "1", "page": "2"})
+
+        self.assertEqual(response.context["count"], 2)
+        self.assertEqual(
+            [row["report_id"] for row in response.context["rows"]],
+            [self.reports[2].id],
+        )
+        self.assertContains(response, "Page 2 of 2")
+
+    def test_show_empty_metric_associations_ignores_invalid_since(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="view_metric"))
+        self.client.login(username="testuser", password="testpass")
+
+        response = self.client.get(
+            reverse("metrics:empty_associations"), {"since": "yesterday"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["since"])
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tempfile.mkdtemp(),
+        }
+    }
+)
+class MetricsPerProjectCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.user_profile = UserProfile.objects.get(user=self.user)
+        self.team_area = TeamArea.objects.create(text="Area", code="area")
+        self.project = Project.objects.create(text="Project")
+        self.area = Area.objects.create(text="Area")
+        self.area.project.add(self.project)
+        self.other_activity = Activity.objects.create(text="Other activity")
+        self.activity = Activity.objects.create(text="Activity", area=self.area)
+        self.metric = Metric.objects.create(
+            text="Metric", activity=self.activity, wikipedia_created=10
+        )
+        self.metric.project.add(self.project)
+        self.report = Report.objects.create(
+            created_by=self.user_profile,
+            modified_by=self.user_profile,
+            activity_associated=self.activity,
+            area_responsible=self.team_area,
+            initial_date=date(2024, 1, 1),
+            description="Report",
+            links="https://testlink.com",
+            wikipedia_created=3,
+        )
+        self.report.metrics_related.add(self.metric)
+
+    def get_done(self, dataset):
+        return dataset[self.project.id]["project_metrics"][0]["activity_metrics"][
+            self.metric.id
+        ]["metrics"]["Wikipedia (created)"]["done"]
+
+    def test_cached_dataset_is_the_same_as_the_computed_one(self):
+        self.assertEqual(
+            get_cached_metrics_and_aggregate_per_project(),
+            get_metrics_and_aggregate_per_project(),
+        )
+
+    def test_second_call_is_served_from_the_cache(self):
+        get_cached_metrics_and_aggregate_per_project()
+        with patch("metrics.views.get_metrics_and_aggregate_per_project") as mock_build:
+            get_cached_metrics_and_aggregate_per_project()
+            mock_build.assert_not_called()
+
+        self.assertEqual(
+            get_cache_stats(), {"hits": 1, "misses": 1, "requests": 2}
+        )
+
+    def test_different_arguments_are_cached_separately(self):
+        get_cached_metrics_and_aggregate_per_project(lang="en")
+        get_cached_metrics_and_aggregate_per_project(lang="pt")
+        get_cached_metrics_and_aggregate_per_project(field="Wikipedia (created)")
+
+        self.assertEqual(get_cache_stats()["misses"], 3)
+
+    def test_saving_a_report_invalidates_the_cache(self):
+        self.assertEqual(self.get_done(get_cached_metrics_and_aggregate_per_project()), 3)
+
+        self.report.wikipedia_created = 5
+        self.report.save()
+
+        self.assertEqual(self.get_done(get_cached_metrics_and_aggregate_per_project()), 5)
+
+    def test_changing_the_metrics_of_a_report_invalidates_the_cache(self):
+        self.assertEqual(self.get_done(get_cached_metrics_and_aggregate_per_project()), 3)
+
+        self.report.metrics_related.remove(self.metric)
+
+        self.assertEqual(self.get_done(get_cached_metrics_and_aggregate_per_project()), 0)
+
+    def test_deleting_an_operation_report_invalidates_the_cache(self):
+        operation_report = OperationReport.objects.create(
+            metric=self.metric, report=self.report, number_of_events=2
+        )
+        get_cached_metrics_and_aggregate_per_project()
+
+        operation_report.delete()
+        get_cached_metrics_and_aggregate_per_project()
+
+        self.assertEqual(get_cache_stats()["misses"], 2)
+
+    def test_changing_a_funding_invalidates_the_cache(self):
+        get_cached_metrics_and_aggregate_per_project()
+
+        Funding.objects.create(name="Funding", project=self.project)
+        get_cached_metrics_and_aggregate_per_project()
+
+        self.assertEqual(get_cache_stats()["misses"], 2)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_a_per_process_cache_is_not_used(self):
+        get_cached_metrics_and_aggregate_per_project()
+        with patch("metrics.views.get_metrics_and_aggregate_per_project") as mock_build:
+            get_cached_metrics_and_aggregate_per_project()
+            mock_build.assert_called_once()
+
+    def test_detailed_metrics_per_project_shows_cache_stats_to_admins(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="delete_logentry"))
+        self.client.login(username="testuser", password="testpass")
+
+        self.client.get(reverse("metrics:detailed_per_project"))
+        response = self.client.get(reverse("metrics:detailed_per_project"))
+
+        self.assertEqual(response.context["cache_stats"]["hits"], 1)
+        self.assertContains(response, "Cache hits")
+
+
+@override_settings(
+    MIDDLEWARE=settings.MIDDLEWARE + ["metrics.middleware.PerformanceMiddleware"],
+    ENABLE_PERFORMANCE_MONITORING=True,
+)
+class PerformanceMonitoringTests(TestCase):
+    def setUp(self):
+        clear_requests()
+        self.user = User.objects.create_user(
+            username="staff", password="testpass", is_staff=True
+        )
+        self.client.login(username="staff", password="testpass")
+
+    def tearDown(self):
+        clear_requests()
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.get(reverse("metrics:about"))
+        self.client.get(reverse("metrics:about"))
+
+        rows = {row["view_name"]: row for row in get_performance_summary()}
+
+        self.assertEqual(rows["metrics:about"]["requests"], 2)
+        self.assertGreater(rows["metrics:about"]["latency_p95"], 0)
+        self.assertGreaterEqual(rows["metrics:about"]["queries_max"], 1)
+        self.assertFalse(rows["metrics:about"]["over_budget"])
+
+    @override_settings(ENABLE_EXPORT_JOBS=False)
+    def test_queries_of_streaming_responses_are_recorded(self):
+        self.user.user_permissions.add(Permission.objects.get(codename="view_report"))
+        Report.objects.create(
+            created_by=self.user.profile,
+            modified_by=self.user.profile,
+            activity_associated=Activity.objects.create(text="Activity"),
+            area_responsible=TeamArea.objects.create(text="Area", code="area"),
+            initial_date=date(2024, 1, 1),
+            description="Report",
+            links="https://testlink.com",
+        )
+
+        response = self.client.get(reverse("report:export_all_reports"))
+        self.assertEqual(get_performance_summary(), [])
+        b"".join(response.streaming_content)
+
+        rows = {row["view_name"]: row for row in get_performance_summary()}
+        self.assertGreaterEqual(rows["report:export_all_reports"]["queries_max"], 9)
+
+    @override_settings(PERFORMANCE_QUERY_BUDGET=0)
+    def test_views_over_the_query_budget_are_flagged(self):
+        self.client.get(reverse("metrics:about"))
+
+        response = self.client.get(reverse("metrics:performance"))
+
+        self.assertTrue(response.context["rows"][0]["over_budget"])
+        self.assertContains(response, "over budget")
+
+    def test_percentile_uses_the_nearest_rank(self):
+        values = list(range(1, 21))
+
+        self.assertEqual(percentile(values, 50), 10)
+        self.assertEqual(percentile(values, 95), 19)
+        self.assertEqual(percentile([], 95), 0)
+
+    def test_performance_page_shows_the_link_caches(self):
+        response = self.client.get(reverse("metrics:performance"))
+
+        self.assertEqual(
+            [row["name"] for row in response.context["link_cache_stats"]],
+            ["wikify_link", "dewikify_url", "render_reference"],
+        )
+        self.assertContains(response, "Link caches")
+
+    def test_performance_page_is_only_for_staff(self):
+        User.objects.create_user(username="user", password="testpass")
+        self.client.login(username="user", password="testpass")
+
+        response = self.client.get(reverse("metrics:performance"))
+
+        self.assertEqual(response.status_code, 302)
+
+
+class BenchmarkCommandTests(TestCase):
+    def run_bench(self, seed=0):
+        out = StringIO()
+        call_command(
+            "sara_bench",
+            "--seed", str(seed),
+            "--reports", "30",
+            "--editors", "20",
+            "--organizers", "5",
+            "--metrics", "10",
+            "--repeat", "1",
+            stdout=out,
+        )
+        return json.loads(out.getvalue())
+
+    def test_sara_bench_reports_timings_and_query_counts(self):
+        results = self.run_bench()
+
+        self.assertEqual(results["dataset"]["reports"], 30)
+        self.assertEqual(
+            set(results["benchmarks"]),
+            {
+                "get_metrics_and_aggregate_per_project",
+                "get_results_for_timespan",
+                "metrics_reports",
+                "export_report",
+                "find_empty_metric_associations",
+                "build_wiki_ref",
+                "replace_with_links",
+            },
+        )
+        for name, benchmark in results["benchmarks"].items():
+            self.assertGreaterEqual(benchmark["seconds_median"], 0)
+            if name in ["build_wiki_ref", "replace_with_links"]:
+                self.assertEqual(benchmark["queries"], 0)
+            else:
+                self.assertGreater(benchmark["queries"], 0)
+
+    @override_settings(ENABLE_EXPORT_JOBS=True)
+    def test_sara_bench_exports_in_the_request_and_clears_the_link_caches(self):
+        with patch(
+            "metrics.management.commands.sara_bench.clear_link_caches"
+        ) as clear_link_caches:
+            results = self.run_bench()
+
+        self.assertGreater(results["benchmarks"]["export_report"]["queries"], 0)
+        self.assertEqual(clear_link_caches.call_count, 2)
+
+    def test_sara_bench_dataset_is_reproducible_and_rolled_back(self):
+        first = self.run_bench(seed=3)
+        second = self.run_bench(seed=3)
+
+        self.assertEqual(first["dataset"]["operation_reports"], second["dataset"]["operation_reports"])
+        self.assertFalse(Report.objects.exists())
+        self.assertFalse(User.objects.filter(username="sara_bench").exists())
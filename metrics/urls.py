@@ -45,4 +45,5 @@ urlpatterns = [
     ),
     path("prepare_pdf", views.prepare_pdf, name="wmf_report"),
     path("empty-associations", views.show_empty_metric_associations, name="empty_associations"),
+    path("_perf", views.show_performance, name="performance"),
 ]
@@ -5,11 +5,22 @@ from django.template.loader import get_template
 from xhtml2pdf import pisa
 
 
-def render_to_pdf(template_src, context_dict=None):
+def render_pdf(template_src, context_dict=None):
+    """
+    Returns the content of the PDF rendered from the template, or None if it could not be
+    generated.
+    """
     template = get_template(template_src)
     html = template.render(context_dict)
     result = BytesIO()
     pdf = pisa.pisaDocument(BytesIO(html.encode("utf-8")), result)
     if pdf.err:
+        return None
+    return result.getvalue()
+
+
+def render_to_pdf(template_src, context_dict=None):
+    pdf = render_pdf(template_src, context_dict)
+    if pdf is None:
         return HttpResponse("Invalid PDF", status=400, content_type="text/plain")
-    return HttpResponse(result.getvalue(), content_type="application/pdf")
+    return HttpResponse(pdf, content_type="application/pdf")
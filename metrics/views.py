@@ -1,27 +1,74 @@
 import calendar
 import datetime
 import re
+from collections import defaultdict
 from datetime import timedelta
 from io import StringIO
 
 from django import template
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import F, Q, Sum, Min
+from django.core.paginator import Paginator
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
 from django.shortcuts import HttpResponse, redirect, render, reverse
 from django.utils.translation import get_language
 from django.utils.translation import gettext as _
 
-from metrics.link_utils import process_all_references, wikify_link
+from metrics.aggregation import (
+    get_done_for_metrics,
+    get_done_for_timespans,
+    get_done_per_report,
+    get_reports_for_funding,
+)
+from metrics.cache import get_cache_stats, get_or_build_dataset
+from metrics.dimensions import (
+    DIMENSION_NAMES,
+    DIMENSIONS,
+    DISTINCT_COUNT,
+    EXISTS,
+    OPERATION_SUM,
+    REPORT_SUM,
+)
+from metrics.link_utils import (
+    collect_references,
+    build_wiki_ref,
+    get_link_cache_stats,
+)
+from metrics.middleware import get_performance_summary
 from metrics.models import Activity, Metric
-from metrics.utils import render_to_pdf
-from report.models import Editor, OperationReport, Organizer, Partner, Project, Report
+from metrics.utils import render_pdf, render_to_pdf
+from report.jobs import enqueue_job
+from report.models import (
+    Editor,
+    MetricContribution,
+    OperationReport,
+    Organizer,
+    Partner,
+    Project,
+    Report,
+)
 from users.models import TeamArea
 
 register = template.Library()
 calendar.setfirstweekday(calendar.SUNDAY)
 
+EMPTY_ASSOCIATIONS_PER_PAGE = 100
+EMPTY_ASSOCIATIONS_PER_QUERY = 400
+
 PATTERNS = {
     r"https://(.*).(toolforge).org/(.*)": "toolforge:",
     r"https://(.*).wikibooks.org/wiki/(.*)": "b:",
@@ -67,6 +114,24 @@ def show_activities_plan(request):
 @login_required
 @permission_required("metrics.view_metric")
 def prepare_pdf(request, *args, **kwargs):
+    if settings.ENABLE_EXPORT_JOBS:
+        job = enqueue_job("wmf_report", request.user.profile, get_language())
+        return redirect(reverse("report:export_job", kwargs={"job_id": job.pk}))
+
+    return render_to_pdf("metrics/wmf_report.html", get_wmf_report_context())
+
+
+def build_wmf_report():
+    """
+    Export job version of prepare_pdf.
+    """
+    pdf = render_pdf("metrics/wmf_report.html", get_wmf_report_context())
+    if pdf is None:
+        raise ValueError("Invalid PDF")
+    return "wmf_report.pdf", [pdf]
+
+
+def get_wmf_report_context():
     timespan_array = [
         (
             datetime.date(datetime.datetime.today().year, 1, 1),
@@ -94,8 +159,19 @@ def prepare_pdf(request, *args, **kwargs):
         timespan_array, Q(project=main_project), Q(), True, "en", True
     )
 
+    # The references were rendered when the reports were saved
+    report_ids = set()
+    for metric in main_results:
+        report_ids.update(re.findall(r"sara-(\d+)", metric["done"][5]))
+    rendered = {
+        str(pk): reference_html
+        for pk, reference_html in Report.objects.filter(pk__in=report_ids)
+        .exclude(reference_html="")
+        .values_list("pk", "reference_html")
+    }
+
     metrics = []
-    refs = []
+    references = {}
     for metric in main_results:
         metrics.append(
             {
@@ -109,12 +185,12 @@ def prepare_pdf(request, *args, **kwargs):
                 "goal": metric["done"][6],
             }
         )
-        refs += process_all_references(metric["done"][5])
+        collect_references(metric["done"][5], references, rendered)
 
-    refs = sorted(list(set(refs)))
+    refs = sorted(references.values())
     context = {"project": str(main_project), "metrics": metrics, "references": refs}
 
-    return render_to_pdf("metrics/wmf_report.html", context)
+    return context
 
 
 @login_required
@@ -128,7 +204,7 @@ def show_metrics_per_project(request):
 
     current_language = get_language()
 
-    full_dataset = get_metrics_and_aggregate_per_project(
+    full_dataset = get_cached_metrics_and_aggregate_per_project(
         project_query=Q(active_status=True),
         lang = current_language
     )
@@ -163,13 +239,13 @@ def show_metrics_for_specific_project(request, project_id):
     if project.current_poa:
         poa_query = Q(pk=project.id)
 
-        operational_dataset = get_metrics_and_aggregate_per_project(
+        operational_dataset = get_cached_metrics_and_aggregate_per_project(
             project_query=poa_query,
             metric_query=Q(is_operation=True),
             lang=current_language,
         )
 
-        metrics_aggregated = get_metrics_and_aggregate_per_project(
+        metrics_aggregated = get_cached_metrics_and_aggregate_per_project(
             project_query=poa_query,
             metric_query=Q(boolean_type=True),
             field="Occurrence",
@@ -186,7 +262,7 @@ def show_metrics_for_specific_project(request, project_id):
                 operational_dataset[project.id]["project_metrics"]
             )
     else:
-        metrics_aggregated = get_metrics_and_aggregate_per_project(
+        metrics_aggregated = get_cached_metrics_and_aggregate_per_project(
             project_query=Q(pk=project_id), lang=current_language
         )
 
@@ -204,27 +280,41 @@ def show_metrics_for_specific_project(request, project_id):
 def show_detailed_metrics_per_project(request):
     context = {
         "poa_dataset": {},
-        "dataset": get_metrics_and_aggregate_per_project(
+        "dataset": get_cached_metrics_and_aggregate_per_project(
             project_query=Q(active_status=True)
         ),
         "title": _("Show metrics per project"),
+        "cache_stats": get_cache_stats(),
     }
     return render(request, "metrics/list_metrics_per_project.html", context)
 
 
 def build_list_values(qs, name_field, reports, related_name, filter_fn=None):
+    # Reports of each object, read from the prefetched memberships of the reports
+    memberships = defaultdict(list)
+    for report in reports.prefetch_related(related_name):
+        for obj in getattr(report, related_name).all():
+            memberships[obj.pk].append(report)
+
     result = []
     for obj in qs:
-        obj_reports = reports.filter(**{related_name: obj})
+        obj_reports = memberships[obj.pk]
         if filter_fn and not filter_fn(obj, obj_reports):
             continue
         result.append({
             "name": getattr(obj, name_field),
-            "reports": list(obj_reports.values("id", "description")),
+            "reports": [
+                {"id": report.id, "description": report.description}
+                for report in obj_reports
+            ],
         })
     return result
 
 
+def get_earliest_initial_date(reports):
+    return min((report.initial_date for report in reports), default=None)
+
+
 @login_required
 @permission_required("metrics.view_metric")
 def metrics_reports(request, metric_id):
@@ -232,8 +322,7 @@ def metrics_reports(request, metric_id):
         metric = Metric.objects.get(pk=metric_id)
         reports = Report.objects.filter(metrics_related=metric_id).order_by("pk")
 
-        goals = get_goal_for_metric(metric)
-        filtered_goals = {key: value for key, value in goals.items() if goals[key] > 0}
+        filtered_goals = dict(metric.nonzero_goals)
 
         all_editors = Editor.objects.filter(editors__in=reports).distinct()
         all_organizers = Organizer.objects.filter(organizers__in=reports).distinct()
@@ -248,7 +337,7 @@ def metrics_reports(request, metric_id):
                     lambda earliest: earliest is not None and
                     ed.account_creation_date is not None and
                     ed.account_creation_date.date() >= earliest - timedelta(days=30)
-                )(reps.aggregate(earliest=Min("initial_date"))["earliest"])
+                )(get_earliest_initial_date(reps))
             ),
             "Number of organizers": lambda: build_list_values(all_organizers, "name", reports, "organizers"),
             "Number of organizers retained": lambda: build_list_values(all_organizers.filter(retained=True), "name", reports, "organizers"),
@@ -258,18 +347,24 @@ def metrics_reports(request, metric_id):
                     lambda earliest: earliest is not None and
                     org.first_seen_at is not None and
                     org.first_seen_at >= earliest
-                )(reps.aggregate(earliest=Min("initial_date"))["earliest"])
+                )(get_earliest_initial_date(reps))
             ),
             "Number of partnerships activated": lambda: build_list_values(all_partners, "name", reports, "partners_activated"),
         }
 
         AGGREGATE_OVER_ALL_REPORTS = {"Number of new editors", "Number of new organizers"}
 
+        # Contribution of every report to every dimension, in a few grouped queries
+        done_per_report, final_per_report = get_done_per_report(
+            [metric.id], reports, dimensions=filtered_goals
+        )
+        total_done_per_key = None
+
         values = []
         for goal_key, goal_value in filtered_goals.items():
             report_values = []
             for report in reports:
-                done = get_done_for_report(Report.objects.filter(pk=report.id), metric)
+                done = done_per_report[(report.id, metric.id)]
                 report_values.append(
                     {
                         "id": report.id,
@@ -283,7 +378,12 @@ def metrics_reports(request, metric_id):
                 )
 
             if goal_key in AGGREGATE_OVER_ALL_REPORTS:
-                total_done = get_done_for_report(reports, metric)[goal_key]
+                if total_done_per_key is None:
+                    done, final = get_done_for_metrics(
+                        [metric.id], reports, dimensions=AGGREGATE_OVER_ALL_REPORTS
+                    )
+                    total_done_per_key = done[metric.id]
+                total_done = total_done_per_key[goal_key]
             else:
                 total_done = sum([report_aux["done"] for report_aux in report_values])
 
@@ -350,34 +450,72 @@ def export_year_report_by_area(request):
 @login_required
 @permission_required("metrics.view_metric")
 def export_timespan_report(request, timeframe="trimester", by_area=False):
+    if settings.ENABLE_EXPORT_JOBS:
+        job = enqueue_job(
+            "timespan_report",
+            request.user.profile,
+            get_language(),
+            timeframe=timeframe,
+            by_area=by_area,
+        )
+        return redirect(reverse("report:export_job", kwargs={"job_id": job.pk}))
+
+    file_name, content = build_timespan_report(timeframe, by_area)
+    response = HttpResponse(b"".join(content))
+    response["Content-Type"] = "text/plain; charset=UTF-8"
+    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+
+    return response
+
+
+def build_timespan_report(timeframe="trimester", by_area=False):
     buffer = StringIO()
 
     if by_area:
-        for area in TeamArea.objects.filter(project__main_funding=True):
-            get_results_divided_by_timespan(buffer, area, False, timeframe)
+        get_results_by_area_divided_by_timespan(
+            buffer, TeamArea.objects.filter(project__main_funding=True), False, timeframe
+        )
     else:
         get_results_divided_by_timespan(buffer, None, False, timeframe)
 
-    response = HttpResponse(buffer.getvalue())
-    response["Content-Type"] = "text/plain; charset=UTF-8"
-    response["Content-Disposition"] = f'attachment; filename="{timeframe}_report.txt"'
-
-    return response
+    return f"{timeframe}_report.txt", [buffer.getvalue().encode("utf-8")]
 
 @login_required
 @permission_required("metrics.view_metric")
 def show_empty_metric_associations(request):
     partial = request.GET.get("partial") == "1"
-    rows = find_empty_metric_associations(partial=partial)
+    try:
+        since = datetime.date.fromisoformat(request.GET.get("since", ""))
+    except ValueError:
+        since = None
+    metrics = get_metrics_with_relevant_dimensions()
+    page = Paginator(
+        get_empty_metric_associations(metrics, partial=partial, since=since),
+        EMPTY_ASSOCIATIONS_PER_PAGE,
+    ).get_page(request.GET.get("page"))
     context = {
         "title": _("Reports associated to a metric with zero contribution"),
-        "rows": rows,
+        "rows": describe_empty_metric_associations(page.object_list, metrics),
+        "page": page,
         "partial": partial,
-        "count": len(rows),
+        "since": since,
+        "count": page.paginator.count,
     }
     return render(request, "metrics/list_empty_metric_associations.html", context)
 
 
+@staff_member_required
+def show_performance(request):
+    context = {
+        "title": _("Performance of the views"),
+        "rows": get_performance_summary(),
+        "link_cache_stats": get_link_cache_stats(),
+        "enabled": settings.ENABLE_PERFORMANCE_MONITORING,
+        "query_budget": settings.PERFORMANCE_QUERY_BUDGET,
+    }
+    return render(request, "metrics/performance.html", context)
+
+
 # ======================================================================================================================
 # FUNCTIONS
 # ======================================================================================================================
@@ -410,8 +548,44 @@ def get_header_columns(timeframe):
     return f"!Activity !! Metrics !! {columns} !! Total !! References\n|-\n"
 
 
+def get_results_by_area_divided_by_timespan(
+    buffer, areas, with_goal=False, timeframe="semester"
+):
+    """
+    Writes the timespan tables of each area, computing the results of all the areas at once.
+    """
+    areas = list(areas)
+    timespan_array = get_timespan_array(timeframe)
+
+    poa_results = get_results_for_timespan_by_area(
+        timespan_array,
+        areas,
+        Q(project=Project.objects.get(current_poa=True), is_operation=True),
+        with_goal,
+        "en",
+        True,
+    )
+    main_results = get_results_for_timespan_by_area(
+        timespan_array,
+        areas,
+        Q(project=Project.objects.get(main_funding=True)),
+        with_goal,
+        "en",
+        True,
+    )
+
+    for area in areas:
+        get_results_divided_by_timespan(
+            buffer,
+            area,
+            with_goal,
+            timeframe,
+            results=(poa_results[area.id], main_results[area.id]),
+        )
+
+
 def get_results_divided_by_timespan(
-    buffer, area=None, with_goal=False, timeframe="semester"
+    buffer, area=None, with_goal=False, timeframe="semester", results=None
 ):
     timespan_array = get_timespan_array(timeframe)
 
@@ -433,22 +607,25 @@ def get_results_divided_by_timespan(
         header = "{| class='wikitable wmb_report_table'\n"
         footer = "|}\n"
 
-    poa_results = get_results_for_timespan(
-        timespan_array,
-        Q(project=Project.objects.get(current_poa=True), is_operation=True),
-        report_query,
-        with_goal,
-        "en",
-        True,
-    )
-    main_results = get_results_for_timespan(
-        timespan_array,
-        Q(project=Project.objects.get(main_funding=True)),
-        report_query,
-        with_goal,
-        "en",
-        True,
-    )
+    if results:
+        poa_results, main_results = results
+    else:
+        poa_results = get_results_for_timespan(
+            timespan_array,
+            Q(project=Project.objects.get(current_poa=True), is_operation=True),
+            report_query,
+            with_goal,
+            "en",
+            True,
+        )
+        main_results = get_results_for_timespan(
+            timespan_array,
+            Q(project=Project.objects.get(main_funding=True)),
+            report_query,
+            with_goal,
+            "en",
+            True,
+        )
 
     poa_wikitext = construct_wikitext(
         poa_results, header + get_header_columns(timeframe)
@@ -472,56 +649,104 @@ def get_results_for_timespan(
     lang="pt",
     is_main_funding=False,
 ):
-    results = []
-    for metric in Metric.objects.filter(metric_query).order_by("activity_id", "id"):
-        done_row = []
-        refs = []
-        goal_value = 0
-        supplementary_query = Q()
-        for time_ini, time_end in timespan_array:
-            supplementary_query = (
-                Q(end_date__gte=time_ini) & Q(end_date__lte=time_end) & report_query
-            )
-            goal, done, final = get_goal_and_done_for_metric(
-                metric,
-                supplementary_query=supplementary_query,
-                is_main_funding=is_main_funding,
-            )
-            for key, value in goal.items():
-                if value != 0:
-                    done_row.append(done[key]) if done[key] else done_row.append("-")
-                    goal_value = value
+    metrics = list(
+        Metric.objects.filter(metric_query)
+        .select_related("activity")
+        .order_by("activity_id", "id")
+    )
+    done, final = get_done_for_timespans(
+        [metric.id for metric in metrics],
+        get_reports_for_funding(report_query, is_main_funding),
+        timespan_array,
+        dimensions=get_goal_dimensions(metrics),
+    )
+    refs = build_wiki_refs_for_metrics(
+        [metric.id for metric in metrics],
+        get_references_query(timespan_array, report_query),
+    )
+    return [
+        get_timespan_row(metric, done[metric.id], refs.get(metric.id, ""), with_goal, lang)
+        for metric in metrics
+    ]
 
-        refs.append(
-            build_wiki_ref_for_reports(metric, supplementary_query=supplementary_query)
+
+def get_results_for_timespan_by_area(
+    timespan_array,
+    areas,
+    metric_query=Q(),
+    with_goal=False,
+    lang="pt",
+    is_main_funding=False,
+):
+    """
+    Same as get_results_for_timespan for each one of the areas, grouping the reports by
+    area_responsible instead of running everything again per area.
+    Returns a dictionary of results keyed by area id.
+    """
+    metrics = list(
+        Metric.objects.filter(metric_query)
+        .select_related("activity")
+        .order_by("activity_id", "id")
+    )
+    done, final = get_done_for_timespans(
+        [metric.id for metric in metrics],
+        get_reports_for_funding(Q(area_responsible__in=areas), is_main_funding),
+        timespan_array,
+        area_ids=[area.id for area in areas],
+        dimensions=get_goal_dimensions(metrics),
+    )
+    results = {}
+    for area in areas:
+        refs = build_wiki_refs_for_metrics(
+            [metric.id for metric in metrics],
+            get_references_query(timespan_array, Q(area_responsible=area)),
         )
-        refs = list(dict.fromkeys(refs))
-        done_row.append(" ".join(filter(None, refs)))
+        results[area.id] = [
+            get_timespan_row(
+                metric,
+                done[(area.id, metric.id)],
+                refs.get(metric.id, ""),
+                with_goal,
+                lang,
+            )
+            for metric in metrics
+        ]
+    return results
 
-        # Get goal and attach to the array
-        if with_goal:
-            if goal_value:
-                done_row.append(goal_value)
-            else:
-                done_row.append("?")
 
-        if lang == "pt":
-            results.append(
-                {
-                    "activity": metric.activity.text,
-                    "metric": metric.text,
-                    "done": done_row,
-                }
-            )
+def get_references_query(timespan_array, report_query):
+    """
+    Reports whose references are listed: the ones of the last period (the total, when
+    there is one).
+    """
+    if not timespan_array:
+        return Q()
+    time_ini, time_end = timespan_array[-1]
+    return Q(end_date__gte=time_ini) & Q(end_date__lte=time_end) & report_query
+
+
+def get_timespan_row(metric, done_per_period, refs, with_goal, lang):
+    done_row = []
+    goal_value = 0
+    for done in done_per_period:
+        for key, value in metric.nonzero_goals:
+            done_row.append(done[key] or "-")
+            goal_value = value
+
+    done_row.append(refs)
+
+    # Get goal and attach to the array
+    if with_goal:
+        if goal_value:
+            done_row.append(goal_value)
         else:
-            results.append(
-                {
-                    "activity": metric.activity.text,
-                    "metric": metric.text_en,
-                    "done": done_row,
-                }
-            )
-    return results
+            done_row.append("?")
+
+    return {
+        "activity": metric.activity.text,
+        "metric": metric.text if lang == "pt" else metric.text_en,
+        "done": done_row,
+    }
 
 
 def get_metrics_and_aggregate_per_project(
@@ -533,25 +758,73 @@ def get_metrics_and_aggregate_per_project(
 ):
     aggregated_metrics_and_results = {}
 
-    for project in Project.objects.filter(project_query).order_by(
-        "-current_poa", "-main_funding"
+    projects = list(
+        Project.objects.filter(project_query).order_by("-current_poa", "-main_funding")
+    )
+    if not projects:
+        return aggregated_metrics_and_results
+
+    activities_per_project = defaultdict(list)
+    for activity in (
+        Activity.objects.filter(area__project__in=projects)
+        .annotate(project_ref=F("area__project"))
+        .order_by("pk")
+    ):
+        activities_per_project[activity.project_ref].append(activity)
+
+    metrics = {
+        metric.id: metric
+        for metric in Metric.objects.filter(
+            Q(project__in=projects) & metric_query
+        ).distinct()
+    }
+    metrics_per_project = defaultdict(list)
+    for project_id, metric_id in (
+        Metric.project.through.objects.filter(
+            project_id__in=[project.id for project in projects],
+            metric_id__in=metrics.keys(),
+        )
+        .order_by("metric_id")
+        .values_list("project_id", "metric_id")
     ):
+        metrics_per_project[project_id].append(metrics[metric_id])
+
+    # Done values depend only on whether the project counts towards the main funding
+    results = {}
+    for is_main_funding in (False, True):
+        metric_ids = {
+            metric.id
+            for project in projects
+            if bool(project.main_funding or project.counts_for_main_funding)
+            == is_main_funding
+            for metric in metrics_per_project[project.id]
+        }
+        if metric_ids:
+            done, final = get_done_for_metrics(
+                metric_ids,
+                get_reports_for_funding(supplementary_query, is_main_funding),
+                dimensions=get_goal_dimensions(metrics[pk] for pk in metric_ids),
+            )
+            results[is_main_funding] = (done, final)
+
+    for project in projects:
+        done_per_metric, final_per_metric = results.get(
+            bool(project.main_funding or project.counts_for_main_funding), ({}, {})
+        )
         project_metrics = []
-        for activity in Activity.objects.filter(area__project=project):
+        for activity in activities_per_project[project.id]:
             activity_metrics = {}
-            if activity.id != 1:
-                q_filter = Q(project=project, activity=activity) & metric_query
-            else:
-                q_filter = Q(project=project) & metric_query
-            for metric in Metric.objects.filter(q_filter):
-                goal, done, final = get_goal_and_done_for_metric(
-                    metric, supplementary_query, project.main_funding or project.counts_for_main_funding
-                )
-
-                if field and goal[field] != 0:
+            for metric in metrics_per_project[project.id]:
+                if activity.id != 1 and metric.activity_id != activity.id:
+                    continue
+                goals = dict(metric.nonzero_goals)
+                done = done_per_metric[metric.id]
+                final = final_per_metric[metric.id]
+
+                if field and field in goals:
                     result_metrics = {
                         field: {
-                            "goal": goal[field],
+                            "goal": goals[field],
                             "done": done[field],
                             "final": final,
                         }
@@ -559,8 +832,7 @@ def get_metrics_and_aggregate_per_project(
                 else:
                     result_metrics = {
                         key: {"goal": value, "done": done[key], "final": final}
-                        for key, value in goal.items()
-                        if value != 0
+                        for key, value in goals.items()
                     }
 
                 if not result_metrics:
@@ -593,23 +865,40 @@ def get_metrics_and_aggregate_per_project(
     return aggregated_metrics_and_results
 
 
+def get_cached_metrics_and_aggregate_per_project(
+    project_query=Q(active_status=True),
+    metric_query=Q(),
+    supplementary_query=Q(),
+    field=None,
+    lang="",
+):
+    """
+    Cached version of get_metrics_and_aggregate_per_project, keyed by the set of projects
+    matching project_query and the remaining arguments. The cache is invalidated whenever
+    the reports, metrics or projects change (see metrics.cache).
+    """
+    project_ids = Project.objects.filter(project_query).values_list("pk", flat=True)
+    return get_or_build_dataset(
+        lambda: get_metrics_and_aggregate_per_project(
+            project_query=project_query,
+            metric_query=metric_query,
+            supplementary_query=supplementary_query,
+            field=field,
+            lang=lang,
+        ),
+        list(project_ids),
+        metric_query,
+        supplementary_query,
+        field,
+        lang,
+    )
+
+
 def get_goal_and_done_for_metric(
     metric, supplementary_query=Q(), is_main_funding=False
 ):
     query = Q(metrics_related__in=[metric]) & supplementary_query
-    reports = Report.objects.filter(query)
-    if is_main_funding:
-        reports = reports.exclude(
-            (
-                Q(activity_associated__area__project__counts_for_main_funding=False)
-                | Q(funding_associated__project__counts_for_main_funding=False)
-            )
-            & ~(
-                Q(activity_associated__id=1)
-                & Q(funding_associated__project__counts_for_main_funding=True)
-            )
-            & ~(Q(activity_associated__id=1) & Q(funding_associated__isnull=True))
-        )
+    reports = get_reports_for_funding(query, is_main_funding)
     goal = get_goal_for_metric(metric)
     done = get_done_for_report(reports, metric)
     final = is_there_a_final_report(reports)
@@ -618,204 +907,72 @@ def get_goal_and_done_for_metric(
 
 
 def get_goal_for_metric(metric):
-    return {
-        # Content metrics
-        "Wikipedia (created)": metric.wikipedia_created,
-        "Wikipedia (edited)": metric.wikipedia_edited,
-        "Wikimedia Commons (created)": metric.commons_created,
-        "Wikimedia Commons (edited)": metric.commons_edited,
-        "Wikidata (created)": metric.wikidata_created,
-        "Wikidata (edited)": metric.wikidata_edited,
-        "Wikiversity (created)": metric.wikiversity_created,
-        "Wikiversity (edited)": metric.wikiversity_edited,
-        "Wikibooks (created)": metric.wikibooks_created,
-        "Wikibooks (edited)": metric.wikibooks_edited,
-        "Wikisource (created)": metric.wikisource_created,
-        "Wikisource (edited)": metric.wikisource_edited,
-        "Wikinews (created)": metric.wikinews_created,
-        "Wikinews (edited)": metric.wikinews_edited,
-        "Wikiquote (created)": metric.wikiquote_created,
-        "Wikiquote (edited)": metric.wikiquote_edited,
-        "Wiktionary (created)": metric.wiktionary_created,
-        "Wiktionary (edited)": metric.wiktionary_edited,
-        "Wikivoyage (created)": metric.wikivoyage_created,
-        "Wikivoyage (edited)": metric.wikivoyage_edited,
-        "Wikispecies (created)": metric.wikispecies_created,
-        "Wikispecies (edited)": metric.wikispecies_edited,
-        "MetaWiki (created)": metric.metawiki_created,
-        "MetaWiki (edited)": metric.metawiki_edited,
-        "MediaWiki (created)": metric.mediawiki_created,
-        "MediaWiki (edited)": metric.mediawiki_edited,
-        "Wikifucntions (created)": metric.wikifunctions_created,
-        "Wikifucntions (edited)": metric.wikifunctions_edited,
-        "Incubator (created)": metric.incubator_created,
-        "Incubator (edited)": metric.incubator_edited,
-        # Community metrics
-        "Number of participants": metric.number_of_participants,
-        "Number of feedbacks": metric.number_of_feedbacks,
-        "Number of editors": metric.number_of_editors,
-        "Number of editors retained": metric.number_of_editors_retained,
-        "Number of new editors": metric.number_of_new_editors,
-        "Number of organizers": metric.number_of_organizers,
-        "Number of organizers retained": metric.number_of_organizers_retained,
-        "Number of new organizers": metric.number_of_new_organizers,
-        "Number of partnerships activated": metric.number_of_partnerships_activated,
-        "Number of new partnerships": metric.number_of_new_partnerships,
-        "Number of resources": metric.number_of_resources,
-        "Number of events": metric.number_of_events,
-        # Financial metrics
-        "Number of donors": metric.number_of_donors,
-        "Number of submissions": metric.number_of_submissions,
-        # Communication metrics
-        "Number of new followers": metric.number_of_new_followers,
-        "Number of mentions": metric.number_of_mentions,
-        "Number of community communications": metric.number_of_community_communications,
-        "Number of people reached through social media": metric.number_of_people_reached_through_social_media,
-        "Occurrence": metric.boolean_type,
-    }
+    return dict(zip(DIMENSION_NAMES, metric.goal_vector))
+
+
+def get_goal_dimensions(metrics):
+    """
+    Names of the dimensions with a goal in any of the metrics, i.e. the only ones whose done
+    values need to be computed for them.
+    """
+    return {name for metric in metrics for name, goal in metric.nonzero_goals}
 
 
 def get_done_for_report(reports, metric):
-    operation_reports = OperationReport.objects.filter(
-        report__in=reports, metric=metric
-    )
-    alternative_operation_reports = OperationReport.objects.filter(report__in=reports)
-
-    reports_aggregations = reports.aggregate(
-        wikipedia_created=Sum("wikipedia_created"),
-        wikipedia_edited=Sum("wikipedia_edited"),
-        commons_created=Sum("commons_created"),
-        commons_edited=Sum("commons_edited"),
-        wikidata_created=Sum("wikidata_created"),
-        wikidata_edited=Sum("wikidata_edited"),
-        wikiversity_created=Sum("wikiversity_created"),
-        wikiversity_edited=Sum("wikiversity_edited"),
-        wikibooks_created=Sum("wikibooks_created"),
-        wikibooks_edited=Sum("wikibooks_edited"),
-        wikisource_created=Sum("wikisource_created"),
-        wikisource_edited=Sum("wikisource_edited"),
-        wikinews_created=Sum("wikinews_created"),
-        wikinews_edited=Sum("wikinews_edited"),
-        wikiquote_created=Sum("wikiquote_created"),
-        wikiquote_edited=Sum("wikiquote_edited"),
-        wiktionary_created=Sum("wiktionary_created"),
-        wiktionary_edited=Sum("wiktionary_edited"),
-        wikivoyage_created=Sum("wikivoyage_created"),
-        wikivoyage_edited=Sum("wikivoyage_edited"),
-        wikispecies_created=Sum("wikispecies_created"),
-        wikispecies_edited=Sum("wikispecies_edited"),
-        metawiki_created=Sum("metawiki_created"),
-        metawiki_edited=Sum("metawiki_edited"),
-        mediawiki_created=Sum("mediawiki_created"),
-        mediawiki_edited=Sum("mediawiki_edited"),
-        wikifunctions_created=Sum("wikifunctions_created"),
-        wikifunctions_edited=Sum("wikifunctions_edited"),
-        incubator_created=Sum("incubator_created"),
-        incubator_edited=Sum("incubator_edited"),
-        participants=Sum("participants"),
-        feedbacks=Sum("feedbacks"),
-        donors=Sum("donors"),
-        submissions=Sum("submissions"),
-    )
+    operation_reports = OperationReport.objects.filter(report__in=reports)
+    operation_sums = {
+        f"total_{dimension.goal_field}": Sum(dimension.column)
+        for dimension in DIMENSIONS
+        if dimension.kind == OPERATION_SUM
+    }
 
-    operation_aggregations = operation_reports.aggregate(
-        new_partnerships=Sum("number_of_new_partnerships"),
-        resources=Sum("number_of_resources"),
-        events=Sum("number_of_events"),
-        new_followers=Sum("number_of_new_followers"),
-        mentions=Sum("number_of_mentions"),
-        communications=Sum("number_of_community_communications"),
-        people_reached=Sum("number_of_people_reached_through_social_media"),
+    aggregations = reports.aggregate(
+        **{
+            f"total_{dimension.goal_field}": Sum(dimension.column)
+            for dimension in DIMENSIONS
+            if dimension.kind == REPORT_SUM
+        }
     )
-
-    alternative_operation_aggregations = alternative_operation_reports.aggregate(
-        new_partnerships=Sum("number_of_new_partnerships"),
-        resources=Sum("number_of_resources"),
-        events=Sum("number_of_events"),
-        new_followers=Sum("number_of_new_followers"),
-        mentions=Sum("number_of_mentions"),
-        communications=Sum("number_of_community_communications"),
-        people_reached=Sum("number_of_people_reached_through_social_media"),
+    operation_aggregations = operation_reports.filter(metric=metric).aggregate(
+        **operation_sums
     )
+    alternative_operation_aggregations = operation_reports.aggregate(**operation_sums)
+
+    # One query per relation, so that the joins of a relation do not multiply the others
+    relations = {}
+    for dimension in DIMENSIONS:
+        if dimension.kind == DISTINCT_COUNT:
+            relations.setdefault(dimension.column, []).append(dimension)
+    for relation, dimensions in relations.items():
+        aggregations.update(
+            reports.aggregate(
+                **{
+                    f"total_{dimension.goal_field}": Count(
+                        relation,
+                        distinct=True,
+                        filter=dimension.condition("") if dimension.condition else None,
+                    )
+                    for dimension in dimensions
+                }
+            )
+        )
 
-    editor_qs = Editor.objects.filter(editors__in=reports).distinct()
-    organizer_qs = Organizer.objects.filter(organizers__in=reports).distinct()
-
-    return {
-        # Content metrics
-        "Wikipedia (created)": reports_aggregations["wikipedia_created"] or 0,
-        "Wikipedia (edited)": reports_aggregations["wikipedia_edited"] or 0,
-        "Wikimedia Commons (created)": reports_aggregations["commons_created"] or 0,
-        "Wikimedia Commons (edited)": reports_aggregations["commons_edited"] or 0,
-        "Wikidata (created)": reports_aggregations["wikidata_created"] or 0,
-        "Wikidata (edited)": reports_aggregations["wikidata_edited"] or 0,
-        "Wikiversity (created)": reports_aggregations["wikiversity_created"] or 0,
-        "Wikiversity (edited)": reports_aggregations["wikiversity_edited"] or 0,
-        "Wikibooks (created)": reports_aggregations["wikibooks_created"] or 0,
-        "Wikibooks (edited)": reports_aggregations["wikibooks_edited"] or 0,
-        "Wikisource (created)": reports_aggregations["wikisource_created"] or 0,
-        "Wikisource (edited)": reports_aggregations["wikisource_edited"] or 0,
-        "Wikinews (created)": reports_aggregations["wikinews_created"] or 0,
-        "Wikinews (edited)": reports_aggregations["wikinews_edited"] or 0,
-        "Wikiquote (created)": reports_aggregations["wikiquote_created"] or 0,
-        "Wikiquote (edited)": reports_aggregations["wikiquote_edited"] or 0,
-        "Wiktionary (created)": reports_aggregations["wiktionary_created"] or 0,
-        "Wiktionary (edited)": reports_aggregations["wiktionary_edited"] or 0,
-        "Wikivoyage (created)": reports_aggregations["wikivoyage_created"] or 0,
-        "Wikivoyage (edited)": reports_aggregations["wikivoyage_edited"] or 0,
-        "Wikispecies (created)": reports_aggregations["wikispecies_created"] or 0,
-        "Wikispecies (edited)": reports_aggregations["wikispecies_edited"] or 0,
-        "MetaWiki (created)": reports_aggregations["metawiki_created"] or 0,
-        "MetaWiki (edited)": reports_aggregations["metawiki_edited"] or 0,
-        "MediaWiki (created)": reports_aggregations["mediawiki_created"] or 0,
-        "MediaWiki (edited)": reports_aggregations["mediawiki_edited"] or 0,
-        "Wikifunctions (created)": reports_aggregations["wikifunctions_created"] or 0,
-        "Wikifunctions (edited)": reports_aggregations["wikifunctions_edited"] or 0,
-        "Incubator (created)": reports_aggregations["incubator_created"] or 0,
-        "Incubator (edited)": reports_aggregations["incubator_edited"] or 0,
-        # Financial metrics
-        "Number of donors": reports_aggregations["donors"] or 0,
-        "Number of submissions": reports_aggregations["submissions"] or 0,
-        # Community metrics
-        "Number of participants": reports_aggregations["participants"] or 0,
-        "Number of feedbacks": reports_aggregations["feedbacks"] or 0,
-        "Number of editors": editor_qs.count(),
-        "Number of editors retained": editor_qs.filter(retained=True).count(),
-        "Number of new editors": Editor.objects.filter(
-            editors__in=reports,
-            account_creation_date__gte=F("editors__initial_date") - timedelta(days=30),
-        ).distinct().count(),
-        "Number of organizers": organizer_qs.count(),
-        "Number of organizers retained": organizer_qs.filter(retained=True).count(),
-        "Number of new organizers": Organizer.objects.filter(organizers__in=reports, first_seen_at__gte=F("organizers__initial_date")).distinct().count(),
-        "Number of partnerships activated": Partner.objects.filter(partners__in=reports)
-        .distinct()
-        .count(),
-        "Number of new partnerships": operation_aggregations["new_partnerships"] or alternative_operation_aggregations["new_partnerships"] or 0,
-        "Number of resources": operation_aggregations["resources"]
-        or alternative_operation_aggregations["resources"]
-        or 0,
-        "Number of events": operation_aggregations["events"]
-        or alternative_operation_aggregations["events"]
-        or 0,
-        # Communication metrics
-        "Number of new followers": operation_aggregations["new_followers"]
-        or alternative_operation_aggregations["new_followers"]
-        or 0,
-        "Number of mentions": operation_aggregations["mentions"]
-        or alternative_operation_aggregations["mentions"]
-        or 0,
-        "Number of community communications": operation_aggregations["communications"]
-        or alternative_operation_aggregations["communications"]
-        or 0,
-        "Number of people reached through social media": operation_aggregations[
-            "people_reached"
-        ]
-        or alternative_operation_aggregations["people_reached"]
-        or 0,
-        # Other metrics
-        "Occurrence": reports.filter(metrics_related__boolean_type=True).exists(),
-    }
+    done = {}
+    for dimension in DIMENSIONS:
+        alias = f"total_{dimension.goal_field}"
+        if dimension.kind == OPERATION_SUM:
+            done[dimension.name] = (
+                operation_aggregations[alias]
+                or alternative_operation_aggregations[alias]
+                or 0
+            )
+        elif dimension.kind == EXISTS:
+            done[dimension.name] = reports.filter(
+                metrics_related__boolean_type=True
+            ).exists()
+        else:
+            done[dimension.name] = aggregations[alias] or 0
+    return done
 
 
 def shorten_duplicate_refs(wikitext):
@@ -861,22 +1018,31 @@ def construct_wikitext(results, wikitext):
 
 
 def build_wiki_ref_for_reports(metric, supplementary_query=Q()):
-    query = Q(metrics_related__in=[metric]) & supplementary_query
-    reports = Report.objects.filter(query)
-    refs_set = []
-    for report in reports:
-        if not report.reference_text:
-            links = report.links.replace("\\r\\n", "\r\n").splitlines()
-            formatted_links = []
-            for link in links:
-                formatted_links.append(wikify_link(link))
-
-            ref_content = ", ".join(formatted_links)
-            if ref_content:
-                refs_set.append(f'<ref name="sara-{report.id}">{ref_content}</ref>')
-        else:
-            refs_set.append(report.reference_text)
-    return "".join(refs_set)
+    return build_wiki_refs_for_metrics([metric.id], supplementary_query).get(metric.id, "")
+
+
+def build_wiki_refs_for_metrics(metric_ids, supplementary_query=Q()):
+    """
+    Returns the references of the reports of each metric, as a dictionary of wikitext
+    keyed by metric id. The reports of all the metrics are read in a single query and the
+    references of each one are built once, however many metrics it is related to.
+    """
+    rows = (
+        Report.metrics_related.through.objects.filter(
+            metric_id__in=metric_ids,
+            report__in=Report.objects.filter(supplementary_query).values("pk"),
+        )
+        .order_by("metric_id", "report_id")
+        .values_list("metric_id", "report_id", "report__reference_text", "report__links")
+    )
+
+    report_refs = {}
+    refs_sets = defaultdict(list)
+    for metric_id, report_id, reference_text, links in rows:
+        if report_id not in report_refs:
+            report_refs[report_id] = reference_text or build_wiki_ref(links, report_id)
+        refs_sets[metric_id].append(report_refs[report_id])
+    return {metric_id: "".join(refs_set) for metric_id, refs_set in refs_sets.items()}
 
 
 def is_there_a_final_report(reports):
@@ -887,53 +1053,139 @@ def is_there_a_final_report(reports):
         or False
     )
 
-def find_empty_metric_associations(metric_query=Q(), partial=False):
+def find_empty_metric_associations(metric_query=Q(), partial=False, since=None):
     """
     Reports linked to a metric via `metrics_related` that contribute zero to it.
 
-    Relevant dimensions = keys of get_goal_for_metric() with a nonzero goal.
+    Relevant dimensions = dimensions of Metric.nonzero_goals.
     The boolean "Occurrence" is skipped (it's a truth value, not a number).
 
     partial=False -> flag a report only if it contributes zero to EVERY relevant
                      dimension (i.e. the association produced nothing).
     partial=True  -> flag every (report, dimension) where done == 0, even if the
                      report contributed to other dimensions of the same metric.
+    since         -> only check the reports created on or after this date.
+
+    See get_empty_metric_associations for a version that can be paginated.
     """
-    results = []
+    metrics = get_metrics_with_relevant_dimensions(metric_query)
+    return describe_empty_metric_associations(
+        get_empty_metric_associations(metrics, partial, since), metrics
+    )
+
 
+def get_metrics_with_relevant_dimensions(metric_query=Q()):
+    """
+    Metrics matching metric_query that have a goal in a numeric dimension, keyed by id,
+    with their relevant dimensions and goals in `relevant`.
+    """
+    metrics = {}
     for metric in Metric.objects.filter(metric_query).select_related("activity"):
-        goal = get_goal_for_metric(metric)
-        relevant = {
-            key: value
-            for key, value in goal.items()
-            if value and key != "Occurrence"
+        metric.relevant = {
+            key: value for key, value in metric.nonzero_goals if key != "Occurrence"
         }
-        if not relevant:
-            continue
+        if metric.relevant:
+            metrics[metric.id] = metric
+    return metrics
 
-        for report in Report.objects.filter(metrics_related=metric).order_by("pk"):
-            done = get_done_for_report(Report.objects.filter(pk=report.pk), metric)
 
-            zero_dims = [
-                {"dimension": key, "goal": relevant[key], "done": done.get(key) or 0}
-                for key in relevant
+def get_empty_metric_associations(metrics, partial=False, since=None):
+    """
+    Queryset of the (report, metric) associations flagged by find_empty_metric_associations,
+    for the metrics given by get_metrics_with_relevant_dimensions. Whether an association is
+    flagged is decided in the database, by counting its contributions (see MetricContribution)
+    to the relevant dimensions of the metric, so that the queryset can be paginated.
+    """
+    # Metrics sharing the same relevant dimensions are counted by the same subquery
+    metrics_per_dimensions = defaultdict(list)
+    for metric in metrics.values():
+        metrics_per_dimensions[frozenset(metric.relevant)].append(metric.id)
+
+    contributed = Case(
+        *[
+            When(
+                metric_id__in=metric_ids,
+                then=Subquery(
+                    MetricContribution.objects.filter(
+                        report_id=OuterRef("report_id"),
+                        metric_id=OuterRef("metric_id"),
+                        dimension__in=dimensions,
+                    )
+                    .order_by()
+                    .values("metric_id")
+                    .annotate(count=Count("pk"))
+                    .values("count")
+                ),
+            )
+            for dimensions, metric_ids in metrics_per_dimensions.items()
+        ],
+        output_field=IntegerField(),
+    )
+    expected = Case(
+        *[
+            When(metric_id__in=metric_ids, then=Value(len(dimensions)))
+            for dimensions, metric_ids in metrics_per_dimensions.items()
+        ],
+        output_field=IntegerField(),
+    )
+
+    associations = (
+        Report.metrics_related.through.objects.filter(metric_id__in=metrics.keys())
+        .annotate(contributed=Coalesce(contributed, 0), expected=expected)
+        .order_by("metric_id", "report_id")
+    )
+    if since:
+        associations = associations.filter(report__created_at__date__gte=since)
+    if partial:
+        associations = associations.filter(contributed__lt=F("expected"))
+    else:
+        associations = associations.filter(contributed=0)
+    return associations.values(
+        "metric_id",
+        "report_id",
+        "report__description",
+        "report__initial_date",
+        "report__end_date",
+        "report__partial_report",
+    )
+
+
+def describe_empty_metric_associations(associations, metrics):
+    """
+    Rows of the empty metric associations given, with the dimensions each one contributes
+    zero to. The contributions are read EMPTY_ASSOCIATIONS_PER_QUERY associations at a time,
+    filtered by their reports and metrics and matched to the pairs here, since a condition
+    per pair overflows the expression depth allowed by SQLite.
+    """
+    associations = list(associations)
+    contributions = defaultdict(dict)
+    for start in range(0, len(associations), EMPTY_ASSOCIATIONS_PER_QUERY):
+        chunk = associations[start:start + EMPTY_ASSOCIATIONS_PER_QUERY]
+        pairs = {(association["report_id"], association["metric_id"]) for association in chunk}
+        for report_id, metric_id, dimension, value in MetricContribution.objects.filter(
+            report_id__in={report_id for report_id, _metric_id in pairs},
+            metric_id__in={metric_id for _report_id, metric_id in pairs},
+        ).values_list("report_id", "metric_id", "dimension", "value"):
+            if (report_id, metric_id) in pairs:
+                contributions[(report_id, metric_id)][dimension] = value
+
+    results = []
+    for association in associations:
+        metric = metrics[association["metric_id"]]
+        done = contributions[(association["report_id"], metric.id)]
+        results.append({
+            "metric_id": metric.id,
+            "metric": metric.text,
+            "activity": metric.activity.text,
+            "report_id": association["report_id"],
+            "report": association["report__description"],
+            "initial_date": association["report__initial_date"],
+            "end_date": association["report__end_date"],
+            "partial_report": association["report__partial_report"],
+            "zero_dimensions": [
+                {"dimension": key, "goal": goal, "done": 0}
+                for key, goal in metric.relevant.items()
                 if not done.get(key)
-            ]
-            if not zero_dims:
-                continue
-            if not partial and len(zero_dims) != len(relevant):
-                continue  # contributed to at least one dimension
-
-            results.append({
-                "metric_id": metric.id,
-                "metric": metric.text,
-                "activity": metric.activity.text,
-                "report_id": report.id,
-                "report": report.description,
-                "initial_date": report.initial_date,
-                "end_date": report.end_date,
-                "partial_report": report.partial_report,
-                "zero_dimensions": zero_dims,
-            })
-
-    return results
\ No newline at end of file
+            ],
+        })
+    return results
@@ -2,6 +2,7 @@ from django.contrib import admin
 
 from .models import (
     Editor,
+    ExportJob,
     Funding,
     OperationReport,
     Organizer,
@@ -17,3 +18,4 @@ admin.site.register(Organizer)
 admin.site.register(Technology)
 admin.site.register(Report)
 admin.site.register(OperationReport)
+admin.site.register(ExportJob)
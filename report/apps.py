@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ReportConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "report"
+
+    def ready(self):
+        from report import artifacts
+
+        artifacts.connect_signals()
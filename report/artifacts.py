@@ -0,0 +1,256 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+
+from metrics.cache import is_cache_shared
+from metrics.models import Activity, Metric, Project
+from report.models import (
+    Editor,
+    Funding,
+    OperationReport,
+    Organizer,
+    Partner,
+    Report,
+    Technology,
+)
+from strategy.models import (
+    Direction,
+    LearningArea,
+    StrategicAxis,
+    StrategicLearningQuestion,
+)
+from users.models import Position, TeamArea, UserPosition, UserProfile
+
+VERSION_KEY = "report_artifacts_version:{}"
+
+# Paths from Report to the objects of other models written in the exports of its years,
+# whose changes are not seen in the data of the reports of the year
+REPORT_PATHS = {
+    OperationReport: ["operation_report"],
+    Metric: ["metrics_related", "operation_report__metric", "activity_associated__metrics"],
+    Activity: ["activity_associated"],
+    Project: ["funding_associated__project"],
+    Funding: ["funding_associated"],
+    Editor: ["editors"],
+    Organizer: ["organizers"],
+    Partner: ["partners_activated", "organizers__institution"],
+    Technology: ["technologies_used"],
+    TeamArea: ["area_responsible", "area_activated"],
+    Direction: ["directions_related"],
+    StrategicAxis: ["directions_related__strategic_axis"],
+    StrategicLearningQuestion: ["learning_questions_related"],
+    LearningArea: ["learning_questions_related__learning_area"],
+    UserProfile: ["created_by", "modified_by"],
+    User: ["created_by__user", "modified_by__user"],
+    UserPosition: ["created_by__position_history", "modified_by__position_history"],
+    Position: [
+        "created_by__position_history__position",
+        "modified_by__position_history__position",
+    ],
+}
+
+# Relations of Report whose objects are exported with the number of reports including
+# them, which counts the reports of every year
+COUNTED_RELATIONS = ("editors", "organizers", "partners_activated", "technologies_used")
+
+
+def get_year_reports(year):
+    return Report.objects.filter(Q(initial_date__year=year) | Q(end_date__year=year))
+
+
+def get_year_data_version(year):
+    """
+    Stamp of the data of the exports of the year: it changes whenever one of the reports of
+    the year is created, updated or deleted, when their operation reports or the objects of
+    their many-to-many relations are added or removed, and when an object written in the
+    exports of the year changes (see REPORT_PATHS and COUNTED_RELATIONS).
+    """
+    reports = get_year_reports(year)
+    stamp = [
+        reports.aggregate(last_modified=Max("modified_at"), count=Count("pk")),
+        OperationReport.objects.filter(report__in=reports.values("pk")).aggregate(
+            count=Count("pk"), ids=Sum("pk")
+        ),
+    ]
+    # Through rows get new ids when added again, so their count and sum follow any change
+    for field in Report._meta.many_to_many:
+        stamp.append(
+            field.remote_field.through.objects.filter(
+                **{f"{field.m2m_field_name()}__in": reports.values("pk")}
+            ).aggregate(count=Count("pk"), ids=Sum("pk"))
+        )
+    stamp.append(cache.get_or_set(VERSION_KEY.format(year), uuid.uuid4().hex, None))
+    return hashlib.md5(repr(stamp).encode("utf-8")).hexdigest()
+
+
+def get_or_build_artifact(kind, year, lang, formats, build):
+    """
+    Returns the name of the export file of the year and the file, open for reading, kept on
+    disk under EXPORT_ARTIFACTS_ROOT. The file is built with build(), which returns a name
+    and an iterable of the content, only if there is none for the current data version of
+    the year; the files of the previous versions are removed then.
+
+    Nothing is kept with a per-process cache, which would not see the changes made by the
+    other processes: the file is built in a temporary file instead.
+    """
+    if not is_cache_shared():
+        file_name, content = build()
+        file = tempfile.TemporaryFile()
+        for chunk in content:
+            file.write(chunk)
+        file.seek(0)
+        return file_name, file
+
+    variant = "-".join([lang or "default", *sorted(formats)])
+    directory = os.path.join(get_artifacts_root(), kind, str(year), variant)
+    version = get_year_data_version(year)
+    version_directory = os.path.join(directory, version)
+    os.makedirs(directory, exist_ok=True)
+
+    # Files are opened under the lock, so they cannot be removed before being opened
+    with locked(directory, fcntl.LOCK_SH):
+        artifact = open_artifact(version_directory)
+    if artifact:
+        return artifact
+
+    # Each build writes its own temporary file, so concurrent builds do not mix
+    file_name, content = build()
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            for chunk in content:
+                file.write(chunk)
+
+        with locked(directory, fcntl.LOCK_EX):
+            os.makedirs(version_directory, exist_ok=True)
+            path = os.path.join(version_directory, file_name)
+            os.replace(temporary_path, path)
+            file = open(path, "rb")
+
+            for entry in os.listdir(directory):
+                entry_path = os.path.join(directory, entry)
+                if entry != version and os.path.isdir(entry_path):
+                    shutil.rmtree(entry_path, ignore_errors=True)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    return file_name, file
+
+
+def open_artifact(version_directory):
+    if not os.path.isdir(version_directory):
+        return None
+    for file_name in os.listdir(version_directory):
+        return file_name, open(os.path.join(version_directory, file_name), "rb")
+    return None
+
+
+@contextmanager
+def locked(directory, operation):
+    """
+    Holds a lock on the artifacts of the directory, shared by all the processes.
+    """
+    with open(os.path.join(directory, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_artifacts_root():
+    return settings.EXPORT_ARTIFACTS_ROOT
+
+
+def invalidate_years(reports):
+    """
+    Changes the data version of the years of the reports, so their artifacts are rebuilt.
+    """
+    years = set()
+    for initial_year, end_year in reports.values_list(
+        "initial_date__year", "end_date__year"
+    ).distinct():
+        years.update(year for year in (initial_year, end_year) if year)
+    if years:
+        cache.set_many(
+            {VERSION_KEY.format(year): uuid.uuid4().hex for year in years}, None
+        )
+
+
+def related_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only updates the last login of the user, which is not exported
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_years(
+        Report.objects.filter(
+            reduce(or_, [Q(**{path: instance.pk}) for path in REPORT_PATHS[sender]])
+        )
+    )
+
+
+def counted_relation_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    field_name = next(
+        name for name in COUNTED_RELATIONS if getattr(Report, name).through is sender
+    )
+    if reverse:
+        related_ids = [instance.pk]
+    elif action == "pre_clear":
+        related_ids = getattr(instance, field_name).values("pk")
+    else:
+        related_ids = pk_set
+    invalidate_years(Report.objects.filter(**{f"{field_name}__in": related_ids}))
+
+
+def institutions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        organizer_ids = [instance.pk]
+    elif action == "pre_clear":
+        organizer_ids = instance.organizer_institution.values("pk")
+    else:
+        organizer_ids = pk_set
+    invalidate_years(Report.objects.filter(organizers__in=organizer_ids))
+
+
+def report_deleting(sender, instance, **kwargs):
+    # The reports of other years sharing the counted objects are counted one less
+    invalidate_years(
+        Report.objects.filter(
+            reduce(
+                or_,
+                [
+                    Q(**{f"{field_name}__in": getattr(instance, field_name).values("pk")})
+                    for field_name in COUNTED_RELATIONS
+                ],
+            )
+        )
+    )
+
+
+def connect_signals():
+    for model in REPORT_PATHS:
+        post_save.connect(related_changed, sender=model)
+        pre_delete.connect(related_changed, sender=model)
+    for field_name in COUNTED_RELATIONS:
+        m2m_changed.connect(
+            counted_relation_changed, sender=getattr(Report, field_name).through
+        )
+    m2m_changed.connect(institutions_changed, sender=Organizer.institution.through)
+    pre_delete.connect(report_deleting, sender=Report)
+
@@ -3,13 +3,13 @@ from urllib.parse import quote
 
 import requests
 from django import forms
-from django.core.exceptions import FieldDoesNotExist
 from django.db.models import Q
 from django.db.models.functions import Lower
 from django.forms import inlineformset_factory
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
+from metrics.dimensions import CONTENT_DIMENSIONS, DIMENSIONS_BY_NAME
 from metrics.link_utils import build_wiki_ref
 from metrics.models import Area, Metric, Project
 from report.models import (
@@ -256,39 +256,24 @@ class NewReportForm(forms.ModelForm):
         main_funding = Project.objects.get(main_funding=True)
         metrics_main_funding = Metric.objects.filter(project=main_funding)
 
-        int_fields_names = [
-            ["wikipedia_created", "wikipedia_edited"],
-            ["commons_created", "commons_edited"],
-            ["wikidata_created", "wikidata_edited"],
-            ["wikiversity_created", "wikiversity_edited"],
-            ["wikibooks_created", "wikibooks_edited"],
-            ["wikisource_created", "wikisource_edited"],
-            ["wikinews_created", "wikinews_edited"],
-            ["wikiquote_created", "wikiquote_edited"],
-            ["wiktionary_created", "wiktionary_edited"],
-            ["wikivoyage_created", "wikivoyage_edited"],
-            ["wikispecies_created", "wikispecies_edited"],
-            ["metawiki_created", "metawiki_edited"],
-            ["mediawiki_created", "mediawiki_edited"],
-            ["wikifunctions_created", "wikifunctions_edited"],
-            ["incubator_created", "incubator_edited"],
-            ["participants"],
-            ["feedbacks"],
+        # Created and edited dimensions of each wiki come in pairs in the registry
+        int_dimensions = [
+            [created, edited]
+            for created, edited in zip(CONTENT_DIMENSIONS[::2], CONTENT_DIMENSIONS[1::2])
+        ]
+        int_dimensions += [
+            [DIMENSIONS_BY_NAME["Number of participants"]],
+            [DIMENSIONS_BY_NAME["Number of feedbacks"]],
         ]
 
-        for field_set in int_fields_names:
+        for dimensions in int_dimensions:
             if any(
-                self.cleaned_data.get(field_name, 0) > 0 for field_name in field_set
+                self.cleaned_data.get(dimension.column, 0) > 0
+                for dimension in dimensions
             ):
                 query = Q()
-                for field in field_set:
-                    try:
-                        Metric._meta.get_field(field)
-                        metric_field = field
-                    except FieldDoesNotExist:
-                        metric_field = f"number_of_{field}"
-
-                    query |= Q(**{f"{metric_field}__gt": 0})
+                for dimension in dimensions:
+                    query |= Q(**{f"{dimension.goal_field}__gt": 0})
 
                 metrics_related = metrics_related.union(
                     metrics_main_funding.filter(query)
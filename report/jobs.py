@@ -0,0 +1,168 @@
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import translation
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from report.models import ExportJob
+
+# Kinds of export jobs and the function building their file. Each function receives the
+# parameters of the job and returns the name of the file and an iterable of its content.
+EXPORT_JOB_KINDS = {
+    "report": "report.views.build_report_export",
+    "timespan_report": "metrics.views.build_timespan_report",
+    "wmf_report": "metrics.views.build_wmf_report",
+}
+
+_executor = None
+
+
+def enqueue_job(kind, user_profile, lang="", **parameters):
+    """
+    Creates a pending export job. If EXPORT_JOBS_THREADS is set, the job is also handed to
+    the thread pool once the transaction is committed; otherwise the run_export_jobs
+    management command picks it up.
+    """
+    if kind not in EXPORT_JOB_KINDS:
+        raise ValueError(f"Invalid export job kind: {kind}")
+
+    job = ExportJob.objects.create(
+        kind=kind, parameters=parameters, lang=lang, created_by=user_profile
+    )
+    if settings.EXPORT_JOBS_THREADS:
+        transaction.on_commit(lambda: get_executor().submit(run_job_in_thread, job.pk))
+    return job
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.EXPORT_JOBS_THREADS)
+    return _executor
+
+
+def run_job_in_thread(job_id):
+    try:
+        job = ExportJob.objects.get(pk=job_id)
+        if claim_job(job):
+            run_job(job)
+    finally:
+        # The thread has its own connections, which would be left open otherwise
+        connections.close_all()
+
+
+def claim_job(job):
+    """
+    Marks the job as running if it is still pending. The update is conditional, so a job
+    is claimed by a single worker even when several of them poll the queue.
+    """
+    started_at = now()
+    claimed = ExportJob.objects.filter(
+        pk=job.pk, status=ExportJob.Status.PENDING
+    ).update(status=ExportJob.Status.RUNNING, started_at=started_at)
+    if claimed:
+        job.status = ExportJob.Status.RUNNING
+        job.started_at = started_at
+    return bool(claimed)
+
+
+def claim_next_job():
+    """
+    Claims the oldest pending job, if any.
+    """
+    for job in ExportJob.objects.filter(status=ExportJob.Status.PENDING).order_by("pk"):
+        if claim_job(job):
+            return job
+    return None
+
+
+def run_job(job):
+    """
+    Builds the file of a claimed job and writes it to EXPORT_JOBS_ROOT. Failures are
+    recorded on the job instead of being raised. The job is only finished if it is still
+    running, as it may have been failed as abandoned meanwhile (see fail_abandoned_jobs).
+    """
+    file_path = ""
+    try:
+        build = import_string(EXPORT_JOB_KINDS[job.kind])
+        with translation.override(job.lang or settings.LANGUAGE_CODE):
+            file_name, content = build(**job.parameters)
+
+            os.makedirs(get_jobs_root(), exist_ok=True)
+            file_path = os.path.join(get_jobs_root(), f"{job.pk}-{file_name}")
+            with open(file_path + ".part", "wb") as file:
+                for chunk in content:
+                    file.write(chunk)
+            os.replace(file_path + ".part", file_path)
+    except Exception:
+        fields = {
+            "status": ExportJob.Status.FAILED,
+            "error": traceback.format_exc(),
+            "file_name": "",
+            "file_path": "",
+        }
+        remove_file(file_path + ".part")
+    else:
+        fields = {
+            "status": ExportJob.Status.DONE,
+            "error": "",
+            "file_name": file_name,
+            "file_path": file_path,
+        }
+    fields["finished_at"] = now()
+
+    finished = ExportJob.objects.filter(
+        pk=job.pk, status=ExportJob.Status.RUNNING
+    ).update(**fields)
+    if finished:
+        for name, value in fields.items():
+            setattr(job, name, value)
+    else:
+        # The file of a job failed meanwhile would never be downloaded nor pruned
+        remove_file(fields["file_path"])
+        job.refresh_from_db()
+
+
+def fail_abandoned_jobs():
+    """
+    Fails the jobs running for longer than EXPORT_JOBS_TIMEOUT seconds, whose worker is
+    assumed to have died. They are not run again, as they may be what killed it.
+    """
+    return ExportJob.objects.filter(
+        status=ExportJob.Status.RUNNING,
+        started_at__lt=now() - timedelta(seconds=settings.EXPORT_JOBS_TIMEOUT),
+    ).update(
+        status=ExportJob.Status.FAILED,
+        error="The export was abandoned by its worker",
+        finished_at=now(),
+    )
+
+
+def prune_expired_jobs():
+    """
+    Deletes the jobs finished more than EXPORT_JOBS_RETENTION_DAYS days ago, and their files.
+    """
+    expired = ExportJob.objects.filter(
+        finished_at__lt=now() - timedelta(days=settings.EXPORT_JOBS_RETENTION_DAYS)
+    )
+    for file_path in expired.exclude(file_path="").values_list("file_path", flat=True):
+        remove_file(file_path)
+    return expired.delete()[0]
+
+
+def remove_file(file_path):
+    if not file_path:
+        return
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def get_jobs_root():
+    return settings.EXPORT_JOBS_ROOT
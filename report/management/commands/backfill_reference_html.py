@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from report.models import Report
+
+
+class Command(BaseCommand):
+    help = "Render the reference html of the reports that do not have it yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Render the reference html of every report, not only the missing ones",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of reports updated at once",
+        )
+
+    def handle(self, *args, **options):
+        reports = Report.objects.order_by("pk").only(
+            "pk", "links", "reference_text", "reference_html"
+        )
+        if not options["all"]:
+            reports = reports.filter(reference_html="")
+
+        start = now()
+        self.stdout.write("Rendering reference html...")
+        updated = 0
+        chunk = []
+        for report in reports.iterator(chunk_size=options["chunk_size"]):
+            reference_html = report.get_reference_html()
+            if reference_html != report.reference_html:
+                report.reference_html = reference_html
+                chunk.append(report)
+            if len(chunk) >= options["chunk_size"]:
+                updated += Report.objects.bulk_update(chunk, ["reference_html"])
+                chunk = []
+        if chunk:
+            updated += Report.objects.bulk_update(chunk, ["reference_html"])
+        end = now()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reference html of {updated} reports rendered in "
+                f"{(end - start).total_seconds()} seconds"
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from metrics.aggregation import refresh_metric_contributions
+from report.models import Report
+
+
+class Command(BaseCommand):
+    help = "Rebuild the metric contributions of every report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of reports recomputed at once",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        report_ids = list(Report.objects.order_by("pk").values_list("pk", flat=True))
+
+        start = now()
+        self.stdout.write("Rebuilding metric contributions...")
+        for index in range(0, len(report_ids), chunk_size):
+            refresh_metric_contributions(
+                Report.objects.filter(pk__in=report_ids[index : index + chunk_size])
+            )
+        end = now()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Metric contributions of {len(report_ids)} reports rebuilt in "
+                f"{(end - start).total_seconds()} seconds"
+            )
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from report.jobs import claim_next_job, fail_abandoned_jobs, prune_expired_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run the pending export jobs, polling the database for new ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no pending jobs left instead of polling",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before looking for new jobs when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            if abandoned := fail_abandoned_jobs():
+                self.stdout.write(self.style.ERROR(f"{abandoned} abandoned export jobs failed"))
+            prune_expired_jobs()
+
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.stdout.write(f"Running export job {job.pk} ({job.kind})...")
+            run_job(job)
+            if job.status == job.Status.DONE:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Export job {job.pk} done in "
+                        f"{(job.finished_at - job.started_at).total_seconds()} seconds"
+                    )
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f"Export job {job.pk} failed"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0004_alter_metric_commons_created_and_more'),
+        ('report', '0007_alter_editor_first_seen_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=100)),
+                ('value', models.IntegerField(default=0)),
+                ('metric', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_contributions', to='metrics.metric')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_contributions', to='report.report')),
+            ],
+            options={
+                'verbose_name': 'Metric contribution',
+                'verbose_name_plural': 'Metric contributions',
+                'constraints': [models.UniqueConstraint(fields=('report', 'metric', 'dimension'), name='unique_metric_contribution')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0009_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='reference_html',
+            field=models.TextField(blank=True, default='', editable=False, help_text='The reference of the report, rendered in html', verbose_name='Reference html'),
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.db import models
 from django.utils.translation import gettext as _
 
-from metrics.link_utils import build_wiki_ref
+from metrics.link_utils import build_wiki_ref, collect_references
 from metrics.models import Activity, Metric, Project
 from strategy.models import Direction, StrategicLearningQuestion
 from users.models import TeamArea, UserProfile
@@ -76,6 +76,10 @@ class Technology(models.Model):
         return self.name
 
 
+# Fields of Report the rendered reference is built from
+REFERENCE_FIELDS = {"reference_text", "links", "description"}
+
+
 class Report(models.Model):
     # ==================================================================================================================
     # IDENTIFICATION
@@ -115,6 +119,13 @@ class Report(models.Model):
         default="",
         help_text=_("The reference text of the report, in wikitext"),
     )
+    reference_html = models.TextField(
+        _("Reference html"),
+        blank=True,
+        default="",
+        editable=False,
+        help_text=_("The reference of the report, rendered in html"),
+    )
 
     # ==================================================================================================================
     # ADMINISTRATIVE
@@ -472,8 +483,39 @@ class Report(models.Model):
     def save(self, *args, **kwargs):
         if not self.end_date:
             self.end_date = self.initial_date
+
+        # The rendered reference depends on these fields, so it is rendered again when
+        # any of them is saved
+        update_fields = kwargs.get("update_fields")
+        refresh_reference = update_fields is None or bool(
+            REFERENCE_FIELDS.intersection(update_fields)
+        )
+        is_new = self.pk is None
+        if refresh_reference and not is_new:
+            self.reference_html = self.get_reference_html()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "reference_html"}
         super(Report, self).save(*args, **kwargs)
 
+        # The reference of a new report is named after its ID, known only now
+        if refresh_reference and is_new:
+            self.reference_html = self.get_reference_html()
+            if self.reference_html:
+                Report.objects.filter(pk=self.pk).update(
+                    reference_html=self.reference_html
+                )
+
+    def get_reference_wikitext(self):
+        """
+        The reference of the report: its reference text or, when there is none, the one
+        built from its links.
+        """
+        return self.reference_text or build_wiki_ref(self.links or "", self.pk)
+
+    def get_reference_html(self):
+        references = collect_references(self.get_reference_wikitext(), {})
+        return references.get(str(self.pk), "")
+
     def __str__(self):
         return self.description
 
@@ -506,3 +548,75 @@ class OperationReport(models.Model):
 
     def __str__(self):
         return self.report.description + " - " + self.metric.text
+
+
+class MetricContribution(models.Model):
+    """
+    Denormalized contribution of a report to one dimension of a metric it is related to,
+    i.e. the value get_done_for_report gives for the report alone. Only nonzero contributions
+    are stored. Kept up to date by the signals of metrics.aggregation and rebuilt with the
+    rebuild_metric_contributions management command.
+    """
+
+    report = models.ForeignKey(
+        Report, related_name="metric_contributions", on_delete=models.CASCADE
+    )
+    metric = models.ForeignKey(
+        Metric, related_name="report_contributions", on_delete=models.CASCADE
+    )
+    dimension = models.CharField(max_length=100)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Metric contribution")
+        verbose_name_plural = _("Metric contributions")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["report", "metric", "dimension"],
+                name="unique_metric_contribution",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.report_id} - {self.metric_id} - {self.dimension}"
+
+
+class ExportJob(models.Model):
+    """
+    Export computed in the background by the run_export_jobs management command (or by the
+    thread pool of report.jobs), the database being used as the queue. The file produced
+    is written to EXPORT_JOBS_ROOT and downloaded from the status page of the job.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        RUNNING = "running", _("Running")
+        DONE = "done", _("Done")
+        FAILED = "failed", _("Failed")
+
+    kind = models.CharField(max_length=50)
+    parameters = models.JSONField(default=dict, blank=True)
+    lang = models.CharField(max_length=10, blank=True, default="")
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    created_by = models.ForeignKey(
+        UserProfile, related_name="export_jobs", on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    file_name = models.CharField(max_length=420, blank=True, default="")
+    file_path = models.CharField(max_length=1000, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        verbose_name = _("Export job")
+        verbose_name_plural = _("Export jobs")
+
+    def __str__(self):
+        return f"{self.kind} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
+from io import StringIO
 
+from django.core.management import call_command
 from django.db import IntegrityError
 from django.test import TestCase
 
@@ -174,6 +176,58 @@ class ReportModelTest(TestCase):
         )
         self.assertEqual(str(report), "Report")
 
+    def create_report(self, **kwargs):
+        return Report.objects.create(
+            created_by=self.user_profile,
+            modified_by=self.user_profile,
+            activity_associated=self.activity,
+            area_responsible=self.team_area,
+            initial_date=datetime.now().date(),
+            description="Report",
+            learning="Learning",
+            **kwargs,
+        )
+
+    def test_reference_html_is_rendered_on_creation(self):
+        report = self.create_report(links="https://www.wikidata.org/wiki/Q42")
+
+        report.refresh_from_db()
+        self.assertEqual(
+            report.reference_html,
+            f'<li id="sara-{report.pk}">{report.pk}. <a target="_blank" '
+            'href="https://www.wikidata.org/wiki/Q42">Q42</a></li>',
+        )
+
+    def test_reference_html_follows_the_reference_text(self):
+        report = self.create_report(links="https://testlink.com")
+
+        report.reference_text = f'<ref name="sara-{report.pk}">Reference</ref>'
+        report.save(update_fields=["reference_text"])
+
+        report.refresh_from_db()
+        self.assertEqual(
+            report.reference_html, f'<li id="sara-{report.pk}">{report.pk}. Reference</li>'
+        )
+
+    def test_reference_html_is_invalidated_when_the_links_change(self):
+        report = self.create_report(links="https://testlink.com")
+
+        report.links = "https://other.com"
+        report.save()
+
+        report.refresh_from_db()
+        self.assertIn("https://other.com", report.reference_html)
+        self.assertNotIn("https://testlink.com", report.reference_html)
+
+    def test_backfill_reference_html_renders_the_missing_references(self):
+        report = self.create_report(links="https://testlink.com")
+        expected = Report.objects.get(pk=report.pk).reference_html
+        Report.objects.filter(pk=report.pk).update(reference_html="")
+
+        call_command("backfill_reference_html", stdout=StringIO())
+
+        self.assertEqual(Report.objects.get(pk=report.pk).reference_html, expected)
+
 
 class OperationReportModelTest(TestCase):
     def setUp(self):
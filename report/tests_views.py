@@ -1,18 +1,35 @@
+import csv
+import os
+import re
+import shutil
+import tempfile
 import zipfile
-from datetime import datetime
-from io import BytesIO
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
 from unittest.mock import patch
 
 import pandas as pd
 from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import translation
 from django.utils.translation import gettext as _
 
 from metrics.models import Activity, Area, Metric
+from report.artifacts import get_or_build_artifact
 from report.forms import NewReportForm
+from report.jobs import (
+    claim_job,
+    claim_next_job,
+    enqueue_job,
+    fail_abandoned_jobs,
+    prune_expired_jobs,
+    run_job,
+)
 from report.models import (
     Editor,
+    ExportJob,
     Funding,
     OperationReport,
     Organizer,
@@ -35,11 +52,36 @@ from report.views import (
     export_report_instance,
     export_technologies_used,
     export_user_profile,
+    get_editors_rows,
+    get_export_tables,
+    get_funding_rows,
     get_localized_field,
 )
 from strategy.models import Direction, LearningArea, StrategicAxis
 from users.models import Position, TeamArea, User, UserPosition, UserProfile
 
+EXPORT_TABLE_NAMES = [
+    "Report",
+    "Operation report",
+    "Metrics",
+    "Users",
+    "Areas",
+    "Directions",
+    "Editors",
+    "Fundings",
+    "Learning questions",
+    "Organizers",
+    "Partners",
+    "Technologies",
+]
+
+
+def get_sheet_names(workbook):
+    with zipfile.ZipFile(BytesIO(workbook)) as xlsx_file:
+        return re.findall(
+            r'<sheet name="([^"]+)"', xlsx_file.read("xl/workbook.xml").decode()
+        )
+
 
 class ReportAddViewTest(TestCase):
     def setUp(self):
@@ -282,6 +324,12 @@ class ReportAddViewTest(TestCase):
 
         report = Report.objects.get(id=1)
         self.assertEqual(report.description, "Report")
+        self.assertEqual(
+            report.metric_contributions.get(
+                metric=metric, dimension="Number of events"
+            ).value,
+            4,
+        )
 
     def test_add_report_view_post_fails_with_invalid_parameters(self):
         self.client.login(username=self.username, password=self.password)
@@ -1038,6 +1086,23 @@ class ReportExportViewTest(TestCase):
             text="Metric", activity=self.activity_associated
         )
 
+        self.artifacts_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.artifacts_root)
+        cache_location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_location)
+        # The yearly exports are only kept with a cache shared by all the processes
+        artifacts_settings = override_settings(
+            EXPORT_ARTIFACTS_ROOT=self.artifacts_root,
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": cache_location,
+                }
+            },
+        )
+        artifacts_settings.enable()
+        self.addCleanup(artifacts_settings.disable)
+
     def test_export_report_is_only_possible_for_users_with_permissions(self):
         self.user.user_permissions.remove(self.view_permission)
         self.client.login(username=self.username, password=self.password)
@@ -1061,14 +1126,261 @@ class ReportExportViewTest(TestCase):
         content_type = response.headers["Content-Type"]
         self.assertEqual(content_type, "application/x-zip-compressed")
 
-    @patch("report.views.add_csv_file")
-    @patch("report.views.add_excel_file")
+    def test_export_report_streams_the_zip_file(self):
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(reverse("report:export_all_reports"))
+        chunks = list(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        self.assertGreater(len(chunks), 13)
+        with zipfile.ZipFile(BytesIO(b"".join(chunks))) as zip_file:
+            report_csv = next(
+                name for name in zip_file.namelist() if name.startswith("csv/Report")
+            )
+            self.assertIn(b"Report 1", zip_file.read(report_csv))
+            self.assertIn(b"Report 2", zip_file.read(report_csv))
+
+    @patch("report.views.get_export_tables", wraps=get_export_tables)
+    def test_year_export_is_cached_until_the_reports_of_the_year_change(
+        self, mock_get_export_tables
+    ):
+        self.client.login(username=self.username, password=self.password)
+        url = reverse("report:export_year_reports", kwargs={"year": datetime.now().year})
+
+        first = b"".join(self.client.get(url).streaming_content)
+        second = b"".join(self.client.get(url).streaming_content)
+        self.assertEqual(mock_get_export_tables.call_count, 1)
+        self.assertEqual(first, second)
+
+        self.report_1.description = "Changed report"
+        self.report_1.save()
+        third = b"".join(self.client.get(url).streaming_content)
+        self.assertEqual(mock_get_export_tables.call_count, 2)
+        with zipfile.ZipFile(BytesIO(third)) as zip_file:
+            report_csv = next(
+                name for name in zip_file.namelist() if name.startswith("csv/Report")
+            )
+            self.assertIn(b"Changed report", zip_file.read(report_csv))
+
+        # Only the artifact of the current version of the data is kept
+        year_directory = os.path.join(
+            self.artifacts_root, "report", str(datetime.now().year)
+        )
+        for variant in os.listdir(year_directory):
+            variant_directory = os.path.join(year_directory, variant)
+            versions = [
+                entry
+                for entry in os.listdir(variant_directory)
+                if os.path.isdir(os.path.join(variant_directory, entry))
+            ]
+            self.assertEqual(len(versions), 1)
+
+    @patch("report.views.get_export_tables", wraps=get_export_tables)
+    def test_year_export_is_rebuilt_when_related_data_changes(
+        self, mock_get_export_tables
+    ):
+        self.client.login(username=self.username, password=self.password)
+        url = reverse("report:export_year_reports", kwargs={"year": datetime.now().year})
+
+        b"".join(self.client.get(url).streaming_content)
+        self.report_1.editors.add(self.editors)
+        b"".join(self.client.get(url).streaming_content)
+        self.assertEqual(mock_get_export_tables.call_count, 2)
+
+        self.activity_associated.text = "Renamed activity"
+        self.activity_associated.save()
+        content = b"".join(self.client.get(url).streaming_content)
+        self.assertEqual(mock_get_export_tables.call_count, 3)
+        with zipfile.ZipFile(BytesIO(content)) as zip_file:
+            report_csv = next(
+                name for name in zip_file.namelist() if name.startswith("csv/Report")
+            )
+            self.assertIn(b"Renamed activity", zip_file.read(report_csv))
+
+    @patch("report.views.get_export_tables", wraps=get_export_tables)
+    def test_year_export_is_kept_when_other_data_changes(self, mock_get_export_tables):
+        self.client.login(username=self.username, password=self.password)
+        url = reverse("report:export_year_reports", kwargs={"year": datetime.now().year})
+
+        b"".join(self.client.get(url).streaming_content)
+        Report.objects.create(
+            description="Report of another year",
+            created_by=self.user_profile,
+            modified_by=self.user_profile,
+            initial_date=datetime.now().date() - timedelta(days=800),
+            activity_associated=self.activity_associated,
+            area_responsible=self.area_responsible,
+            links="Links",
+        ).editors.add(Editor.objects.create(username="Other editor"))
+        other_user = User.objects.create_user(username="Other", password="Other")
+        other_user.first_name = "Someone"
+        other_user.save()
+        self.learning_area.text = "Learning area of no report"
+        self.learning_area.save()
+        b"".join(self.client.get(url).streaming_content)
+
+        self.assertEqual(mock_get_export_tables.call_count, 1)
+
+    def test_year_export_artifact_is_open_before_the_old_versions_are_removed(self):
+        def build(content):
+            return lambda: ("export.zip", [content])
+
+        year = datetime.now().year
+
+        file_name, file = get_or_build_artifact("report", year, "en", [], build(b"old"))
+        self.report_1.description = "Changed report"
+        self.report_1.save()
+        with get_or_build_artifact("report", year, "en", [], build(b"new"))[1] as new:
+            self.assertEqual(new.read(), b"new")
+
+        with file:
+            self.assertEqual(file_name, "export.zip")
+            self.assertEqual(file.read(), b"old")
+
+    def test_export_report_writes_the_related_texts_in_the_active_language(self):
+        for instance, text in [
+            (self.activity_associated, "Act"),
+            (self.project, "Proj"),
+            (self.strategic_axis, "Axis"),
+        ]:
+            instance.text_en = f"{text} EN"
+            instance.text_pt_br = f"{text} PT"
+            instance.save()
+        self.learning_area.text_en = "Area EN"
+        self.learning_area.text_pt_br = ""
+        self.learning_area.save()
+        self.report_1.funding_associated.add(self.funding_associated)
+        self.report_1.directions_related.add(self.directions_related)
+        self.report_1.learning_questions_related.add(self.learning_questions_related)
+
+        with translation.override("pt-br"):
+            metrics = export_metrics(self.report_1.id).values.tolist()
+            fundings = export_funding(self.report_1.id).values.tolist()
+            directions = export_directions_related(self.report_1.id).values.tolist()
+            questions = export_learning_questions_related(self.report_1.id).values.tolist()
+
+        self.assertIn("Act PT", metrics[0])
+        self.assertIn("Proj PT", fundings[0])
+        self.assertIn("Axis PT", directions[0])
+        # Without a translation, the text of the default language is written
+        self.assertIn("Area EN", questions[0])
+
+    @patch("report.views.get_editors_rows", wraps=get_editors_rows)
+    def test_export_report_builds_each_table_once(self, mock_get_editors_rows):
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(reverse("report:export_all_reports"))
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zip_file:
+            workbook = zip_file.read(zip_file.namelist()[-1])
+
+        self.assertEqual(mock_get_editors_rows.call_count, 1)
+        self.assertEqual(get_sheet_names(workbook), EXPORT_TABLE_NAMES)
+
+    @patch("report.views.pd.DataFrame", wraps=pd.DataFrame)
+    def test_export_report_writes_the_rows_without_dataframes(self, mock_dataframe):
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(reverse("report:export_all_reports"))
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zip_file:
+            report_csv = next(
+                name for name in zip_file.namelist() if name.startswith("csv/Report")
+            )
+            rows = list(csv.reader(StringIO(zip_file.read(report_csv).decode("utf-8"))))
+
+        mock_dataframe.assert_not_called()
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.report_1.id), str(self.report_2.id)])
+
+    def test_export_report_xlsx_formats_dates_and_integers(self):
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(reverse("report:export_all_reports"))
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zip_file:
+            workbook = zip_file.read(zip_file.namelist()[-1])
+
+        with zipfile.ZipFile(BytesIO(workbook)) as xlsx_file:
+            styles = xlsx_file.read("xl/styles.xml").decode()
+            report_sheet = xlsx_file.read("xl/worksheets/sheet1.xml").decode()
+        self.assertIn('formatCode="yyyy-mm-dd"', styles)
+        self.assertIn('formatCode="yyyy-mm-dd hh:mm:ss"', styles)
+        # The ids of the reports are numbers, not strings
+        self.assertRegex(report_sheet, rf'<c r="A2" s="\d+"><v>{self.report_1.id}</v></c>')
+
+    def test_export_table_csv_streams_a_single_table(self):
+        self.client.login(username=self.username, password=self.password)
+        self.report_1.editors.add(self.editors)
+        self.report_2.editors.add(self.editors)
+
+        response = self.client.get(
+            reverse("report:export_all_reports_table", kwargs={"table": "editors"})
+        )
+        content = b"".join(response.streaming_content).decode("utf-8")
+
+        self.assertEqual(response.headers["Content-Type"], "text/csv")
+        self.assertIn("Editors - ", response.headers["Content-Disposition"])
+        self.assertEqual(
+            list(csv.reader(StringIO(content))),
+            [
+                ["ID", "Username", "Number of reports including this editor"],
+                [str(self.editors.id), "Editor", "2"],
+            ],
+        )
+
+    def test_export_table_csv_filters_by_report_and_year(self):
+        self.client.login(username=self.username, password=self.password)
+        other_editor = Editor.objects.create(username="Other editor")
+        self.report_1.editors.add(self.editors)
+        self.report_2.editors.add(other_editor)
+        self.report_2.initial_date = datetime(2020, 1, 1).date()
+        self.report_2.end_date = datetime(2020, 12, 31).date()
+        self.report_2.save()
+
+        report_response = self.client.get(
+            reverse(
+                "report:export_report_table",
+                kwargs={"report_id": self.report_2.id, "table": "editors"},
+            )
+        )
+        year_response = self.client.get(
+            reverse(
+                "report:export_year_reports_table",
+                kwargs={"year": datetime.now().year, "table": "editors"},
+            )
+        )
+
+        report_content = b"".join(report_response.streaming_content).decode("utf-8")
+        year_content = b"".join(year_response.streaming_content).decode("utf-8")
+        self.assertIn("Other editor", report_content)
+        self.assertNotIn("Other editor", year_content)
+        self.assertIn("Editor", year_content)
+
+    def test_export_table_csv_of_unknown_table_returns_404(self):
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(
+            reverse("report:export_all_reports_table", kwargs={"table": "report"})
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch("report.views.find_spec", return_value=None)
+    def test_export_report_in_extra_formats_requires_pyarrow(self, mock_find_spec):
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(
+            reverse("report:export_all_reports"), {"format": "parquet"}
+        )
+
+        self.assertRedirects(response, reverse("report:list_reports"))
+
+    @patch("report.views.get_export_tables")
     def test_export_report_generates_a_zip_file_with_a_specific_structure(
-        self, mock_add_excel_file, mock_add_csv_file
+        self, mock_get_export_tables
     ):
         self.client.login(username=self.username, password=self.password)
-        mock_add_csv_file.return_value = BytesIO(b"test csv data")
-        mock_add_excel_file.return_value = BytesIO(b"test excel data")
+        mock_get_export_tables.return_value = [
+            [name, ["Column"], [["test csv data"]]] for name in EXPORT_TABLE_NAMES
+        ]
         response = self.client.get(
             reverse("report:export_report", kwargs={"report_id": self.report_1.id})
         )
@@ -1081,7 +1393,7 @@ class ReportExportViewTest(TestCase):
                 datetime.today().strftime("%Y-%m-%d")
             ),
         )
-        buffer = BytesIO(response.content)
+        buffer = BytesIO(b"".join(response.streaming_content))
         with zipfile.ZipFile(buffer) as zip_file:
             expected_files = [
                 "csv/Report 1 - {}.csv".format(datetime.today().strftime("%Y-%m-%d")),
@@ -1109,17 +1421,20 @@ class ReportExportViewTest(TestCase):
                 "Export 1 - {}.xlsx".format(datetime.today().strftime("%Y-%m-%d")),
             ]
             self.assertEqual(sorted(zip_file.namelist()), sorted(expected_files))
-            self.assertEqual(zip_file.read(expected_files[0]), b"test csv data")
-            self.assertEqual(zip_file.read(expected_files[-1]), b"test excel data")
+            self.assertEqual(
+                zip_file.read(expected_files[0]), b"Column\r\ntest csv data\r\n"
+            )
+            workbook = zip_file.read(expected_files[-1])
+            self.assertEqual(get_sheet_names(workbook), EXPORT_TABLE_NAMES)
 
-    @patch("report.views.add_csv_file")
-    @patch("report.views.add_excel_file")
+    @patch("report.views.get_export_tables")
     def test_export_report_generates_a_zip_file_with_a_specific_structure_without_report_id(
-        self, mock_add_excel_file, mock_add_csv_file
+        self, mock_get_export_tables
     ):
         self.client.login(username=self.username, password=self.password)
-        mock_add_csv_file.return_value = BytesIO(b"test csv data")
-        mock_add_excel_file.return_value = BytesIO(b"test excel data")
+        mock_get_export_tables.return_value = [
+            [name, ["Column"], [["test csv data"]]] for name in EXPORT_TABLE_NAMES
+        ]
         response = self.client.get(reverse("report:export_all_reports"))
 
         self.assertEqual(response.status_code, 200)
@@ -1129,7 +1444,7 @@ class ReportExportViewTest(TestCase):
             response["Content-Disposition"],
             "attachment; filename=SARA - Reports - {}.zip".format(postfix),
         )
-        buffer = BytesIO(response.content)
+        buffer = BytesIO(b"".join(response.streaming_content))
         with zipfile.ZipFile(buffer) as zip_file:
             expected_files = [
                 "csv/Report - {}.csv".format(postfix),
@@ -1147,17 +1462,20 @@ class ReportExportViewTest(TestCase):
                 "Export - {}.xlsx".format(postfix),
             ]
             self.assertEqual(sorted(zip_file.namelist()), sorted(expected_files))
-            self.assertEqual(zip_file.read(expected_files[0]), b"test csv data")
-            self.assertEqual(zip_file.read(expected_files[-1]), b"test excel data")
+            self.assertEqual(
+                zip_file.read(expected_files[0]), b"Column\r\ntest csv data\r\n"
+            )
+            workbook = zip_file.read(expected_files[-1])
+            self.assertEqual(get_sheet_names(workbook), EXPORT_TABLE_NAMES)
 
-    @patch("report.views.add_csv_file")
-    @patch("report.views.add_excel_file")
+    @patch("report.views.get_export_tables")
     def test_export_report_generates_a_zip_file_with_a_specific_structure_with_year(
-        self, mock_add_excel_file, mock_add_csv_file
+        self, mock_get_export_tables
     ):
         self.client.login(username=self.username, password=self.password)
-        mock_add_csv_file.return_value = BytesIO(b"test csv data")
-        mock_add_excel_file.return_value = BytesIO(b"test excel data")
+        mock_get_export_tables.return_value = [
+            [name, ["Column"], [["test csv data"]]] for name in EXPORT_TABLE_NAMES
+        ]
         response = self.client.get(
             reverse("report:export_year_reports", kwargs={"year": datetime.now().year})
         )
@@ -1169,7 +1487,7 @@ class ReportExportViewTest(TestCase):
             response["Content-Disposition"],
             "attachment; filename=SARA - Reports - {}.zip".format(postfix),
         )
-        buffer = BytesIO(response.content)
+        buffer = BytesIO(b"".join(response.streaming_content))
         with zipfile.ZipFile(buffer) as zip_file:
             expected_files = [
                 "csv/Report - {}.csv".format(postfix),
@@ -1187,8 +1505,11 @@ class ReportExportViewTest(TestCase):
                 "Export - {}.xlsx".format(postfix),
             ]
             self.assertEqual(sorted(zip_file.namelist()), sorted(expected_files))
-            self.assertEqual(zip_file.read(expected_files[0]), b"test csv data")
-            self.assertEqual(zip_file.read(expected_files[-1]), b"test excel data")
+            self.assertEqual(
+                zip_file.read(expected_files[0]), b"Column\r\ntest csv data\r\n"
+            )
+            workbook = zip_file.read(expected_files[-1])
+            self.assertEqual(get_sheet_names(workbook), EXPORT_TABLE_NAMES)
 
     def test_export_report_instance(self):
         expected_header = [
@@ -1633,6 +1954,13 @@ class ReportExportViewTest(TestCase):
         result = export_report_instance()
         self.assertTrue(result[result.isin(expected_df)].equals(expected_df))
 
+    def test_export_report_instance_runs_a_fixed_number_of_queries(self):
+        # One query for the reports, one for their activities and one per relation
+        with self.assertNumQueries(11):
+            result = export_report_instance()
+
+        self.assertEqual(len(result), 2)
+
     def test_export_report_instance_without_many_to_many_relations(self):
         expected_header = [
             _("ID"),
@@ -1867,6 +2195,15 @@ class ReportExportViewTest(TestCase):
             )
         )
 
+    def test_export_metrics_runs_a_single_query(self):
+        Metric.objects.create(text="Another metric", activity=self.activity_associated)
+
+        with self.assertNumQueries(1):
+            result = export_metrics()
+
+        self.assertEqual(len(result), Metric.objects.count())
+        self.assertEqual(list(result[_("ID")]), sorted(result[_("ID")]))
+
     def test_export_metrics_without_report_id_returns_metrics_from_all_reports(self):
         expected_header = [
             _("ID"),
@@ -2333,6 +2670,27 @@ class ReportExportViewTest(TestCase):
         result = export_learning_questions_related()
         self.assertTrue(result[result.isin(expected_df)].equals(expected_df))
 
+    def test_export_many_to_many_sheets_run_a_fixed_number_of_queries(self):
+        partner = Partner.objects.create(name="Partner")
+        for index in range(3):
+            organizer = Organizer.objects.create(name=f"Organizer {index}")
+            organizer.institution.add(partner)
+            self.report_1.organizers.add(organizer)
+            self.report_2.organizers.add(organizer)
+            self.report_1.editors.add(Editor.objects.create(username=f"Editor {index}"))
+
+        with self.assertNumQueries(1):
+            editors = export_editors()
+        # The organizers and their institutions
+        with self.assertNumQueries(2):
+            organizers = export_organizers()
+
+        self.assertEqual(len(editors), 3)
+        self.assertEqual(len(organizers), 3)
+        self.assertEqual(
+            list(organizers[_("Number of reports including this organizer")]), [2, 2, 2]
+        )
+
     def test_export_organizers(self):
         expected_header = [
             _("ID"),
@@ -2776,6 +3134,14 @@ class ReportExportViewTest(TestCase):
         result = export_funding()
         self.assertTrue(result[result.isin(expected_df)].equals(expected_df))
 
+    def test_funding_rows_list_a_funding_shared_by_several_reports_once(self):
+        for report in [self.report_1, self.report_2]:
+            report.funding_associated.add(self.funding_associated)
+
+        header, rows = get_funding_rows()
+
+        self.assertEqual([row[0] for row in rows], [self.funding_associated.id])
+
     def test_export_with_no_reports_redirects_to_list_of_reports(self):
         self.client.login(username=self.username, password=self.password)
         self.report_1.delete()
@@ -2787,6 +3153,155 @@ class ReportExportViewTest(TestCase):
         self.assertRedirects(response, f"{reverse('report:list_reports')}")
 
 
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.username = "testuser"
+        self.password = "testpass"
+        self.user = User.objects.create_user(
+            username=self.username, password=self.password
+        )
+        self.user_profile = UserProfile.objects.filter(user=self.user).first()
+        self.user.user_permissions.add(Permission.objects.get(codename="view_report"))
+        self.report = Report.objects.create(
+            description="Report 1",
+            created_by=self.user_profile,
+            modified_by=self.user_profile,
+            initial_date=datetime.now().date(),
+            activity_associated=Activity.objects.create(text="Activity"),
+            area_responsible=TeamArea.objects.create(text="Area", code="area"),
+            links="Links",
+        )
+        self.jobs_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jobs_root)
+
+    def test_export_is_enqueued_and_built_by_the_worker(self):
+        self.client.login(username=self.username, password=self.password)
+
+        with override_settings(ENABLE_EXPORT_JOBS=True, EXPORT_JOBS_ROOT=self.jobs_root):
+            response = self.client.get(reverse("report:export_all_reports"))
+            job = ExportJob.objects.get()
+            self.assertRedirects(
+                response, reverse("report:export_job", kwargs={"job_id": job.id})
+            )
+            self.assertEqual(job.status, ExportJob.Status.PENDING)
+            self.assertContains(self.client.get(response.url), 'http-equiv="refresh"')
+
+            call_command("run_export_jobs", "--once", stdout=StringIO())
+            job.refresh_from_db()
+            self.assertEqual(job.status, ExportJob.Status.DONE)
+            self.assertTrue(job.file_name.endswith(".zip"))
+
+            response = self.client.get(
+                reverse("report:download_export_job", kwargs={"job_id": job.id})
+            )
+            with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as zip_file:
+                self.assertIn(
+                    "csv/Report - {}.csv".format(datetime.today().strftime("%Y-%m-%d")),
+                    zip_file.namelist(),
+                )
+
+    def test_export_job_is_only_visible_to_its_creator(self):
+        job = enqueue_job("report", self.user_profile)
+        User.objects.create_user(username="other", password="otherpass")
+        self.client.login(username="other", password="otherpass")
+
+        response = self.client.get(reverse("report:export_job", kwargs={"job_id": job.id}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_failed_export_job_records_the_error(self):
+        job = enqueue_job("timespan_report", self.user_profile, timeframe="decade")
+
+        with override_settings(EXPORT_JOBS_ROOT=self.jobs_root):
+            self.assertTrue(claim_job(job))
+            run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.Status.FAILED)
+        self.assertIn("Invalid timeframe", job.error)
+
+    def test_export_job_is_claimed_once(self):
+        job = enqueue_job("report", self.user_profile)
+
+        self.assertTrue(claim_job(job))
+        self.assertFalse(claim_job(job))
+        self.assertIsNone(claim_next_job())
+
+
+    @override_settings(EXPORT_JOBS_TIMEOUT=60)
+    def test_abandoned_export_jobs_are_failed(self):
+        abandoned = enqueue_job("report", self.user_profile)
+        running = enqueue_job("report", self.user_profile)
+        claim_job(abandoned)
+        claim_job(running)
+        ExportJob.objects.filter(pk=abandoned.pk).update(
+            started_at=datetime.now() - timedelta(minutes=5)
+        )
+
+        with override_settings(EXPORT_JOBS_ROOT=self.jobs_root):
+            call_command("run_export_jobs", "--once", stdout=StringIO())
+
+        abandoned.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(abandoned.status, ExportJob.Status.FAILED)
+        self.assertIn("abandoned", abandoned.error)
+        self.assertEqual(running.status, ExportJob.Status.RUNNING)
+
+    @override_settings(EXPORT_JOBS_TIMEOUT=60)
+    def test_abandoned_export_job_is_not_finished_by_its_worker(self):
+        job = enqueue_job("report", self.user_profile)
+        claim_job(job)
+        ExportJob.objects.filter(pk=job.pk).update(
+            started_at=datetime.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(fail_abandoned_jobs(), 1)
+
+        with override_settings(EXPORT_JOBS_ROOT=self.jobs_root):
+            run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.Status.FAILED)
+        self.assertIn("abandoned", job.error)
+        self.assertEqual(os.listdir(self.jobs_root), [])
+
+    def test_failed_export_job_removes_its_partial_file(self):
+        def build():
+            def content():
+                yield b"Partial content"
+                raise ValueError("Broken export")
+
+            return "export.zip", content()
+
+        job = enqueue_job("report", self.user_profile)
+        claim_job(job)
+        with override_settings(EXPORT_JOBS_ROOT=self.jobs_root), patch(
+            "report.jobs.import_string", return_value=build
+        ):
+            run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.Status.FAILED)
+        self.assertIn("Broken export", job.error)
+        self.assertEqual(os.listdir(self.jobs_root), [])
+
+    @override_settings(EXPORT_JOBS_RETENTION_DAYS=7)
+    def test_expired_export_jobs_and_their_files_are_pruned(self):
+        expired = enqueue_job("report", self.user_profile)
+        recent = enqueue_job("report", self.user_profile)
+        with override_settings(EXPORT_JOBS_ROOT=self.jobs_root):
+            for job in [expired, recent]:
+                claim_job(job)
+                run_job(job)
+        ExportJob.objects.filter(pk=expired.pk).update(
+            finished_at=datetime.now() - timedelta(days=8)
+        )
+
+        self.assertEqual(prune_expired_jobs(), 1)
+
+        self.assertFalse(ExportJob.objects.filter(pk=expired.pk).exists())
+        self.assertFalse(os.path.exists(expired.file_path))
+        self.assertTrue(os.path.exists(recent.file_path))
+
 class GetLocalizedFieldTests(TestCase):
 
     def setUp(self):
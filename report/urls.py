@@ -12,6 +12,27 @@ urlpatterns = [
     path("<int:report_id>/export", views.export_report, name="export_report"),
     path("list/<int:year>/export", views.export_report, name="export_year_reports"),
     path("all/export", views.export_report, name="export_all_reports"),
+    path(
+        "<int:report_id>/export/<slug:table>.csv",
+        views.export_table_csv,
+        name="export_report_table",
+    ),
+    path(
+        "list/<int:year>/export/<slug:table>.csv",
+        views.export_table_csv,
+        name="export_year_reports_table",
+    ),
+    path(
+        "all/export/<slug:table>.csv",
+        views.export_table_csv,
+        name="export_all_reports_table",
+    ),
+    path("export/<int:job_id>", views.show_export_job, name="export_job"),
+    path(
+        "export/<int:job_id>/download",
+        views.download_export_job,
+        name="download_export_job",
+    ),
     path("<int:report_id>/update", views.update_report, name="update_report"),
     path("<int:report_id>/delete", views.delete_report, name="delete_report"),
     path("get/metrics", views.get_metrics, name="get_metrics"),
@@ -1,23 +1,79 @@
 import datetime
-import zipfile
-from io import BytesIO
+import os
+from collections import defaultdict
+from functools import partial
+from itertools import islice
+from importlib.util import find_spec
 
 import pandas as pd
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Case, Count, F, Prefetch, Q, QuerySet, Value, When
+from django.db.models.functions import Coalesce, NullIf
 from django.forms import inlineformset_factory
-from django.http import JsonResponse
-from django.shortcuts import HttpResponse, get_object_or_404, redirect, render, reverse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.utils import timezone, translation
 from django.utils.timezone import now
 from django.utils.translation import gettext as _
 
+from metrics.aggregation import deferred_contribution_refresh
+from metrics.dimensions import CONTENT_DIMENSIONS
 from metrics.models import Metric, Project
 from report.forms import NewReportForm, OperationForm, OperationUpdateFormSet
-from report.models import Activity, Funding, OperationReport, Report
+from report.artifacts import get_or_build_artifact
+from report.jobs import enqueue_job
+from report.models import (
+    Activity,
+    ExportJob,
+    OperationReport,
+    Partner,
+    Report,
+)
+from strategy.models import LearningArea, StrategicAxis
+from users.models import TeamArea, UserProfile
+from utils.streaming import (
+    FileReader,
+    XlsxStreamWriter,
+    get_spooled_file,
+    stream_csv,
+    stream_zip,
+    write_csv_rows,
+)
+
+# Tables of the report export that can be downloaded alone as CSV, by their slug. Their
+# rows come straight from a values_list queryset, unlike the tables merging relations.
+CSV_EXPORT_TABLES = {
+    "operation-report": "Operation report",
+    "metrics": "Metrics",
+    "areas": "Areas",
+    "directions": "Directions",
+    "editors": "Editors",
+    "fundings": "Fundings",
+    "learning-questions": "Learning questions",
+    "partners": "Partners",
+    "technologies": "Technologies",
+}
+CSV_EXPORT_CHUNK_SIZE = 2000
+
+# Many-to-many relations of Report listed, as ids, in the Report table of the export
+REPORT_RELATIONS = [
+    "area_activated",
+    "funding_associated",
+    "editors",
+    "organizers",
+    "partners_activated",
+    "technologies_used",
+    "directions_related",
+    "learning_questions_related",
+    "metrics_related",
+]
+
+# Formats the report export can be requested in besides CSV and XLSX, and the DataFrame
+# method writing them. Both need pyarrow, which is not a requirement of SARA.
+EXTRA_EXPORT_FORMATS = {"parquet": "to_parquet", "feather": "to_feather"}
 
 
 # ======================================================================================================================
@@ -36,7 +92,7 @@ def add_report(request):
             timediff = timezone.now() - datetime.timedelta(hours=24)
             description = report_form.cleaned_data.get("description")
 
-            with transaction.atomic():
+            with transaction.atomic(), deferred_contribution_refresh():
                 report_exists = Report.objects.filter(
                     created_by__user=request.user,
                     description=description,
@@ -179,120 +235,233 @@ def detail_report(request, report_id):
 @permission_required("report.view_report")
 def export_report(request, report_id=None, year=None):
     if Report.objects.count():
-        lang = translation.get_language()
-        buffer = BytesIO()
-        zip_file = zipfile.ZipFile(buffer, mode="w")
-        sub_directory = "csv/"
-
-        if report_id:
-            zip_name = _("Report")
-            identifier = " {}".format(report_id)
-        else:
-            zip_name = _("SARA - Reports")
-            identifier = ""
-
-        if year:
-            custom_query = Q(initial_date__year=year) | Q(end_date__year=year)
-        else:
-            custom_query = Q()
-
-        posfix = identifier + " - {}".format(
-            datetime.datetime.today().strftime("%Y-%m-%d")
-        )
-        files = [
-            [export_report_instance, sub_directory + "Report" + posfix],
-            [export_operation_report, sub_directory + "Operation report" + posfix],
-            [export_metrics, sub_directory + "Metrics" + posfix],
-            [export_user_profile, sub_directory + "Users" + posfix],
-            [export_area_activated, sub_directory + "Areas" + posfix],
-            [export_directions_related, sub_directory + "Directions" + posfix],
-            [
-                export_learning_questions_related,
-                sub_directory + "Learning questions" + posfix,
-            ],
-            [export_funding, sub_directory + "Fundings" + posfix],
-            [export_editors, sub_directory + "Editors" + posfix],
-            [export_organizers, sub_directory + "Organizers" + posfix],
-            [export_partners_activated, sub_directory + "Partners" + posfix],
-            [export_technologies_used, sub_directory + "Technologies" + posfix],
+        formats = [
+            extension
+            for extension in request.GET.getlist("format")
+            if extension in EXTRA_EXPORT_FORMATS
         ]
-
-        for file in files:
-            zip_file.writestr(
-                "{}.csv".format(file[1]),
-                add_csv_file(file[0], report_id, custom_query).getvalue(),
+        if formats and not find_spec("pyarrow"):
+            messages.error(
+                request, _("Parquet and Feather exports require pyarrow to be installed")
             )
-        zip_file.writestr(
-            "Export" + posfix + ".xlsx",
-            add_excel_file(report_id, custom_query, lang).getvalue(),
-        )
-
-        zip_file.close()
+            return redirect(reverse("report:list_reports"))
+
+        if settings.ENABLE_EXPORT_JOBS:
+            job = enqueue_job(
+                "report",
+                request.user.profile,
+                translation.get_language(),
+                report_id=report_id,
+                year=year,
+                formats=formats,
+            )
+            return redirect(reverse("report:export_job", kwargs={"job_id": job.pk}))
 
-        response = HttpResponse(buffer.getvalue())
+        file_name, content = build_report_export(report_id, year, formats)
+        response = StreamingHttpResponse(content)
         response["Content-Type"] = "application/x-zip-compressed"
-        response["Content-Disposition"] = (
-            "attachment; filename=" + zip_name + posfix + ".zip"
-        )
+        response["Content-Disposition"] = "attachment; filename=" + file_name
 
         return response
     else:
         return redirect(reverse("report:list_reports"))
 
 
-def add_csv_file(function_name, report_id=None, custom_query=None):
-    csv_file = BytesIO()
-    function_name(report_id, custom_query).to_csv(path_or_buf=csv_file, index=False)
+def build_report_export(report_id=None, year=None, formats=()):
+    """
+    Returns the name of the zip file of the report export and an iterator over its content.
+    The exports of a whole year are kept on disk until the data they include changes.
+    """
+    if year and not report_id:
+        file_name, file = get_or_build_artifact(
+            "report",
+            year,
+            translation.get_language(),
+            formats,
+            partial(build_report_zip, None, year, formats),
+        )
+        return file_name, FileReader(file)
 
-    return csv_file
+    return build_report_zip(report_id, year, formats)
 
 
-def add_excel_file(report_id=None, custom_query=None, lang=""):
-    excel_file = BytesIO()
-    writer = pd.ExcelWriter(excel_file, engine="xlsxwriter")
+def build_report_zip(report_id=None, year=None, formats=()):
+    lang = translation.get_language()
 
-    export_report_instance(report_id, custom_query).to_excel(
-        writer, sheet_name="Report", index=False
-    )
-    export_operation_report(report_id, custom_query, lang).to_excel(
-        writer, sheet_name="Operation report", index=False
-    )
-    export_metrics(report_id, custom_query).to_excel(
-        writer, sheet_name="Metrics", index=False
-    )
-    export_user_profile(report_id, custom_query).to_excel(
-        writer, sheet_name="Users", index=False
-    )
-    export_area_activated(report_id, custom_query).to_excel(
-        writer, sheet_name="Areas", index=False
-    )
-    export_directions_related(report_id, custom_query).to_excel(
-        writer, sheet_name="Directions", index=False
-    )
-    export_editors(report_id, custom_query).to_excel(
-        writer, sheet_name="Editors", index=False
-    )
-    export_funding(report_id, custom_query).to_excel(
-        writer, sheet_name="Fundings", index=False
-    )
-    export_learning_questions_related(report_id, custom_query).to_excel(
-        writer, sheet_name="Learning questions", index=False
-    )
-    export_organizers(report_id, custom_query).to_excel(
-        writer, sheet_name="Organizers", index=False
+    if report_id:
+        zip_name = _("Report")
+        identifier = " {}".format(report_id)
+    else:
+        zip_name = _("SARA - Reports")
+        identifier = ""
+
+    if year:
+        custom_query = Q(initial_date__year=year) | Q(end_date__year=year)
+    else:
+        custom_query = Q()
+
+    posfix = identifier + " - {}".format(datetime.datetime.today().strftime("%Y-%m-%d"))
+    tables = get_export_tables(report_id, custom_query, lang)
+    entries = get_export_entries(tables, posfix, formats)
+
+    return zip_name + posfix + ".zip", stream_zip(entries)
+
+
+@login_required
+@permission_required("report.view_report")
+def export_table_csv(request, table, report_id=None, year=None):
+    """
+    Streams a single table of the report export as CSV, with the same filters as the
+    whole export. The rows are read from the database in chunks while the response is
+    sent.
+    """
+    if table not in CSV_EXPORT_TABLES:
+        raise Http404
+
+    if year:
+        custom_query = Q(initial_date__year=year) | Q(end_date__year=year)
+    else:
+        custom_query = Q()
+
+    lang = translation.get_language()
+    get_rows = {
+        "operation-report": partial(get_operation_report_rows, lang=lang),
+        "metrics": get_metrics_rows,
+        "areas": get_area_activated_rows,
+        "directions": get_directions_related_rows,
+        "editors": get_editors_rows,
+        "fundings": get_funding_rows,
+        "learning-questions": get_learning_questions_related_rows,
+        "partners": get_partners_activated_rows,
+        "technologies": get_technologies_used_rows,
+    }[table]
+    header, rows = get_rows(report_id, custom_query)
+
+    identifier = " {}".format(report_id) if report_id else ""
+    file_name = "{}{} - {}.csv".format(
+        CSV_EXPORT_TABLES[table],
+        identifier,
+        datetime.datetime.today().strftime("%Y-%m-%d"),
     )
-    export_partners_activated(report_id, custom_query).to_excel(
-        writer, sheet_name="Partners", index=False
+    response = StreamingHttpResponse(
+        stream_csv(header, iter_rows(rows)),
+        content_type="text/csv",
     )
-    export_technologies_used(report_id, custom_query).to_excel(
-        writer, sheet_name="Technologies", index=False
+    response["Content-Disposition"] = 'attachment; filename="{}"'.format(file_name)
+    return response
+
+
+@login_required
+def show_export_job(request, job_id):
+    job = get_export_job(request, job_id)
+    context = {"title": _("Export"), "job": job}
+    return render(request, "report/export_job.html", context)
+
+
+@login_required
+def download_export_job(request, job_id):
+    job = get_export_job(request, job_id)
+    if job.status != ExportJob.Status.DONE or not os.path.exists(job.file_path):
+        raise Http404
+    return FileResponse(
+        open(job.file_path, "rb"), as_attachment=True, filename=job.file_name
     )
 
+
+def get_export_job(request, job_id):
+    jobs = ExportJob.objects.all()
+    if not request.user.is_superuser:
+        jobs = jobs.filter(created_by__user=request.user)
+    return get_object_or_404(jobs, pk=job_id)
+
+
+def get_export_tables(report_id=None, custom_query=Q(), lang=""):
+    """
+    Yields the name, the header and the rows of each table of the report export. The rows
+    are read from the database in chunks while the table is written, so no table is ever
+    held in memory as a whole.
+    """
+    tables = [
+        ["Report", partial(get_report_rows, report_id, custom_query)],
+        [
+            "Operation report",
+            partial(get_operation_report_rows, report_id, custom_query, lang),
+        ],
+        ["Metrics", partial(get_metrics_rows, report_id, custom_query)],
+        ["Users", partial(get_user_profile_rows, report_id, custom_query)],
+        ["Areas", partial(get_area_activated_rows, report_id, custom_query)],
+        ["Directions", partial(get_directions_related_rows, report_id, custom_query)],
+        ["Editors", partial(get_editors_rows, report_id, custom_query)],
+        ["Fundings", partial(get_funding_rows, report_id, custom_query)],
+        [
+            "Learning questions",
+            partial(get_learning_questions_related_rows, report_id, custom_query),
+        ],
+        ["Organizers", partial(get_organizers_rows, report_id, custom_query)],
+        ["Partners", partial(get_partners_activated_rows, report_id, custom_query)],
+        ["Technologies", partial(get_technologies_used_rows, report_id, custom_query)],
+    ]
+    for name, get_rows in tables:
+        # The tables are built while the response is streamed, after the view returned
+        with translation.override(lang):
+            header, rows = get_rows()
+        yield name, header, iter_rows(rows)
+
+
+def iter_rows(rows):
+    if isinstance(rows, QuerySet):
+        return rows.iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE)
+    return rows
+
+
+def get_export_entries(tables, posfix, formats=()):
+    """
+    Yields the zip entries of the report export: a CSV file per table, the files of the
+    extra formats requested and, last, the XLSX file with a sheet per table. The CSV file
+    and the sheet of a table are written in the same pass over its rows.
+    """
+    excel_file = get_spooled_file()
+    writer = XlsxStreamWriter(excel_file)
+
+    for name, header, rows in tables:
+        if formats:
+            # The extra formats are columnar, so the table is loaded to write them
+            rows = list(rows)
+            dataframe = pd.DataFrame(rows, columns=header)
+        yield "csv/" + name + posfix + ".csv", partial(write_table, writer, name, header, rows)
+        for extension in formats:
+            yield (
+                extension + "/" + name + posfix + "." + extension,
+                partial(write_extra_format, dataframe, extension),
+            )
+
     writer.close()
-    return excel_file
+    yield "Export" + posfix + ".xlsx", lambda: excel_file
+
+
+def write_table(writer, name, header, rows):
+    csv_file = get_spooled_file()
+    writer.write_sheet(name, header, write_csv_rows(csv_file, header, rows))
+    return csv_file
+
+
+def write_extra_format(dataframe, extension):
+    # Arrow columns must have a single type, so free text columns are written as strings
+    text_columns = dataframe.select_dtypes(include="object").columns
+    dataframe = dataframe.astype({column: str for column in text_columns})
+
+    extra_file = get_spooled_file()
+    getattr(dataframe, EXTRA_EXPORT_FORMATS[extension])(extra_file)
+    return extra_file
 
 
 def export_report_instance(report_id=None, custom_query=Q()):
+    header, rows = get_report_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
+    return df
+
+
+def get_report_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Created by"),
@@ -322,36 +491,7 @@ def export_report_instance(report_id=None, custom_query=Q()):
         _("Technologies used"),
         _("# Donors"),
         _("# Submissions"),
-        _("# Wikipedia created"),
-        _("# Wikipedia edited"),
-        _("# Commons created"),
-        _("# Commons edited"),
-        _("# Wikidata created"),
-        _("# Wikidata edited"),
-        _("# Wikiversity created"),
-        _("# Wikiversity edited"),
-        _("# Wikibooks created"),
-        _("# Wikibooks edited"),
-        _("# Wikisource created"),
-        _("# Wikisource edited"),
-        _("# Wikinews created"),
-        _("# Wikinews edited"),
-        _("# Wikiquote created"),
-        _("# Wikiquote edited"),
-        _("# Wiktionary created"),
-        _("# Wiktionary edited"),
-        _("# Wikivoyage created"),
-        _("# Wikivoyage edited"),
-        _("# Wikispecies created"),
-        _("# Wikispecies edited"),
-        _("# Metawiki created"),
-        _("# Metawiki edited"),
-        _("# MediaWiki created"),
-        _("# MediaWiki edited"),
-        _("# Wikifunctions created"),
-        _("# Wikifunctions edited"),
-        _("# Incubator created"),
-        _("# Incubator edited"),
+        *[_(dimension.label) for dimension in CONTENT_DIMENSIONS],
         _("Directions related"),
         _("Learning"),
         _("Learning questions related"),
@@ -363,209 +503,122 @@ def export_report_instance(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        # Database
-        id_ = report.id
-        created_by = report.created_by.id
-        created_at = report.created_at
-        modified_by = report.modified_by.id
-        modified_at = report.modified_at
-        partial_report = report.partial_report
-        reference_text = report.reference_text
-        private_links = report.private_links
-
-        # Administrative
-        activity_associated = report.activity_associated.id
-        activity_name = report.activity_associated.text or ""
-        area_responsible = report.area_responsible.id
-        if report.area_activated.exists():
-            area_activated = "; ".join(
-                map(str, report.area_activated.values_list("id", flat=True))
-            )
-        else:
-            area_activated = ""
-        initial_date = report.initial_date
-        end_date = report.end_date
-        description = report.description
-        if report.funding_associated.exists():
-            funding_associated = "; ".join(
-                map(str, report.funding_associated.values_list("id", flat=True))
-            )
-        else:
-            funding_associated = ""
-        links = report.links.replace("\r\n", "; ")
-
-        # Quantitative
-        participants = report.participants
-        donors = report.donors
-        submissions = report.submissions
-        # resources = report.resources
-        feedbacks = report.feedbacks
-        if report.editors.exists():
-            editors_list = list(map(str, report.editors.values_list("id", flat=True)))
-            editors = "; ".join(editors_list)
-            num_editors = len(editors_list)
-        else:
-            editors = ""
-            num_editors = 0
-        if report.organizers.exists():
-            organizers_list = list(
-                map(str, report.organizers.values_list("id", flat=True))
-            )
-            organizers = "; ".join(organizers_list)
-            num_organizers = len(organizers_list)
-        else:
-            organizers = ""
-            num_organizers = 0
-        if report.partners_activated.exists():
-            partners_list = list(
-                map(str, report.partners_activated.values_list("id", flat=True))
-            )
-            partners_activated = "; ".join(partners_list)
-            num_partners_activated = len(partners_list)
-        else:
-            partners_activated = ""
-            num_partners_activated = 0
-        if report.technologies_used.exists():
-            technologies_used = "; ".join(
-                map(str, report.technologies_used.values_list("id", flat=True))
-            )
-        else:
-            technologies_used = ""
-
-        # Wikimedia
-        wikipedia_created = report.wikipedia_created
-        wikipedia_edited = report.wikipedia_edited
-        commons_created = report.commons_created
-        commons_edited = report.commons_edited
-        wikidata_created = report.wikidata_created
-        wikidata_edited = report.wikidata_edited
-        wikiversity_created = report.wikiversity_created
-        wikiversity_edited = report.wikiversity_edited
-        wikibooks_created = report.wikibooks_created
-        wikibooks_edited = report.wikibooks_edited
-        wikisource_created = report.wikisource_created
-        wikisource_edited = report.wikisource_edited
-        wikinews_created = report.wikinews_created
-        wikinews_edited = report.wikinews_edited
-        wikiquote_created = report.wikiquote_created
-        wikiquote_edited = report.wikiquote_edited
-        wiktionary_created = report.wiktionary_created
-        wiktionary_edited = report.wiktionary_edited
-        wikivoyage_created = report.wikivoyage_created
-        wikivoyage_edited = report.wikivoyage_edited
-        wikispecies_created = report.wikispecies_created
-        wikispecies_edited = report.wikispecies_edited
-        metawiki_created = report.metawiki_created
-        metawiki_edited = report.metawiki_edited
-        mediawiki_created = report.mediawiki_created
-        mediawiki_edited = report.mediawiki_edited
-        wikifunctions_created = report.wikifunctions_created
-        wikifunctions_edited = report.wikifunctions_edited
-        incubator_created = report.incubator_created
-        incubator_edited = report.incubator_edited
-
-        # Strategy
-        if report.directions_related.exists():
-            directions_related = "; ".join(
-                map(str, report.directions_related.values_list("id", flat=True))
-            )
-        else:
-            directions_related = ""
-        learning = report.learning.replace("\r\n", "\n")
+    return header, iter_report_rows(reports)
 
-        # Theory
-        if report.learning_questions_related.exists():
-            learning_questions_related = "; ".join(
-                map(str, report.learning_questions_related.values_list("id", flat=True))
-            )
-        else:
-            learning_questions_related = ""
 
-        # Metrics
-        if report.metrics_related.exists():
-            metrics_related = "; ".join(
-                map(str, report.metrics_related.values_list("id", flat=True))
-            )
-        else:
-            metrics_related = ""
-
-        rows.append(
-            [
-                id_,
-                created_by,
-                created_at,
-                modified_by,
-                modified_at,
-                activity_associated,
-                partial_report,
-                activity_name,
-                reference_text,
-                area_responsible,
-                area_activated,
-                initial_date,
-                end_date,
-                description,
-                funding_associated,
-                links,
-                private_links,
-                participants,
-                feedbacks,
-                editors,
-                num_editors,
-                organizers,
-                num_organizers,
-                partners_activated,
-                num_partners_activated,
-                technologies_used,
-                donors,
-                submissions,
-                wikipedia_created,
-                wikipedia_edited,
-                commons_created,
-                commons_edited,
-                wikidata_created,
-                wikidata_edited,
-                wikiversity_created,
-                wikiversity_edited,
-                wikibooks_created,
-                wikibooks_edited,
-                wikisource_created,
-                wikisource_edited,
-                wikinews_created,
-                wikinews_edited,
-                wikiquote_created,
-                wikiquote_edited,
-                wiktionary_created,
-                wiktionary_edited,
-                wikivoyage_created,
-                wikivoyage_edited,
-                wikispecies_created,
-                wikispecies_edited,
-                metawiki_created,
-                metawiki_edited,
-                mediawiki_created,
-                mediawiki_edited,
-                wikifunctions_created,
-                wikifunctions_edited,
-                incubator_created,
-                incubator_edited,
-                directions_related,
-                learning,
-                learning_questions_related,
-                metrics_related,
-            ]
+def iter_report_rows(reports):
+    """
+    Yields the rows of the Report table. The reports are read in chunks, and the names of
+    the activities and the many-to-many relations of each chunk with one query each.
+    """
+    fields = [
+        "id",
+        "created_by_id",
+        "created_at",
+        "modified_by_id",
+        "modified_at",
+        "activity_associated_id",
+        "partial_report",
+        "reference_text",
+        "area_responsible_id",
+        "initial_date",
+        "end_date",
+        "description",
+        "links",
+        "private_links",
+        "participants",
+        "feedbacks",
+        "donors",
+        "submissions",
+        *[dimension.column for dimension in CONTENT_DIMENSIONS],
+        "learning",
+    ]
+    rows = (
+        reports.order_by("pk")
+        .values_list(*fields, named=True)
+        .iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE)
+    )
+    while chunk := list(islice(rows, CSV_EXPORT_CHUNK_SIZE)):
+        report_ids = [report.id for report in chunk]
+        activity_names = dict(
+            Activity.objects.filter(
+                pk__in={report.activity_associated_id for report in chunk}
+            ).values_list("id", "text")
         )
+        related = {
+            field_name: get_related_ids(report_ids, field_name)
+            for field_name in REPORT_RELATIONS
+        }
+
+        def related_ids(field_name, report_id):
+            return "; ".join(map(str, related[field_name].get(report_id, [])))
+
+        def related_count(field_name, report_id):
+            return len(related[field_name].get(report_id, []))
+
+        for report in chunk:
+            yield [
+                report.id,
+                report.created_by_id,
+                report.created_at,
+                report.modified_by_id,
+                report.modified_at,
+                report.activity_associated_id,
+                report.partial_report,
+                activity_names.get(report.activity_associated_id) or "",
+                report.reference_text,
+                report.area_responsible_id,
+                related_ids("area_activated", report.id),
+                report.initial_date,
+                report.end_date,
+                report.description,
+                related_ids("funding_associated", report.id),
+                report.links.replace("\r\n", "; ") if report.links else report.links,
+                report.private_links,
+                report.participants,
+                report.feedbacks,
+                related_ids("editors", report.id),
+                related_count("editors", report.id),
+                related_ids("organizers", report.id),
+                related_count("organizers", report.id),
+                related_ids("partners_activated", report.id),
+                related_count("partners_activated", report.id),
+                related_ids("technologies_used", report.id),
+                report.donors,
+                report.submissions,
+                *[getattr(report, dimension.column) for dimension in CONTENT_DIMENSIONS],
+                related_ids("directions_related", report.id),
+                (report.learning or "").replace("\r\n", "\n"),
+                related_ids("learning_questions_related", report.id),
+                related_ids("metrics_related", report.id),
+            ]
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
 
-    df[_("Created at")] = df[_("Created at")].dt.tz_localize(None)
-    df[_("Modified at")] = df[_("Modified at")].dt.tz_localize(None)
-    return df
+def get_related_ids(report_ids, field_name):
+    """
+    Returns, for the many-to-many field field_name of the reports given, the ids of the
+    related objects of each report, fetched for all the reports at once.
+    """
+    field = Report._meta.get_field(field_name)
+    report_field = field.m2m_field_name()
+    related_field = field.m2m_reverse_field_name()
+    related = defaultdict(list)
+    for report, related_id in (
+        field.remote_field.through.objects.filter(**{f"{report_field}__in": report_ids})
+        .order_by(report_field, related_field)
+        .values_list(report_field, related_field)
+    ):
+        related[report].append(related_id)
+    return related
 
 
 def export_operation_report(report_id=None, custom_query=Q(), lang=""):
+    header, rows = get_operation_report_rows(report_id, custom_query, lang)
+    df = pd.DataFrame(list(rows), columns=header).drop_duplicates().reset_index(drop=True)
+    return df
+
+
+def get_operation_report_rows(report_id=None, custom_query=Q(), lang=""):
     header = [
         _("ID"),
         _("Report ID"),
@@ -594,30 +647,30 @@ def export_operation_report(report_id=None, custom_query=Q(), lang=""):
     ]
     metric_name_attr = get_localized_field(lang, available_fields)
 
-    rows = []
-    for operation_report in operation_reports:
-        rows.append(
-            [
-                operation_report.id,
-                operation_report.report_id,
-                operation_report.metric_id,
-                getattr(operation_report.metric, metric_name_attr),
-                operation_report.number_of_people_reached_through_social_media,
-                operation_report.number_of_new_followers,
-                operation_report.number_of_mentions,
-                operation_report.number_of_community_communications,
-                operation_report.number_of_events,
-                operation_report.number_of_resources,
-                operation_report.number_of_partnerships_activated,
-                operation_report.number_of_new_partnerships,
-            ]
-        )
+    rows = operation_reports.order_by("pk").values_list(
+        "id",
+        "report_id",
+        "metric_id",
+        "metric__" + metric_name_attr,
+        "number_of_people_reached_through_social_media",
+        "number_of_new_followers",
+        "number_of_mentions",
+        "number_of_community_communications",
+        "number_of_events",
+        "number_of_resources",
+        "number_of_partnerships_activated",
+        "number_of_new_partnerships",
+    )
+    return header, rows
+
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+def export_metrics(report_id=None, custom_query=Q()):
+    header, rows = get_metrics_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_metrics(report_id=None, custom_query=Q()):
+def get_metrics_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Metric"),
@@ -629,36 +682,7 @@ def export_metrics(report_id=None, custom_query=Q()):
         _("Number of partnerships activated"),
         _("Number of feedbacks"),
         _("Number of events"),
-        _("# Wikipedia created"),
-        _("# Wikipedia edited"),
-        _("# Commons created"),
-        _("# Commons edited"),
-        _("# Wikidata created"),
-        _("# Wikidata edited"),
-        _("# Wikiversity created"),
-        _("# Wikiversity edited"),
-        _("# Wikibooks created"),
-        _("# Wikibooks edited"),
-        _("# Wikisource created"),
-        _("# Wikisource edited"),
-        _("# Wikinews created"),
-        _("# Wikinews edited"),
-        _("# Wikiquote created"),
-        _("# Wikiquote edited"),
-        _("# Wiktionary created"),
-        _("# Wiktionary edited"),
-        _("# Wikivoyage created"),
-        _("# Wikivoyage edited"),
-        _("# Wikispecies created"),
-        _("# Wikispecies edited"),
-        _("# Metawiki created"),
-        _("# Metawiki edited"),
-        _("# MediaWiki created"),
-        _("# MediaWiki edited"),
-        _("# Wikifunctions created"),
-        _("# Wikifunctions edited"),
-        _("# Incubator created"),
-        _("# Incubator edited"),
+        *[_(dimension.label) for dimension in CONTENT_DIMENSIONS],
     ]
 
     if report_id:
@@ -666,60 +690,34 @@ def export_metrics(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        if report.activity_associated:
-            for instance in report.activity_associated.metrics.all():
-                rows.append(
-                    [
-                        instance.id,
-                        instance.text,
-                        instance.activity_id,
-                        instance.activity.text,
-                        instance.activity.code,
-                        instance.number_of_editors,
-                        instance.number_of_participants,
-                        instance.number_of_partnerships_activated,
-                        instance.number_of_feedbacks,
-                        instance.number_of_events,
-                        instance.wikipedia_created,
-                        instance.wikipedia_edited,
-                        instance.commons_created,
-                        instance.commons_edited,
-                        instance.wikidata_created,
-                        instance.wikidata_edited,
-                        instance.wikiversity_created,
-                        instance.wikiversity_edited,
-                        instance.wikibooks_created,
-                        instance.wikibooks_edited,
-                        instance.wikisource_created,
-                        instance.wikisource_edited,
-                        instance.wikinews_created,
-                        instance.wikinews_edited,
-                        instance.wikiquote_created,
-                        instance.wikiquote_edited,
-                        instance.wiktionary_created,
-                        instance.wiktionary_edited,
-                        instance.wikivoyage_created,
-                        instance.wikivoyage_edited,
-                        instance.wikispecies_created,
-                        instance.wikispecies_edited,
-                        instance.metawiki_created,
-                        instance.metawiki_edited,
-                        instance.mediawiki_created,
-                        instance.mediawiki_edited,
-                        instance.wikifunctions_created,
-                        instance.wikifunctions_edited,
-                        instance.incubator_created,
-                        instance.incubator_edited,
-                    ]
-                )
+    # The metrics of the activities of the reports, each once
+    rows = (
+        Metric.objects.filter(activity__in=reports.values("activity_associated"))
+        .order_by("pk")
+        .values_list(
+            "id",
+            "text",
+            "activity_id",
+            get_localized_text(Activity, "activity"),
+            "activity__code",
+            "number_of_editors",
+            "number_of_participants",
+            "number_of_partnerships_activated",
+            "number_of_feedbacks",
+            "number_of_events",
+            *[dimension.goal_field for dimension in CONTENT_DIMENSIONS],
+        )
+    )
+    return header, rows
+
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+def export_user_profile(report_id=None, custom_query=Q()):
+    header, rows = get_user_profile_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_user_profile(report_id=None, custom_query=Q()):
+def get_user_profile_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("First name"),
@@ -744,35 +742,47 @@ def export_user_profile(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in [report.created_by, report.modified_by]:
-            rows.append(
-                [
-                    instance.id,
-                    instance.user.first_name or "",
-                    instance.user.last_name or "",
-                    instance.professional_wiki_handle or "",
-                    instance.personal_wiki_handle or "",
-                    instance.photograph or "",
-                    instance.user.profile.current_position or "",
-                    instance.twitter or "",
-                    instance.facebook or "",
-                    instance.instagram or "",
-                    instance.user.email or "",
-                    instance.wikidata_item or "",
-                    instance.linkedin or "",
-                    instance.lattes or "",
-                    instance.orcid or "",
-                    instance.google_scholar or "",
-                ]
-            )
+    # The authors and last editors of the reports, each once
+    user_profiles = (
+        UserProfile.objects.filter(
+            Q(pk__in=reports.values("created_by")) | Q(pk__in=reports.values("modified_by"))
+        )
+        .select_related("user")
+        .order_by("pk")
+    )
+    return header, iter_user_profile_rows(user_profiles)
+
+
+def iter_user_profile_rows(user_profiles):
+    for instance in user_profiles.iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE):
+        current_position = instance.current_position
+        yield [
+            instance.id,
+            instance.user.first_name or "",
+            instance.user.last_name or "",
+            instance.professional_wiki_handle or "",
+            instance.personal_wiki_handle or "",
+            instance.photograph or "",
+            str(current_position) if current_position else "",
+            instance.twitter or "",
+            instance.facebook or "",
+            instance.instagram or "",
+            instance.user.email or "",
+            instance.wikidata_item or "",
+            instance.linkedin or "",
+            instance.lattes or "",
+            instance.orcid or "",
+            instance.google_scholar or "",
+        ]
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+
+def export_funding(report_id=None, custom_query=Q()):
+    header, rows = get_funding_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header).drop_duplicates().reset_index(drop=True)
     return df
 
 
-def export_funding(report_id=None, custom_query=Q()):
+def get_funding_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Funding"),
@@ -784,37 +794,40 @@ def export_funding(report_id=None, custom_query=Q()):
     ]
 
     if report_id:
-        fundings = Funding.objects.filter(funding_associated=report_id)
+        reports = Report.objects.filter(pk=report_id)
     else:
         reports = Report.objects.filter(custom_query)
-        fundings = Funding.objects.filter(
-            funding_associated__in=reports.values_list("id", flat=True)
-        )
 
-    rows = []
-    for funding in fundings:
-        type_of_funding = _("Ordinary")
-        if funding.project.current_poa:
-            type_of_funding = _("Current Plan of Activities")
-        elif funding.project.main_funding:
-            type_of_funding = _("Main funding")
-        rows.append(
-            [
-                funding.id,
-                funding.name,
-                funding.value,
-                funding.project_id,
-                funding.project.text,
-                funding.project.active_status,
-                type_of_funding,
-            ]
+    rows = (
+        get_related_to_reports(reports, "funding_associated")
+        .annotate(
+            type_of_funding=Case(
+                When(project__current_poa=True, then=Value(_("Current Plan of Activities"))),
+                When(project__main_funding=True, then=Value(_("Main funding"))),
+                default=Value(_("Ordinary")),
+            )
+        )
+        .order_by("pk")
+        .values_list(
+            "id",
+            "name",
+            "value",
+            "project_id",
+            get_localized_text(Project, "project"),
+            "project__active_status",
+            "type_of_funding",
         )
+    )
+    return header, rows
+
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+def export_area_activated(report_id=None, custom_query=Q()):
+    header, rows = get_area_activated_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_area_activated(report_id=None, custom_query=Q()):
+def get_area_activated_rows(report_id=None, custom_query=Q()):
     header = [_("ID"), _("Area activated")]
 
     if report_id:
@@ -822,17 +835,24 @@ def export_area_activated(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        rows.append([report.area_responsible.id, report.area_responsible.text])
-        for instance in report.area_activated.all():
-            rows.append([instance.id, instance.text])
+    rows = (
+        TeamArea.objects.filter(
+            Q(pk__in=reports.values("area_responsible"))
+            | Q(pk__in=get_related_to_reports(reports, "area_activated").values("pk"))
+        )
+        .order_by("pk")
+        .values_list("id", "text")
+    )
+    return header, rows
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+
+def export_directions_related(report_id=None, custom_query=Q()):
+    header, rows = get_directions_related_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_directions_related(report_id=None, custom_query=Q()):
+def get_directions_related_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Direction related"),
@@ -845,23 +865,22 @@ def export_directions_related(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in report.directions_related.all():
-            rows.append(
-                [
-                    instance.id,
-                    instance.text,
-                    instance.strategic_axis_id,
-                    instance.strategic_axis.text,
-                ]
-            )
+    rows = get_related_to_reports(reports, "directions_related").values_list(
+        "id",
+        "text",
+        "strategic_axis_id",
+        get_localized_text(StrategicAxis, "strategic_axis"),
+    )
+    return header, rows
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+
+def export_editors(report_id=None, custom_query=Q()):
+    header, rows = get_editors_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_editors(report_id=None, custom_query=Q()):
+def get_editors_rows(report_id=None, custom_query=Q()):
     header = [_("ID"), _("Username"), _("Number of reports including this editor")]
 
     if report_id:
@@ -869,16 +888,21 @@ def export_editors(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in report.editors.all():
-            rows.append([instance.id, instance.username, instance.editors.count()])
+    rows = (
+        get_related_to_reports(reports, "editors")
+        .annotate(reports_count=Count("editors"))
+        .values_list("id", "username", "reports_count")
+    )
+    return header, rows
+
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+def export_learning_questions_related(report_id=None, custom_query=Q()):
+    header, rows = get_learning_questions_related_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_learning_questions_related(report_id=None, custom_query=Q()):
+def get_learning_questions_related_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Learning question"),
@@ -891,23 +915,22 @@ def export_learning_questions_related(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in report.learning_questions_related.all():
-            rows.append(
-                [
-                    instance.id,
-                    instance.text,
-                    instance.learning_area_id,
-                    instance.learning_area.text,
-                ]
-            )
+    rows = get_related_to_reports(reports, "learning_questions_related").values_list(
+        "id",
+        "text",
+        "learning_area_id",
+        get_localized_text(LearningArea, "learning_area"),
+    )
+    return header, rows
+
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+def export_organizers(report_id=None, custom_query=Q()):
+    header, rows = get_organizers_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_organizers(report_id=None, custom_query=Q()):
+def get_organizers_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Organizer's name"),
@@ -921,28 +944,34 @@ def export_organizers(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in report.organizers.all():
-            rows.append(
-                [
-                    instance.id,
-                    instance.name,
-                    ";".join(
-                        map(str, instance.institution.values_list("id", flat=True))
-                    ),
-                    ";".join(
-                        map(str, instance.institution.values_list("name", flat=True))
-                    ),
-                    instance.organizers.count(),
-                ]
-            )
+    organizers = (
+        get_related_to_reports(reports, "organizers")
+        .annotate(reports_count=Count("organizers"))
+        .prefetch_related(
+            Prefetch("institution", queryset=Partner.objects.order_by("pk"))
+        )
+    )
+    return header, iter_organizers_rows(organizers)
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
-    return df
+
+def iter_organizers_rows(organizers):
+    for instance in organizers.iterator(chunk_size=CSV_EXPORT_CHUNK_SIZE):
+        yield [
+            instance.id,
+            instance.name,
+            ";".join(str(institution.id) for institution in instance.institution.all()),
+            ";".join(institution.name for institution in instance.institution.all()),
+            instance.reports_count,
+        ]
 
 
 def export_partners_activated(report_id=None, custom_query=Q()):
+    header, rows = get_partners_activated_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
+    return df
+
+
+def get_partners_activated_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Partners"),
@@ -955,23 +984,21 @@ def export_partners_activated(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in report.partners_activated.all():
-            rows.append(
-                [
-                    instance.id,
-                    instance.name,
-                    instance.website,
-                    instance.partners.count(),
-                ]
-            )
+    rows = (
+        get_related_to_reports(reports, "partners_activated")
+        .annotate(reports_count=Count("partners"))
+        .values_list("id", "name", "website", "reports_count")
+    )
+    return header, rows
+
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
+def export_technologies_used(report_id=None, custom_query=Q()):
+    header, rows = get_technologies_used_rows(report_id, custom_query)
+    df = pd.DataFrame(list(rows), columns=header)
     return df
 
 
-def export_technologies_used(report_id=None, custom_query=Q()):
+def get_technologies_used_rows(report_id=None, custom_query=Q()):
     header = [
         _("ID"),
         _("Technology"),
@@ -983,13 +1010,24 @@ def export_technologies_used(report_id=None, custom_query=Q()):
     else:
         reports = Report.objects.filter(custom_query)
 
-    rows = []
-    for report in reports:
-        for instance in report.technologies_used.all():
-            rows.append([instance.id, instance.name, instance.technologies.count()])
+    rows = (
+        get_related_to_reports(reports, "technologies_used")
+        .annotate(reports_count=Count("technologies"))
+        .values_list("id", "name", "reports_count")
+    )
+    return header, rows
 
-    df = pd.DataFrame(rows, columns=header).drop_duplicates().reset_index(drop=True)
-    return df
+
+def get_related_to_reports(reports, field_name):
+    """
+    Returns the objects of the many-to-many field field_name of Report related to any of
+    the reports, each once, selected through a subquery on the through table.
+    """
+    field = Report._meta.get_field(field_name)
+    related = field.remote_field.through.objects.filter(
+        **{f"{field.m2m_field_name()}__in": reports.values("pk")}
+    ).values(field.m2m_reverse_field_name())
+    return field.related_model.objects.filter(pk__in=related).order_by("pk")
 
 
 # ======================================================================================================================
@@ -1019,9 +1057,8 @@ def update_report(request, report_id):
             request.POST, instance=report, prefix="Operation"
         )
         if report_form.is_valid() and operation_metrics.is_valid():
-            with transaction.atomic():
+            with transaction.atomic(), deferred_contribution_refresh():
                 report = report_form.save(user=request.user)
-
                 operation_metrics.save()
 
             messages.success(request, _("Report updated successfully!"))
@@ -1143,6 +1180,27 @@ def get_metrics(request):
         return JsonResponse({"objects": None, "main": main_})
 
 
+def get_localized_text(model, path, lang=None):
+    """
+    Returns an expression of the text of the objects related through `path` in the language,
+    as `path__text` reads the text of the default language. Empty translations fall back to
+    the default text, as the instances do.
+
+    :param model: translated model related through path
+    :param path: name of the relation
+    :param lang: language code, the active one when not given
+
+    :return: expression to be selected
+    """
+    available_fields = [
+        f.name for f in model._meta.get_fields() if f.name.startswith("text")
+    ]
+    field = get_localized_field(lang or translation.get_language(), available_fields)
+    if field == "text":
+        return F(f"{path}__text")
+    return Coalesce(NullIf(F(f"{path}__{field}"), Value("")), F(f"{path}__text"))
+
+
 def get_localized_field(lang, available_fields, default_field="text"):
     """
     Returns the name of the text field for the requested language.
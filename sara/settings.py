@@ -13,16 +13,37 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 from pathlib import Path
 
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
 # Feature flags — hard defaults (must exist)
 ENABLE_BUG_APP = False
 ENABLE_AGENDA_APP = False
+ENABLE_PERFORMANCE_MONITORING = False
+ENABLE_EXPORT_JOBS = False
+
+# Performance monitoring: requests kept per URL and queries allowed per request
+PERFORMANCE_WINDOW_SIZE = 200
+PERFORMANCE_QUERY_BUDGET = 100
+# References: links whose wikified and dewikified forms are kept in memory, read once at
+# startup (override_settings does not change it)
+LINK_CACHE_SIZE = 4096
+
+# Exports: size in bytes above which the files being exported are spooled to disk
+EXPORT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+# Export jobs: threads running them in the web process (0: run_export_jobs command only)
+EXPORT_JOBS_THREADS = 0
+# Export jobs: where their files are written, seconds after which a job still running is
+# considered abandoned by its worker and days their files are kept once finished
+EXPORT_JOBS_ROOT = BASE_DIR / "exports"
+EXPORT_JOBS_TIMEOUT = 60 * 60
+EXPORT_JOBS_RETENTION_DAYS = 7
+# Exports: where the yearly exports are cached
+EXPORT_ARTIFACTS_ROOT = BASE_DIR / "exports" / "artifacts"
 
 # SECURITY WARNING: keep the secret key used in production secret!
 from .settings_local import *  # noqa: E402, F401, F403
 
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
@@ -65,6 +86,9 @@ MIDDLEWARE = [
     "social_django.middleware.SocialAuthExceptionMiddleware",
 ]
 
+if ENABLE_PERFORMANCE_MONITORING:
+    MIDDLEWARE.append("metrics.middleware.PerformanceMiddleware")
+
 ROOT_URLCONF = "sara.urls"
 
 TEMPLATES = [
@@ -19,6 +19,29 @@ ENABLE_BUG_APP = True  # or False, if you do not want users creating bug reports
 ENABLE_AGENDA_APP = (
     True  # or False, if you do not want to create or share a public agenda
 )
+ENABLE_PERFORMANCE_MONITORING = (
+    False  # or True, to record the queries and latency of each view (see /_perf)
+)
+PERFORMANCE_QUERY_BUDGET = 100  # Views running more queries are flagged in /_perf
+LINK_CACHE_SIZE = 4096  # Links whose wikified forms are cached, shown in /_perf
+ENABLE_EXPORT_JOBS = (
+    False  # or True, to compute the exports in the background (see run_export_jobs)
+)
+EXPORT_JOBS_THREADS = 0  # or more, to run the export jobs in threads of the web process
+EXPORT_JOBS_ROOT = BASE_DIR / "exports"  # Where the files of the export jobs are written
+EXPORT_JOBS_TIMEOUT = 60 * 60  # Seconds after which a running job is failed as abandoned
+EXPORT_JOBS_RETENTION_DAYS = 7  # Days the finished export jobs and their files are kept
+EXPORT_ARTIFACTS_ROOT = BASE_DIR / "exports" / "artifacts"  # Cached yearly exports
+
+# Cache of the metrics per project pages and of the yearly exports. Both are only kept
+# with a cache shared by all the processes (not the default LocMemCache), so that the
+# invalidation done by one of them is seen by the others. Uncomment to enable them:
+# CACHES = {
+#     "default": {
+#         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+#         "LOCATION": BASE_DIR / "cache",
+#     }
+# }
 
 # You can change the dates as you please.
 REPORT_TIMESPANS = {
@@ -0,0 +1,169 @@
+import csv
+import datetime
+import math
+import tempfile
+import zipfile
+
+import xlsxwriter
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamBuffer:
+    """
+    Write-only file object keeping what is written to it until it is drained. Used as the
+    target of a ZipFile, so the archive can be sent while it is being written.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def get_spooled_file():
+    """
+    Temporary file kept in memory until it grows beyond EXPORT_SPOOL_MAX_SIZE bytes, and
+    written to disk afterwards.
+    """
+    return tempfile.SpooledTemporaryFile(
+        max_size=settings.EXPORT_SPOOL_MAX_SIZE
+    )
+
+
+def iter_file(file, chunk_size=CHUNK_SIZE):
+    file.seek(0)
+    while chunk := file.read(chunk_size):
+        yield chunk
+
+
+class FileReader:
+    """
+    Iterable over the content of an open file, closed once it has been read or when the
+    response sending it is closed, so a file is not left open when it is never read.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        with self.file:
+            yield from iter_file(self.file, self.chunk_size)
+
+    def close(self):
+        self.file.close()
+
+
+def stream_zip(entries):
+    """
+    Yields a zip archive piece by piece. `entries` is an iterable of (name, build) pairs,
+    where build() returns a file object with the content of the entry. Each entry is built
+    only when the previous one has been sent and is closed afterwards, so a single entry is
+    held at a time.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for name, build in entries:
+            with build() as file, zip_file.open(name, mode="w", force_zip64=True) as entry:
+                for chunk in iter_file(file):
+                    entry.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+class Echo:
+    """
+    File object returning what is written to it, so a csv.writer gives back each row.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows, chunk_size=CHUNK_SIZE):
+    """
+    Yields a CSV file with the header and the rows, encoded in UTF-8, in chunks of about
+    chunk_size bytes. The rows are consumed as the chunks are sent, so an iterator over a
+    queryset is never fully loaded.
+    """
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(header)]
+    length = len(chunk[0])
+    for row in rows:
+        line = writer.writerow(row)
+        chunk.append(line)
+        length += len(line)
+        if length >= chunk_size:
+            yield "".join(chunk).encode("utf-8")
+            chunk = []
+            length = 0
+    yield "".join(chunk).encode("utf-8")
+
+
+def write_csv_rows(file, header, rows):
+    """
+    Yields the rows while writing them to the binary file as CSV, encoded in UTF-8, so a
+    single pass over the rows also feeds another writer.
+    """
+    writer = csv.writer(Echo())
+    file.write(writer.writerow(header).encode("utf-8"))
+    for row in rows:
+        file.write(writer.writerow(row).encode("utf-8"))
+        yield row
+
+
+class XlsxStreamWriter:
+    """
+    Writes an XLSX workbook row by row with the constant_memory mode of xlsxwriter, which
+    flushes each row to a temporary file once the next one is started, so the cells of the
+    workbook are never held in memory together. The sheets must be written one after the
+    other. Dates and integers are given a number format according to their type.
+    """
+
+    def __init__(self, file):
+        self.workbook = xlsxwriter.Workbook(file, {"constant_memory": True})
+        self.header_format = self.workbook.add_format({"bold": True, "border": 1})
+        self.date_format = self.workbook.add_format({"num_format": "yyyy-mm-dd"})
+        self.datetime_format = self.workbook.add_format(
+            {"num_format": "yyyy-mm-dd hh:mm:ss"}
+        )
+        self.integer_format = self.workbook.add_format({"num_format": "0"})
+
+    def write_sheet(self, name, header, rows):
+        worksheet = self.workbook.add_worksheet(name)
+        worksheet.write_row(0, 0, header, self.header_format)
+        for row_index, row in enumerate(rows, start=1):
+            for column_index, value in enumerate(row):
+                self.write_cell(worksheet, row_index, column_index, value)
+
+    def write_cell(self, worksheet, row, column, value):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        if isinstance(value, datetime.datetime):
+            if value != value:  # NaT
+                return
+            worksheet.write_datetime(row, column, value, self.datetime_format)
+        elif isinstance(value, datetime.date):
+            worksheet.write_datetime(row, column, value, self.date_format)
+        elif isinstance(value, bool):
+            worksheet.write_boolean(row, column, value)
+        elif isinstance(value, int):
+            worksheet.write_number(row, column, value, self.integer_format)
+        else:
+            worksheet.write(row, column, value)
+
+    def close(self):
+        self.workbook.close()